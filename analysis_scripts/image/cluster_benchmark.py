@@ -0,0 +1,52 @@
+import argparse
+import time
+import numpy as np
+from payloadcomputerdroneprojekt.image_analysis.clustering import \
+    cluster_positions
+
+parser = argparse.ArgumentParser(
+    description="Compare the grid and the hierarchical clustering of "
+                "detections")
+parser.add_argument(
+    "sizes", type=int, nargs="*", default=[1000, 5000, 20000, 100000],
+    help="Numbers of detections to cluster")
+parser.add_argument(
+    "--distance", type=float, default=5,
+    help="Distance threshold in meters")
+parser.add_argument(
+    "--objects", type=int, default=50,
+    help="Number of objects the detections are spread around")
+parser.add_argument(
+    "--hierarchical-max", type=int, default=20000,
+    help="Largest size the hierarchical clustering is run for, it needs "
+         "n^2 / 2 distances in memory")
+args = parser.parse_args()
+
+
+def detections(n: int, rng: np.random.Generator) -> np.ndarray:
+    # detections scattered around the objects of a 500 m x 500 m area,
+    # a tenth of them false positives anywhere
+    centers = rng.random((args.objects, 2)) * 500
+    hits = centers[rng.integers(0, args.objects, n - n // 10)]
+    return np.vstack([rng.normal(hits, 1.5), rng.random((n // 10, 2)) * 500])
+
+
+def timed(points: np.ndarray, method: str):
+    start = time.perf_counter()
+    labels = cluster_positions(points, args.distance, method)
+    return labels, time.perf_counter() - start
+
+
+rng = np.random.default_rng(0)
+print(f"{'n':>8} {'grid [s]':>10} {'hierarchical [s]':>17} {'clusters':>9}")
+for n in args.sizes:
+    points = detections(n, rng)
+    grid, grid_time = timed(points, "grid")
+    if n <= args.hierarchical_max:
+        hierarchical, hierarchical_time = timed(points, "hierarchical")
+        assert (grid == hierarchical).all(), "the clusterings differ"
+        hierarchical_text = f"{hierarchical_time:17.3f}"
+    else:
+        hierarchical_text = f"{'skipped':>17}"
+    print(f"{n:8d} {grid_time:10.3f} {hierarchical_text} "
+          f"{grid.max() + 1:9d}")
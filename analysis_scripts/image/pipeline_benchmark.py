@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import cv2
+import numpy as np
+from payloadcomputerdroneprojekt.image_analysis.ia_class import \
+    ImageAnalysis
+from payloadcomputerdroneprojekt.image_analysis.archive import Archive
+from payloadcomputerdroneprojekt.image_analysis.timing import FrameTimer
+
+TEST_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "..", "src",
+    "payloadcomputerdroneprojekt", "test", "image_analysis")
+FOLDERS = ["test_data", "static_image", "test_land_indoor"]
+# frames of the landing target, the code is searched in their objects
+CODE_FOLDERS = ["test_land_indoor"]
+# position of the frames: lat, lon, relative height and attitude
+POSITION = [48.0, 11.0, 10, 0, 0, 0]
+
+parser = argparse.ArgumentParser(
+    description="Replay the test images through the image analysis and "
+                "time every stage of the pipeline")
+parser.add_argument(
+    "--config", type=str,
+    default=os.path.join(TEST_PATH, "test_config.json"),
+    help="Config file, its image section is used")
+parser.add_argument(
+    "--scales", type=float, nargs="*", default=[0.5, 1, 2],
+    help="Factors the images are resized with")
+parser.add_argument(
+    "--colors", type=int, nargs="*", default=None,
+    help="Numbers of configured colors that are searched, all if not given")
+parser.add_argument(
+    "--height", type=float, default=1,
+    help="Relative height the frames are analysed for")
+parser.add_argument(
+    "--repeat", type=int, default=1,
+    help="Number of times every image is analysed")
+parser.add_argument(
+    "--output", type=str, default=None,
+    help="Write the results as JSON, e.g. as a new baseline")
+parser.add_argument(
+    "--baseline", type=str, default=None,
+    help="JSON results of an earlier run to compare with")
+parser.add_argument(
+    "--threshold", type=float, default=0.2,
+    help="Allowed slowdown of the median of a stage relative to the "
+         "baseline, the script fails if it is exceeded")
+args = parser.parse_args()
+
+
+def load_images():
+    images = []
+    for folder in FOLDERS:
+        path = os.path.join(TEST_PATH, folder)
+        for name in sorted(os.listdir(path)):
+            image = cv2.imread(os.path.join(path, name))
+            if image is not None:
+                images.append((image, folder in CODE_FOLDERS))
+    return images
+
+
+def summary(times):
+    out = {}
+    for stage, durations in times.items():
+        durations = np.array(durations)
+        out[stage] = {
+            "p50": float(np.percentile(durations, 50)),
+            "p90": float(np.percentile(durations, 90)),
+            "p99": float(np.percentile(durations, 99)),
+            "mean": float(durations.mean())
+        }
+    out["fps"] = 1000 / out["total"]["mean"]
+    return out
+
+
+def run(ia, archive, images, height):
+    # the stages are the laps of the frame timer of the image analysis, a
+    # stage missing in a frame, e.g. shape without objects, is not counted
+    times = {}
+    for i, (image, code) in enumerate(images * args.repeat):
+        timer = FrameTimer()
+        context = ia.frame_context(image)
+        result = ia._analyse_frame(image, POSITION, height, timer, context)
+        if code:
+            # like the landing, which searches the code of the target
+            shape_image = context.shape_mask
+            elements = ia.find_code_elements(shape_image, height)
+            for obj in result["objects"]:
+                ia.find_code(obj, shape_image, height, elements=elements)
+            timer.lap("find_code")
+        archive.store(image, f"{i}_raw_image", "raw")
+        timer.lap("persistence")
+        for stage, duration in timer.result().items():
+            times.setdefault(stage, []).append(duration)
+    archive.flush()
+    return summary(times)
+
+
+def compare(results, baseline):
+    regressions = []
+    for key, stages in results.items():
+        if key not in baseline:
+            continue
+        for stage, times in stages.items():
+            # stages of another version of the pipeline are not compared
+            if stage == "fps" or stage not in baseline[key]:
+                continue
+            old = baseline[key][stage]["p50"]
+            new = times["p50"]
+            if old > 0 and new > old * (1 + args.threshold):
+                regressions.append(
+                    f"{key} {stage}: {old:.2f} ms -> {new:.2f} ms")
+        if "fps" in baseline[key] and \
+                stages["fps"] * (1 + args.threshold) < baseline[key]["fps"]:
+            regressions.append(
+                f"{key} fps: {baseline[key]['fps']:.1f} -> "
+                f"{stages['fps']:.1f}")
+    return regressions
+
+
+with open(args.config) as f:
+    config = json.load(f)["image"]
+images = load_images()
+color_counts = args.colors or [len(config["colors"])]
+
+results = {}
+with tempfile.TemporaryDirectory() as path:
+    archive = Archive(path, config.get("archive"))
+    for n_colors in color_counts:
+        ia = ImageAnalysis({**config, "colors": config["colors"][:n_colors],
+                            "analysis_workers": 0}, None, None,
+                           store_data=False)
+        for scale in args.scales:
+            scaled = [(cv2.resize(image, None, fx=scale, fy=scale), code)
+                      for image, code in images]
+            key = f"scale_{scale}_colors_{n_colors}"
+            results[key] = run(ia, archive, scaled, args.height)
+            print(f"{key}: {results[key]['fps']:.1f} fps")
+            for stage, t in results[key].items():
+                if stage == "fps":
+                    continue
+                print(f"    {stage:14s} p50 {t['p50']:8.2f} ms  "
+                      f"p90 {t['p90']:8.2f} ms  p99 {t['p99']:8.2f} ms")
+    archive.close()
+
+if args.output is not None:
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=4)
+
+if args.baseline is not None:
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f))
+    if len(regressions) > 0:
+        print("Regressions against the baseline:")
+        for regression in regressions:
+            print(f"    {regression}")
+        sys.exit(1)
+    print("No regressions against the baseline")
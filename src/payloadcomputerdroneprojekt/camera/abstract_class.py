@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+import time
 
 
 class AbstractCamera(ABC):
@@ -29,6 +30,16 @@ class AbstractCamera(ABC):
         """
         pass
 
+    def get_current_frame_with_time(self):
+        """
+        Capture the current frame with the time it was taken at.
+        :return: The captured frame and the time as time.monotonic(), the
+            middle of the capture call unless the camera knows better.
+        """
+        start = time.monotonic()
+        frame = self.get_current_frame()
+        return frame, (start + time.monotonic()) / 2
+
     @abstractmethod
     def stop_camera(self):
         """
@@ -7,8 +7,11 @@ from payloadcomputerdroneprojekt.communications.helper import (
     get_data, wait_for, save_execute, get_pos_vec, reached_pos,
     rotation_matrix_yaw, abs_vel, get_vel_vec
 )
+from payloadcomputerdroneprojekt.communications.pose_buffer import PoseBuffer
 from mavsdk.server_utility import StatusTextType
 from typing import Any, Optional, Dict, List
+import asyncio
+import time
 
 
 class Communications:
@@ -35,6 +38,11 @@ class Communications:
         self.config: Dict[str, Any] = config if config is not None else {}
         self.address: str = address
         self.drone: Optional[System] = None
+        # recent poses, timestamps are time.monotonic()
+        self.poses: PoseBuffer = PoseBuffer(
+            self.config.get("pose_buffer_size", 256),
+            self.config.get("pose_max_age", 0.1))
+        self._pose_tasks: List[asyncio.Task] = []
 
     async def connect(self) -> bool:
         """
@@ -58,8 +66,63 @@ class Communications:
 
         # await self.set_data_rates()
         sp("-- Connection established successfully")
+        # streams of an earlier connection are stale
+        self.stop_pose_stream()
+        self.start_pose_stream()
         return True
 
+    def start_pose_stream(self) -> None:
+        """
+        Start filling the pose buffer from the position and attitude
+        telemetry streams. Every message of either stream adds a sample with
+        the latest values of both. The streams are stopped when the
+        connection to the drone is lost.
+
+        :returns: None
+        """
+        if self._pose_tasks:
+            return
+        latest: Dict[str, List[float]] = {}
+
+        def add_sample(key: str, values: List[float]) -> None:
+            latest[key] = values
+            if len(latest) == 2:
+                self.poses.append(
+                    time.monotonic(), latest["position"] + latest["attitude"])
+
+        async def position_stream() -> None:
+            position: Position
+            async for position in self.drone.telemetry.position():
+                add_sample("position", [
+                    position.latitude_deg, position.longitude_deg,
+                    position.relative_altitude_m])
+
+        async def attitude_stream() -> None:
+            euler: EulerAngle
+            async for euler in self.drone.telemetry.attitude_euler():
+                add_sample("attitude", [
+                    euler.roll_deg, euler.pitch_deg, euler.yaw_deg])
+
+        async def connection_watch() -> None:
+            await wait_for(self.drone.core.connection_state(),
+                           lambda x: not x.is_connected)
+            sp("-- Connection lost, stopping the pose stream")
+            self.stop_pose_stream()
+
+        self._pose_tasks = [asyncio.ensure_future(position_stream()),
+                            asyncio.ensure_future(attitude_stream()),
+                            asyncio.ensure_future(connection_watch())]
+
+    def stop_pose_stream(self) -> None:
+        """
+        Stop filling the pose buffer, the samples already in it are kept.
+
+        :returns: None
+        """
+        for task in self._pose_tasks:
+            task.cancel()
+        self._pose_tasks = []
+
     async def check_health(self) -> bool:
         """
         Check if the drone's global position is OK (GPS ready).
@@ -240,6 +303,26 @@ class Communications:
         return [position.latitude_deg, position.longitude_deg,
                 position.relative_altitude_m] + await self._get_attitude()
 
+    async def get_position_lat_lon_alt_at(self, timestamp: float
+                                          ) -> List[float]:
+        """
+        Get the drone's global position and attitude at a given time,
+        interpolated from the pose buffer.
+
+        :param timestamp: Time as time.monotonic().
+        :type timestamp: float
+        :returns: [latitude_deg, longitude_deg, relative_altitude_m, roll,
+            pitch, yaw]
+        :rtype: list[float]
+
+        Falls back to the current position if the buffer does not cover the
+        time.
+        """
+        pose = self.poses.interpolate(timestamp)
+        if pose is None:
+            return await self.get_position_lat_lon_alt()
+        return pose
+
     @save_execute("Move to XYZ")
     async def mov_to_xyz(self, pos: List[float], yaw: Optional[float] = None
                          ) -> None:
@@ -0,0 +1,152 @@
+import numpy as np
+from typing import List, Optional
+
+# columns of the pose samples after the timestamp
+POSE_FIELDS = ("latitude_deg", "longitude_deg", "relative_altitude_m",
+               "roll_deg", "pitch_deg", "yaw_deg")
+# pose fields holding angles in degrees, interpolated along the shorter way
+_ANGLES = slice(3, 6)
+
+
+class PoseBuffer:
+    """
+    Ring buffer of time-stamped pose samples, used to get the pose of the
+    drone at the time a frame was taken.
+
+    Each sample is [time, lat, lon, relative_alt, roll, pitch, yaw]. The
+    timestamps have to be added in increasing order.
+
+    :param capacity: Maximum number of samples kept.
+    :type capacity: int
+    :param max_age: Seconds a pose may be requested after the newest sample;
+        the newest sample is returned then.
+    :type max_age: float
+    """
+
+    def __init__(self, capacity: int = 256, max_age: float = 0.1) -> None:
+        """
+        Initialize an empty PoseBuffer.
+
+        :param capacity: Maximum number of samples kept.
+        :type capacity: int
+        :param max_age: Seconds a pose may be requested after the newest
+            sample.
+        :type max_age: float
+        """
+        self._data: np.ndarray = np.empty((capacity, 1 + len(POSE_FIELDS)))
+        self._next: int = 0
+        self._count: int = 0
+        self.max_age: float = max_age
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, timestamp: float, pose: List[float]) -> None:
+        """
+        Add a sample, the oldest one is dropped if the buffer is full.
+
+        :param timestamp: Time of the sample in seconds.
+        :type timestamp: float
+        :param pose: [lat, lon, relative_alt, roll, pitch, yaw].
+        :type pose: list[float]
+        :return: None
+        """
+        self._data[self._next, 0] = timestamp
+        self._data[self._next, 1:] = pose
+        self._next = (self._next + 1) % len(self._data)
+        self._count = min(self._count + 1, len(self._data))
+
+    def _start(self) -> int:
+        """
+        Index of the oldest sample in the ring.
+
+        :rtype: int
+        """
+        return (self._next - self._count) % len(self._data)
+
+    def _sample(self, position: int) -> np.ndarray:
+        """
+        A sample by its position, oldest first, as a view into the ring.
+
+        :param position: Position of the sample, 0 is the oldest one and -1
+            the newest one.
+        :type position: int
+        :return: Array of shape (7,).
+        :rtype: np.ndarray
+        """
+        return self._data[(self._start() + position % self._count)
+                          % len(self._data)]
+
+    def _search(self, timestamp: float) -> int:
+        """
+        Position of the first sample later than a time. The ring consists of
+        two sorted parts, the older one up to the end of the array and the
+        newer one from its start, which are searched one after another.
+
+        :param timestamp: Time in seconds.
+        :type timestamp: float
+        :return: Position of the sample, oldest first.
+        :rtype: int
+        """
+        start = self._start()
+        older = self._data[start:start + self._count, 0]
+        index = int(np.searchsorted(older, timestamp, side="right"))
+        if index < len(older):
+            return index
+        newer = self._data[:self._count - len(older), 0]
+        return len(older) + int(
+            np.searchsorted(newer, timestamp, side="right"))
+
+    def samples(self) -> np.ndarray:
+        """
+        A copy of all samples, oldest first.
+
+        :return: Array of shape (N, 7).
+        :rtype: np.ndarray
+        """
+        if self._count < len(self._data):
+            return self._data[:self._count].copy()
+        return np.roll(self._data, -self._next, axis=0)
+
+    def interpolate(self, timestamp: float) -> Optional[List[float]]:
+        """
+        Get the pose at a time by linear interpolation between the two
+        samples around it. Angles are interpolated along the shorter way and
+        returned in [-180, 180).
+
+        :param timestamp: Time in seconds, same clock as the samples.
+        :type timestamp: float
+        :return: [lat, lon, relative_alt, roll, pitch, yaw] or None if the
+            time is not covered by the buffer.
+        :rtype: list[float] or None
+        """
+        if self._count == 0:
+            return None
+        first, last = self._sample(0)[0], self._sample(-1)[0]
+        if timestamp < first or timestamp > last + self.max_age:
+            return None
+        if timestamp >= last:
+            return self._sample(-1)[1:].tolist()
+
+        index = self._search(timestamp)
+        before, after = self._sample(index - 1), self._sample(index)
+        span = after[0] - before[0]
+        weight = 0.0 if span <= 0 else (timestamp - before[0]) / span
+
+        delta = after[1:] - before[1:]
+        delta[_ANGLES] = _wrap(delta[_ANGLES])
+        pose = before[1:] + weight * delta
+        pose[_ANGLES] = _wrap(pose[_ANGLES])
+        return pose.tolist()
+
+
+def _wrap(angles: np.ndarray) -> np.ndarray:
+    """
+    Wrap angles in degrees to [-180, 180).
+
+    :param angles: Angles in degrees.
+    :type angles: np.ndarray
+    :return: The wrapped angles.
+    :rtype: np.ndarray
+    """
+    return (angles + 180) % 360 - 180
@@ -0,0 +1,345 @@
+from os.path import exists, getsize, join
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import cv2
+from payloadcomputerdroneprojekt.image_analysis.image_writer import \
+    ImageWriter
+
+# Backends of the stored image kinds if nothing is configured: frames and
+# annotated images as before, masks as 1 bit PNG.
+DEFAULT_ARCHIVE: Dict[str, Dict[str, Any]] = {
+    "raw": {"backend": "jpeg"},
+    "image": {"backend": "jpeg"},
+    "mask": {"backend": "png", "bilevel": True}
+}
+
+EXTENSIONS: Dict[str, str] = {
+    "jpeg": "jpg",
+    "webp": "webp",
+    "png": "png"
+}
+
+# cv2.IMWRITE_PNG_BILEVEL is missing in old OpenCV builds
+PNG_BILEVEL: int = getattr(cv2, "IMWRITE_PNG_BILEVEL", 18)
+
+# bytes before the slots of a raw ring file, holding the next slot as int64
+RING_HEADER: int = 8
+
+
+class EncodedBackend:
+    """
+    Stores every image as its own file, encoded as JPEG, WebP or PNG.
+
+    Options:
+
+    * ``quality``: 0-100 for JPEG and WebP, OpenCV's default if not given
+    * ``compression``: 0-9 for PNG
+    * ``bilevel``: PNG only, store binary masks with 1 bit per pixel
+    * ``scale``: factor the image is resized with before it is stored
+
+    :param name: Backend name, one of :data:`EXTENSIONS`.
+    :type name: str
+    :param options: Options of the backend.
+    :type options: dict
+    """
+
+    def __init__(self, name: str, options: Dict[str, Any]) -> None:
+        """
+        Initialize the backend and its encoder parameters.
+
+        :param name: Backend name, one of :data:`EXTENSIONS`.
+        :type name: str
+        :param options: Options of the backend.
+        :type options: dict
+        """
+        self.name: str = name
+        self.extension: str = EXTENSIONS[name]
+        self.scale: float = options.get("scale", 1)
+        if not 0 < self.scale <= 1:
+            raise ValueError(f"scale has to be in (0, 1], got {self.scale}")
+
+        self.params: List[int] = []
+        if "quality" in options and name == "jpeg":
+            self.params += [cv2.IMWRITE_JPEG_QUALITY, int(options["quality"])]
+        if "quality" in options and name == "webp":
+            self.params += [cv2.IMWRITE_WEBP_QUALITY, int(options["quality"])]
+        if "compression" in options and name == "png":
+            self.params += [cv2.IMWRITE_PNG_COMPRESSION,
+                            int(options["compression"])]
+        if options.get("bilevel", False) and name == "png":
+            self.params += [PNG_BILEVEL, 1]
+
+    def store(
+        self,
+        image: np.ndarray,
+        path: str,
+        stem: str,
+        writer: Optional[ImageWriter]
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Write the image to ``<stem>.<extension>``.
+
+        :param image: Image as a numpy array.
+        :type image: np.ndarray
+        :param path: Directory of the file.
+        :type path: str
+        :param stem: File name without extension.
+        :type stem: str
+        :param writer: Writes the file in the background, if None it is
+            written directly.
+        :type writer: ImageWriter or None
+        :return: File name and metadata record of the image.
+        :rtype: tuple[str, dict]
+        """
+        filename = f"{stem}.{self.extension}"
+        record: Dict[str, Any] = {"backend": self.name}
+        if self.scale < 1:
+            image = cv2.resize(image, None, fx=self.scale, fy=self.scale,
+                               interpolation=cv2.INTER_AREA)
+            record["scale"] = self.scale
+        if writer is None:
+            cv2.imwrite(join(path, filename), image, self.params)
+        else:
+            writer.write(join(path, filename), image, self.params)
+        return filename, record
+
+    def flush(self) -> None:
+        """
+        Nothing to do, the files are flushed by the writer.
+
+        :return: None
+        """
+
+
+class RawRingBackend:
+    """
+    Stores the images unencoded in a preallocated, memory-mapped ring file,
+    so storing a frame is a single copy. Once all ``slots`` are used the
+    oldest frames are overwritten.
+
+    One ring file is created for every image shape, e.g.
+    ``raw_ring_480x640x3_uint8.bin``. Its header holds the next slot, so a
+    reopened ring continues after the last stored frame.
+
+    :param options: Options of the backend, ``slots`` is the number of
+        frames kept per ring file (default 256).
+    :type options: dict
+    """
+
+    name: str = "raw_ring"
+
+    def __init__(self, options: Dict[str, Any]) -> None:
+        """
+        Initialize the backend, the ring files are created on first use.
+
+        :param options: Options of the backend.
+        :type options: dict
+        """
+        self.slots: int = options.get("slots", 256)
+        if self.slots < 1:
+            raise ValueError(f"a raw ring needs slots, got {self.slots}")
+        self._rings: Dict[str, np.memmap] = {}
+        self._next: Dict[str, np.memmap] = {}
+
+    def _get_ring(self, image: np.ndarray, path: str) -> str:
+        """
+        Get the ring file matching the image, created if it does not exist.
+
+        :param image: Image as a numpy array.
+        :type image: np.ndarray
+        :param path: Directory of the ring file.
+        :type path: str
+        :return: File name of the ring.
+        :rtype: str
+        """
+        shape = "x".join(str(size) for size in image.shape)
+        filename = f"raw_ring_{shape}_{image.dtype}.bin"
+        if filename not in self._rings:
+            file = join(path, filename)
+            shape = (self.slots, *image.shape)
+            size = RING_HEADER + int(np.prod(shape)) * image.dtype.itemsize
+            mode = "r+" if exists(file) and getsize(file) == size else "w+"
+            # a new file is zeroed, so it starts at the first slot
+            self._rings[filename] = np.memmap(
+                file, dtype=image.dtype, mode=mode, offset=RING_HEADER,
+                shape=shape)
+            self._next[filename] = np.memmap(
+                file, dtype=np.int64, mode="r+", shape=(1,))
+        return filename
+
+    def store(
+        self,
+        image: np.ndarray,
+        path: str,
+        stem: str,
+        writer: Optional[ImageWriter]
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Copy the image into the next slot of its ring file.
+
+        :param image: Image as a numpy array.
+        :type image: np.ndarray
+        :param path: Directory of the ring file.
+        :type path: str
+        :param stem: Unused, the ring file is named after the image shape.
+        :type stem: str
+        :param writer: Unused, the copy is not worth a thread.
+        :type writer: ImageWriter or None
+        :return: File name of the ring and metadata record with the slot.
+        :rtype: tuple[str, dict]
+        """
+        filename = self._get_ring(image, path)
+        slot = int(self._next[filename][0]) % self.slots
+        self._rings[filename][slot] = image
+        self._next[filename][0] = (slot + 1) % self.slots
+        return filename, {"backend": self.name, "slot": slot,
+                          "shape": list(image.shape),
+                          "dtype": str(image.dtype),
+                          "offset": RING_HEADER}
+
+    def flush(self) -> None:
+        """
+        Write the changed pages of the ring files to disk.
+
+        :return: None
+        """
+        for ring in self._rings.values():
+            ring.flush()
+        for cursor in self._next.values():
+            cursor.flush()
+
+
+def create_backend(options: Dict[str, Any]):
+    """
+    Create the backend described by a config entry.
+
+    :param options: Config entry with a ``backend`` key and its options.
+    :type options: dict
+    :return: The backend.
+    :rtype: EncodedBackend or RawRingBackend
+    :raises ValueError: If the backend is unknown.
+    """
+    name = options.get("backend", "jpeg")
+    if name in EXTENSIONS:
+        return EncodedBackend(name, options)
+    if name == RawRingBackend.name:
+        return RawRingBackend(options)
+    raise ValueError(f"unknown archive backend {name}")
+
+
+class Archive:
+    """
+    Stores the images of the data items with the backend configured for
+    their kind: ``raw`` frames, annotated ``image`` results and binary
+    ``mask`` images.
+
+    :param path: Directory the images are stored in.
+    :type path: str
+    :param config: Backend options per kind, missing kinds use
+        :data:`DEFAULT_ARCHIVE`.
+    :type config: dict or None
+    :param writer: Writes encoded images in the background, if None they are
+        written directly.
+    :type writer: ImageWriter or None
+    """
+
+    def __init__(
+        self,
+        path: str,
+        config: Optional[Dict[str, Dict[str, Any]]] = None,
+        writer: Optional[ImageWriter] = None
+    ) -> None:
+        """
+        Initialize the Archive and its backends.
+
+        :param path: Directory the images are stored in.
+        :type path: str
+        :param config: Backend options per kind.
+        :type config: dict or None
+        :param writer: Writes encoded images in the background.
+        :type writer: ImageWriter or None
+        """
+        self._path: str = path
+        self.writer: Optional[ImageWriter] = writer
+        self._backends = {
+            kind: create_backend(options)
+            for kind, options in {**DEFAULT_ARCHIVE, **(config or {})}.items()
+        }
+
+    def store(
+        self,
+        image: np.ndarray,
+        stem: str,
+        kind: str = "image"
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Store an image.
+
+        :param image: Image as a numpy array.
+        :type image: np.ndarray
+        :param stem: File name without extension.
+        :type stem: str
+        :param kind: Kind of the image: raw, image or mask.
+        :type kind: str
+        :return: File name and metadata record with the backend.
+        :rtype: tuple[str, dict]
+        """
+        return self._backends[kind].store(
+            image, self._path, stem, self.writer)
+
+    def separate_files(self, kind: str) -> bool:
+        """
+        Whether every image of a kind is stored in its own file, so several
+        processes can store images of the kind at the same time.
+
+        :param kind: Kind of the image: raw, image or mask.
+        :type kind: str
+        :return: True if the backend of the kind writes a file per image.
+        :rtype: bool
+        """
+        return isinstance(self._backends[kind], EncodedBackend)
+
+    def flush(self) -> None:
+        """
+        Wait until all images are written.
+
+        :return: None
+        """
+        if self.writer is not None:
+            self.writer.flush()
+        for backend in self._backends.values():
+            backend.flush()
+
+    def close(self) -> None:
+        """
+        Write all images and stop the image writer.
+
+        :return: None
+        """
+        if self.writer is not None:
+            self.writer.close()
+        for backend in self._backends.values():
+            backend.flush()
+
+
+def load_image(path: str, filename: str,
+               record: Optional[Dict[str, Any]] = None) -> np.ndarray:
+    """
+    Load an image stored by an :class:`Archive`.
+
+    :param path: Directory of the images.
+    :type path: str
+    :param filename: File name of the image.
+    :type filename: str
+    :param record: Metadata record of the image, needed for raw rings.
+    :type record: dict or None
+    :return: The image.
+    :rtype: np.ndarray
+    """
+    if record is None or record["backend"] != RawRingBackend.name:
+        return cv2.imread(join(path, filename), cv2.IMREAD_UNCHANGED)
+    # rings written before the header was added start at the first byte
+    ring = np.memmap(join(path, filename), dtype=record["dtype"], mode="r",
+                     offset=record.get("offset", 0))
+    ring = ring.reshape(-1, *record["shape"])
+    return np.array(ring[record["slot"]])
@@ -0,0 +1,331 @@
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from scipy.cluster.hierarchy import fclusterdata
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+from payloadcomputerdroneprojekt.image_analysis.detection import Detection
+
+# meters per degree latitude, the same approximation as used so far
+METERS_PER_DEGREE = 110000
+# cells with fewer point pairs are compared without a KD-tree
+_BRUTE_FORCE_PAIRS = 4096
+# offsets of the neighbor cells that can hold points within the threshold,
+# with cells of threshold / sqrt(2); only half of them, every pair of cells
+# is compared once
+_NEIGHBORS = [(dx, dy) for dx in range(-2, 3) for dy in range(-2, 3)
+              if (dx, dy) > (0, 0)]
+
+
+def project_local(lat_lon, origin=None) -> np.ndarray:
+    """
+    Project positions to a local metric frame, an equirectangular
+    projection around the origin. Longitudes are scaled with the cosine of
+    the latitude of the origin.
+
+    :param lat_lon: Positions [lat, lon] in degrees, shape (N, 2).
+    :type lat_lon: list or np.ndarray
+    :param origin: [lat, lon] of the origin, the first position if None.
+    :type origin: list or np.ndarray or None
+    :return: Positions [north, east] in meters, shape (N, 2).
+    :rtype: np.ndarray
+    """
+    lat_lon = np.asarray(lat_lon, dtype=np.float64).reshape(-1, 2)
+    if origin is None:
+        origin = lat_lon[0]
+    scale = METERS_PER_DEGREE * np.array(
+        [1, np.cos(np.radians(origin[0]))])
+    return (lat_lon - np.asarray(origin[:2], dtype=np.float64)) * scale
+
+
+def unproject_local(points, origin) -> np.ndarray:
+    """
+    Inverse of :func:`project_local`.
+
+    :param points: Positions [north, east] in meters, shape (N, 2).
+    :type points: list or np.ndarray
+    :param origin: [lat, lon] of the origin.
+    :type origin: list or np.ndarray
+    :return: Positions [lat, lon] in degrees, shape (N, 2).
+    :rtype: np.ndarray
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    scale = METERS_PER_DEGREE * np.array(
+        [1, np.cos(np.radians(origin[0]))])
+    return points / scale + np.asarray(origin[:2], dtype=np.float64)
+
+
+def _first_appearance(labels: np.ndarray) -> np.ndarray:
+    """
+    Number the labels in the order they first appear.
+
+    :param labels: Cluster labels.
+    :type labels: np.ndarray
+    :return: Labels 0 to k-1.
+    :rtype: np.ndarray
+    """
+    _, first, inverse = np.unique(
+        labels, return_index=True, return_inverse=True)
+    return np.argsort(np.argsort(first))[inverse.ravel()]
+
+
+def _cells_touch(points_a: np.ndarray, points_b: np.ndarray,
+                 threshold: float) -> bool:
+    """
+    Check if any pair of points of two cells is within the threshold.
+
+    :param points_a: Points of the first cell, shape (N, 2).
+    :type points_a: np.ndarray
+    :param points_b: Points of the second cell, shape (M, 2).
+    :type points_b: np.ndarray
+    :param threshold: Distance threshold.
+    :type threshold: float
+    :return: True if the cells are connected.
+    :rtype: bool
+    """
+    if len(points_a) * len(points_b) <= _BRUTE_FORCE_PAIRS:
+        diff = points_a[:, None, :] - points_b[None, :, :]
+        return bool(((diff**2).sum(axis=2) <= threshold**2).any())
+    if len(points_a) > len(points_b):
+        points_a, points_b = points_b, points_a
+    dist, _ = cKDTree(points_b).query(
+        points_a, distance_upper_bound=threshold * (1 + 1e-9))
+    return bool((dist <= threshold).any())
+
+
+def cluster_positions(points, distance_threshold: float,
+                      method: str = "grid") -> np.ndarray:
+    """
+    Single linkage clustering of positions: two positions are in the same
+    cluster if they are connected by a chain of positions that are at most
+    ``distance_threshold`` apart.
+
+    The ``grid`` method hashes the positions into cells of
+    ``distance_threshold / sqrt(2)``; all positions of a cell are within the
+    threshold of each other, so only neighbor cells have to be compared.
+    Time and memory grow linearly with the number of positions, also for
+    many detections of the same object. The ``hierarchical`` method uses
+    :func:`scipy.cluster.hierarchy.fclusterdata`, which needs quadratic time
+    and memory.
+
+    :param points: Positions in meters, shape (N, 2), see
+        :func:`project_local`.
+    :type points: list or np.ndarray
+    :param distance_threshold: Distance threshold in meters.
+    :type distance_threshold: float
+    :param method: ``grid`` or ``hierarchical``.
+    :type method: str
+    :return: Cluster label of every position, numbered in the order the
+        clusters first appear.
+    :rtype: np.ndarray
+    :raises ValueError: If the method is unknown.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(points) < 2:
+        return np.zeros(len(points), dtype=np.int64)
+    if method == "hierarchical":
+        return _first_appearance(fclusterdata(
+            points, criterion="distance", t=distance_threshold))
+    if method != "grid":
+        raise ValueError(f"unknown clustering method {method}")
+    if distance_threshold <= 0:
+        return _first_appearance(
+            np.unique(points, axis=0, return_inverse=True)[1].ravel())
+
+    # cells shifted by 2, so neighbor cells are never out of range
+    cells = np.floor(points / (distance_threshold / np.sqrt(2))
+                     ).astype(np.int64)
+    cells -= cells.min(axis=0) - 2
+    width = int(cells[:, 1].max()) + 3
+    keys, cell_of_point = np.unique(
+        cells[:, 0] * width + cells[:, 1], return_inverse=True)
+    cell_of_point = cell_of_point.ravel()
+    order = np.argsort(cell_of_point, kind="stable")
+    bounds = np.searchsorted(cell_of_point[order], np.arange(len(keys) + 1))
+
+    edges_a: List[int] = []
+    edges_b: List[int] = []
+    for dx, dy in _NEIGHBORS:
+        neighbor = keys + dx * width + dy
+        index = np.minimum(np.searchsorted(keys, neighbor), len(keys) - 1)
+        for a in np.nonzero(keys[index] == neighbor)[0]:
+            b = index[a]
+            if _cells_touch(points[order[bounds[a]:bounds[a + 1]]],
+                            points[order[bounds[b]:bounds[b + 1]]],
+                            distance_threshold):
+                edges_a.append(a)
+                edges_b.append(b)
+
+    graph = coo_matrix((np.ones(len(edges_a), dtype=np.int8),
+                        (edges_a, edges_b)), shape=(len(keys), len(keys)))
+    _, cell_labels = connected_components(graph, directed=False)
+    return _first_appearance(cell_labels[cell_of_point])
+
+
+class _Cell:
+    """
+    Positions of one grid cell, they all belong to the same cluster.
+    """
+
+    __slots__ = ("label", "points")
+
+    def __init__(self, label: int) -> None:
+        self.label: int = label
+        self.points: List[np.ndarray] = []
+
+
+class _Cluster:
+    """
+    Running sums of the objects of one cluster and its grid cells.
+    """
+
+    __slots__ = ("lat", "lon", "n", "times", "ids", "shapes", "cells")
+
+    def __init__(self) -> None:
+        self.lat: float = 0.0
+        self.lon: float = 0.0
+        self.n: int = 0
+        self.times: List[Any] = []
+        self.ids: List[Any] = []
+        self.shapes: Counter = Counter()
+        self.cells: List[Tuple[int, int]] = []
+
+    def add(self, obj: Detection, time: Any) -> None:
+        self.lat += obj.lat_lon[0]
+        self.lon += obj.lat_lon[1]
+        self.n += 1
+        self.times.append(time)
+        self.ids.append(obj.id)
+        if obj.shape:
+            self.shapes[obj.shape] += 1
+
+    def merge(self, other: "_Cluster") -> None:
+        self.lat += other.lat
+        self.lon += other.lon
+        self.n += other.n
+        self.times += other.times
+        self.ids += other.ids
+        self.shapes.update(other.shapes)
+        self.cells += other.cells
+
+
+class ObjectClusterer:
+    """
+    Incremental single linkage clustering of the detected objects by color.
+
+    A new object joins every cluster that has an object within the distance
+    threshold, merging them if there are several. This gives the same
+    clusters as :func:`cluster_positions` over all objects. The objects are
+    kept in the same grid, so a new object is only compared with the
+    objects of the neighbor cells. Positions are compared in meters,
+    projected around the first object of each color. The result is cached
+    until new objects are added.
+
+    :param distance_threshold: Distance in meters in which objects are
+        considered the same.
+    :type distance_threshold: float
+    """
+
+    def __init__(self, distance_threshold: float) -> None:
+        """
+        Initialize an empty ObjectClusterer.
+
+        :param distance_threshold: Distance in meters in which objects are
+            considered the same.
+        :type distance_threshold: float
+        """
+        self.distance_threshold: float = distance_threshold
+        self._cell_size: float = max(distance_threshold / np.sqrt(2), 1e-6)
+        self._origins: Dict[str, np.ndarray] = {}
+        self._cells: Dict[str, Dict[Tuple[int, int], _Cell]] = {}
+        self._clusters: Dict[str, Dict[int, _Cluster]] = {}
+        self._next_label: int = 0
+        self._result: Optional[Dict[str, List[Dict[str, Any]]]] = None
+
+    @property
+    def changed(self) -> bool:
+        """
+        True if objects were added since the last :meth:`result`.
+
+        :rtype: bool
+        """
+        return self._result is None
+
+    def add(self, obj: Detection, time: Any) -> None:
+        """
+        Add an object with a position to the clusters of its color.
+
+        :param obj: Detected object, ``lat_lon`` has to be set.
+        :type obj: Detection
+        :param time: Time of the data item the object was found in.
+        :type time: Any
+        """
+        origin = self._origins.setdefault(
+            obj.color, np.array(obj.lat_lon[:2], dtype=np.float64))
+        point = project_local([obj.lat_lon[:2]], origin)[0]
+        clusters = self._clusters.setdefault(obj.color, {})
+        cells = self._cells.setdefault(obj.color, {})
+        x, y = (int(v) for v in np.floor(point / self._cell_size))
+
+        near = set()
+        for dx in range(-2, 3):
+            for dy in range(-2, 3):
+                cell = cells.get((x + dx, y + dy))
+                if cell is None or cell.label in near:
+                    continue
+                # the positions of the own cell are all close enough
+                if (dx, dy) == (0, 0) or (np.hypot(
+                        *(np.array(cell.points) - point).T)
+                        <= self.distance_threshold).any():
+                    near.add(cell.label)
+
+        if len(near) == 0:
+            label = self._next_label
+            self._next_label += 1
+            clusters[label] = _Cluster()
+        else:
+            label = min(near)
+            for other in near - {label}:
+                for key in clusters[other].cells:
+                    cells[key].label = label
+                clusters[label].merge(clusters.pop(other))
+        clusters[label].add(obj, time)
+
+        if (x, y) not in cells:
+            cells[(x, y)] = _Cell(label)
+            clusters[label].cells.append((x, y))
+        cells[(x, y)].points.append(point)
+        self._result = None
+
+    def result(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Mean position, times, ids and most common shape of every cluster,
+        in the format of :func:`get_mean`. Built again only if objects were
+        added since the last call.
+
+        :return: Clusters by color.
+        :rtype: dict
+        """
+        if self._result is not None:
+            return self._result
+        count = 1
+        output: Dict[str, List[Dict[str, Any]]] = {}
+        for color, clusters in self._clusters.items():
+            output[color] = []
+            for cluster in clusters.values():
+                if len(cluster.shapes) == 0:
+                    most_common_shape = "unknown"
+                else:
+                    most_common_shape = cluster.shapes.most_common(1)[0][0]
+                output[color].append({
+                    "lat": cluster.lat/cluster.n,
+                    "lon": cluster.lon/cluster.n,
+                    "time": list(cluster.times),
+                    "ids": list(cluster.ids),
+                    "shape": most_common_shape,
+                    "id": count
+                })
+                count += 1
+        self._result = output
+        return output
@@ -1,12 +1,20 @@
 from payloadcomputerdroneprojekt.image_analysis.data_item import DataItem
+from payloadcomputerdroneprojekt.image_analysis.data_index import DataIndex
+from payloadcomputerdroneprojekt.image_analysis.detection import Detection
+from payloadcomputerdroneprojekt.image_analysis.archive import Archive
+from payloadcomputerdroneprojekt.image_analysis.clustering import \
+    ObjectClusterer, cluster_positions, project_local
+from payloadcomputerdroneprojekt.image_analysis.image_writer import \
+    ImageWriter
 from payloadcomputerdroneprojekt.helper import smart_print as sp
+import copy
 import json
+from contextlib import contextmanager
+from itertools import chain
 from os.path import exists, join
 from os import remove
 from os import makedirs
-from scipy.cluster.hierarchy import fclusterdata
-import numpy as np
-from typing import Any, Dict, List, Optional, TypeVar
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TypeVar
 from collections import Counter
 
 FILENAME = "__data__.json"
@@ -20,62 +28,120 @@ class DataHandler:
     Handles loading, saving, and processing of DataItem objects for image
     analysis.
 
+    Items of an existing data file are only indexed when the handler is
+    created, see :class:`DataIndex`, and parsed when they are accessed.
+    ``list`` holds the last DataItems created by this handler, saving only
+    appends the new items to the data file. Older saved items are dropped
+    from memory and read from the data file like existing items.
+
     :param path: Directory path where data files are stored.
     :type path: str
+    :param writer: Writes the images of the items in the background, if None
+        they are written directly.
+    :type writer: ImageWriter or None
+    :param archive: Archive backend options per image kind, see
+        :class:`Archive`.
+    :type archive: dict or None
+    :param keep_items: Number of saved DataItems kept in memory, -1 keeps
+        all.
+    :type keep_items: int
     """
 
-    def __init__(self, path: str) -> None:
+    def __init__(
+        self,
+        path: str,
+        writer: Optional[ImageWriter] = None,
+        archive: Optional[Dict[str, Dict[str, Any]]] = None,
+        keep_items: int = 100
+    ) -> None:
         """
-        Initializes the DataHandler, loads existing data if present, and
+        Initializes the DataHandler, indexes existing data if present, and
         prepares the storage directory.
 
         :param path: Directory path for storing data.
         :type path: str
+        :param writer: Writes the images of the items in the background, if
+            None they are written directly.
+        :type writer: ImageWriter or None
+        :param archive: Archive backend options per image kind.
+        :type archive: dict or None
+        :param keep_items: Number of saved DataItems kept in memory, -1
+            keeps all.
+        :type keep_items: int
         """
         if not exists(path):
             makedirs(path)
         self._path: str = path
+        self.archive: Archive = Archive(path, archive, writer)
         sp(f"Mission Path: {path}")
         self.list: List[DataItem] = []
 
         if exists(join(self._path, FILENAME)):
-            sp("loading already existing data")
-            with open(join(self._path, FILENAME), "r") as f:
-                content: str = f.read()
+            sp("indexing already existing data")
+        self._index: DataIndex = DataIndex(join(self._path, FILENAME))
+
+        self.saved: int = 0
+        # byte offsets of the saved items of the list in the data file
+        self._offsets: List[int] = []
+        self._keep_items: int = keep_items
+        self._clusterer: Optional[ObjectClusterer] = None
 
-                # Support for both JSON array and line-delimited JSON
-                if content.startswith("["):
-                    self.list = json.loads(content)
-                else:
-                    for line in content.splitlines():
-                        self.list.append(json.loads(line))
+    @property
+    def path(self) -> str:
+        """
+        Directory of the data file and the images.
 
-        self.saved: int = len(self.list)
+        :rtype: str
+        """
+        return self._path
 
-    def _get_new_item(self) -> DataItem:
+    def _get_new_item(self, timestamp: Optional[int] = None) -> DataItem:
         """
         Creates and appends a new DataItem to the internal list.
 
+        :param timestamp: Time of the item in 1/100 seconds, now if None.
+        :type timestamp: int or None
         :return: The newly created DataItem.
         :rtype: DataItem
         """
-        new_item: DataItem = DataItem(self._path)
-        new_item._id = len(self.list)
+        new_item: DataItem = DataItem(self._path, self.archive, timestamp)
+        new_item._id = len(self)
         self.list.append(new_item)
         return new_item
 
+    def __len__(self) -> int:
+        """
+        Number of DataItems, including the items of the existing data file.
+
+        :rtype: int
+        """
+        return len(self._index) + len(self.list)
+
     def get_items(self) -> List[Dict[str, Any]]:
         """
-        Returns a list of all DataItems as dictionaries.
+        Returns a list of all DataItems as dictionaries, the items of the
+        existing data file first.
 
         :return: List of DataItem dictionaries.
         :rtype: list
         """
-        def get_item(item: Any) -> Dict[str, Any]:
-            if isinstance(item, DataItem):
+        return list(self._index) + [item.get_dict() for item in self.list]
+
+    def get_item(self, item_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Returns one DataItem as dictionary, items of the existing data file
+        are parsed on demand.
+
+        :param item_id: Id of the DataItem.
+        :type item_id: int
+        :return: DataItem dictionary or None if there is no item with the
+            id.
+        :rtype: dict or None
+        """
+        for item in self.list:
+            if item._id == item_id:
                 return item.get_dict()
-            return item
-        return [get_item(item) for item in self.list]
+        return self._index.get(item_id)
 
     def get_filterd_items(self, distance_threshold: float
                           ) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
@@ -83,21 +149,28 @@ class DataHandler:
         Filters and clusters detected objects by color and shape, then computes
         their mean positions.
 
+        The clusters are updated incrementally as items are saved, so this
+        only clusters all objects on the first call or if the threshold
+        changed, and only writes the filtered data file if there are new
+        objects.
+
         :param distance_threshold: Distance threshold for clustering.
         :type distance_threshold: float
         :return: Filtered and clustered object data.
         :rtype: dict
         """
-        object_store: Dict[
-            str, Dict[str, List[Dict[str, Any]]]] = self._get_obj_tree()
-        sorted_list: Dict[
-            str, Dict[str, Dict[int, List[Dict[str, Any]]]]] = sort_list(
-            object_store, distance_threshold)
-        output: Dict[str, Dict[str, List[Dict[str, Any]]]
-                     ] = get_mean(sorted_list)
-        with open(self.get_filtered_storage(), "w") as f:
-            json.dump(output, f)
-        return output
+        if self._clusterer is None or \
+                self._clusterer.distance_threshold != distance_threshold:
+            self._clusterer = ObjectClusterer(distance_threshold)
+            for obj in self._get_objects(chain(self._index, self.list)):
+                self._clusterer.add(obj, obj.time)
+
+        if self._clusterer.changed:
+            output = self._clusterer.result()
+            with open(self.get_filtered_storage(), "w") as f:
+                json.dump(output, f)
+        # copied, callers may change the returned dictionaries
+        return copy.deepcopy(self._clusterer.result())
 
     def get_filtered_storage(self) -> str:
         """
@@ -108,31 +181,64 @@ class DataHandler:
         """
         return join(self._path, FILENAME_FILTERED)
 
-    def _get_obj_tree(self) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+    @staticmethod
+    def _get_objects(items: Iterable[Any]) -> List[Detection]:
         """
-        Builds a nested dictionary of detected objects grouped by color and
-        shape.
+        Get the detected objects with a position of the items, with the
+        time of their item set. Objects of items loaded from the data file
+        are converted back to detections.
 
-        :return: Nested dictionary of objects.
-        :rtype: dict
+        :param items: DataItems or their dictionaries.
+        :type items: Iterable
+        :return: List of objects.
+        :rtype: list
         """
-        object_store: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
-        for items in self.get_items():
-            for obj in items["found_objs"]:
-                object_store.setdefault(
-                    obj["color"], []).append(obj)
-
-                obj["time"] = items["time"]
-        return object_store
+        objects: List[Detection] = []
+        for item in items:
+            if isinstance(item, DataItem):
+                item_time, objs = item.time, item.objects
+            else:
+                item_time = item["time"]
+                objs = [Detection.from_dict(obj)
+                        for obj in item["found_objs"]]
+            for obj in objs:
+                if obj.lat_lon is None:
+                    continue
+                obj.time = item_time
+                objects.append(obj)
+        return objects
 
     def _save(self) -> None:
         """
-        Saves new DataItems to the data file in line-delimited JSON format.
+        Saves new DataItems to the data file in line-delimited JSON format
+        and adds their objects to the clusters.
+        """
+        new_items = self.list[self.saved:]
+        offsets: List[int] = []
+        with open(join(self._path, FILENAME), "ab") as f:
+            for item in new_items:
+                offsets.append(f.tell())
+                f.write((json.dumps(item.get_dict()) + "\n").encode())
+        self._offsets += offsets
+        self.saved = len(self.list)
+        if self._clusterer is not None:
+            for obj in self._get_objects(new_items):
+                self._clusterer.add(obj, obj.time)
+        self._spill()
+
+    def _spill(self) -> None:
+        """
+        Drops the oldest saved DataItems beyond ``keep_items`` from memory,
+        they are read from the data file from now on.
         """
-        with open(join(self._path, FILENAME), "a") as f:
-            for item in self.get_items()[self.saved:]:
-                f.write(json.dumps(item) + "\n")
-            self.saved = len(self.list)
+        if self._keep_items < 0 or self.saved <= self._keep_items:
+            return
+        spilled = self.saved - self._keep_items
+        for item, offset in zip(self.list[:spilled], self._offsets):
+            self._index.append(offset, item._id, item.time)
+        del self.list[:spilled]
+        del self._offsets[:spilled]
+        self.saved -= spilled
 
     def __enter__(self) -> DataItem:
         """
@@ -143,69 +249,102 @@ class DataHandler:
         """
         return self._get_new_item()
 
+    @contextmanager
+    def new_item(self, timestamp: Optional[int] = None
+                 ) -> Iterator[DataItem]:
+        """
+        Like using the DataHandler as context manager, for an item with a
+        given time, e.g. of a frame that is analysed again.
+
+        :param timestamp: Time of the item in 1/100 seconds, now if None.
+        :type timestamp: int or None
+        :return: The new DataItem, saved when the context is left.
+        :rtype: Iterator[DataItem]
+        """
+        try:
+            yield self._get_new_item(timestamp)
+        finally:
+            self._save()
+
     def __exit__(self, exc_type: Optional[type],
                  exc_val: Optional[BaseException], exc_tb: Optional[Any]
                  ) -> None:
         """
-        Context manager exit: saves new DataItems.
+        Context manager exit: saves new DataItems. Images still queued in
+        the writer are not waited for, see :meth:`flush`.
         """
         self._save()
 
+    def flush(self) -> None:
+        """
+        Wait until all queued images are written.
+
+        :return: None
+        """
+        self.archive.flush()
+
+    def close(self) -> None:
+        """
+        Write all queued images and stop the image writer.
+
+        :return: None
+        """
+        self.archive.close()
+
     def reset_data(self) -> None:
         """
-        Resets the data handler by clearing the internal list and deleting the
-        data file.
+        Resets the data handler by clearing the internal list and index and
+        deleting the data file.
         """
+        self.flush()
         self.list = []
         self.saved = 0
+        self._offsets = []
+        self._clusterer = None
         try:
             if exists(join(self._path, FILENAME)):
                 sp("Resetting data file.")
                 remove(join(self._path, FILENAME))
         except FileNotFoundError:
             sp("No data file to reset.")
+        self._index = DataIndex(join(self._path, FILENAME))
 
 
 def sort_list(
-    object_store: Dict[str, Dict[str, List[Dict[str, Any]]]],
-    distance_threshold: float
-) -> Dict[str, Dict[str, Dict[int, List[Dict[str, Any]]]]]:
+    object_store: Dict[str, List[Detection]],
+    distance_threshold: float,
+    method: str = "grid"
+) -> Dict[str, Dict[int, List[Detection]]]:
     """
-    Clusters objects by their latitude and longitude using hierarchical
-    clustering.
+    Clusters objects by their latitude and longitude with single linkage,
+    in a local metric frame around the first object of each color, see
+    :func:`cluster_positions`.
 
-    :param object_store: Nested dictionary of objects grouped by color and
-        shape.
+    :param object_store: Dictionary of objects grouped by color.
     :type object_store: dict
-    :param distance_threshold: Distance threshold for clustering.
+    :param distance_threshold: Distance threshold for clustering in meters.
     :type distance_threshold: float
+    :param method: ``grid`` scales linearly, ``hierarchical`` uses
+        fclusterdata.
+    :type method: str
     :return: Nested dictionary of clustered objects.
     :rtype: dict
     """
-    sorted_list: Dict[str, Dict[int, List[Dict[str, Any]]]] = {}
+    sorted_list: Dict[str, Dict[int, List[Detection]]] = {}
     for color, objs in object_store.items():
         sorted_list[color] = {}
-        coords_array = np.array([np.array(o["lat_lon"])
-                                for o in objs])
-
-        # If only one object, assign it to its own cluster
-        if len(coords_array) == 1:
-            sorted_list[color][0] = objs
-            continue
-
-        # Cluster objects by spatial proximity
-        labels = fclusterdata(
-            coords_array, criterion="distance", t=distance_threshold/110000)
-        for i, obj in enumerate(objs):
-            sorted_list[color].setdefault(
-                int(labels[i]), []).append(obj)
+        labels = cluster_positions(
+            project_local([o.lat_lon[:2] for o in objs]),
+            distance_threshold, method)
+        for label, obj in zip(labels, objs):
+            sorted_list[color].setdefault(int(label), []).append(obj)
 
     return sorted_list
 
 
 def get_mean(
-    sorted_list: Dict[str, Dict[str, Dict[int, List[Dict[str, Any]]]]]
-) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+    sorted_list: Dict[str, Dict[int, List[Detection]]]
+) -> Dict[str, List[Dict[str, Any]]]:
     """
     Computes the mean latitude and longitude for each cluster of objects.
 
@@ -226,13 +365,13 @@ def get_mean(
             ids: List[Any] = []
             shapes: List[str] = []
             for item in cluster_objs:
-                lat += item["lat_lon"][0]
-                lon += item["lat_lon"][1]
-                times.append(item["time"])
-                ids.append(item["id"])
+                lat += item.lat_lon[0]
+                lon += item.lat_lon[1]
+                times.append(item.time)
+                ids.append(item.id)
 
-                if item["shape"]:
-                    shapes.append(item["shape"])
+                if item.shape:
+                    shapes.append(item.shape)
 
             if n == 0:
                 continue
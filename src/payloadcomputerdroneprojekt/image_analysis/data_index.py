@@ -0,0 +1,243 @@
+import json
+import re
+from os.path import exists
+from typing import Any, Dict, Iterator, List, Optional
+from payloadcomputerdroneprojekt.helper import smart_print as sp
+
+# time and id of a record as written by DataHandler: the time is the first
+# key of a record and the id the last one, other records are parsed fully
+_TIME = re.compile(rb'^\{"time": (-?\d+)[,}]')
+_ID = re.compile(rb'"id": (-?\d+|null)\}\s*$')
+
+
+class DataIndex:
+    """
+    Index of the records of an existing data file, the records are only
+    parsed when they are accessed.
+
+    Opening the file streams it line by line and keeps the byte offset of
+    every record, by id, and the id by time. Time and id are read from the
+    start and the end of a line, so the detected objects and images of a
+    record are not parsed. Data files written as one JSON array are loaded
+    completely. An incomplete last line, left by an interrupted write, is
+    cut off so new records start on their own line. Records appended to
+    the file later are added with :meth:`append`.
+
+    :param filename: Path of the data file, it may not exist.
+    :type filename: str
+    """
+
+    def __init__(self, filename: str) -> None:
+        """
+        Index the records of the data file.
+
+        :param filename: Path of the data file, it may not exist.
+        :type filename: str
+        """
+        self._filename: str = filename
+        self._offsets: List[int] = []
+        self._ids: List[Any] = []
+        self._offset_by_id: Dict[Any, int] = {}
+        self._id_by_time: Dict[int, Any] = {}
+        # records of a JSON array file, they can not be read one by one
+        self._records: Optional[List[Dict[str, Any]]] = None
+        if exists(filename):
+            self._scan()
+
+    def _scan(self) -> None:
+        """
+        Read the offsets, ids and times of all records.
+        """
+        end = offset = 0
+        with open(self._filename, "rb") as f:
+            if f.read(1) == b"[":
+                f.seek(0)
+                offset = end = self._load_array(f.read())
+            f.seek(offset)
+            for line in f:
+                start, offset = offset, offset + len(line)
+                record = line.strip()
+                if not record:
+                    continue
+                if not line.endswith(b"\n"):
+                    sp("Removing incomplete last record of the data file.")
+                    break
+                self._add(start, record)
+                end = offset
+
+        if end < offset:
+            with open(self._filename, "r+b") as f:
+                f.truncate(end)
+
+    def _add(self, offset: int, record: bytes) -> None:
+        """
+        Add a record at a byte offset to the index.
+
+        :param offset: Byte offset of the line of the record.
+        :type offset: int
+        :param record: The line of the record.
+        :type record: bytes
+        """
+        time_match = _TIME.match(record)
+        id_match = _ID.search(record)
+        if time_match is None or id_match is None \
+                or self._records is not None:
+            self._add_line(offset, json.loads(record))
+            return
+        self._add_entry(offset, json.loads(id_match.group(1)),
+                        int(time_match.group(1)))
+
+    def _add_line(self, offset: int, record: Dict[str, Any]) -> None:
+        """
+        Add a parsed record at a byte offset to the index. Next to a JSON
+        array the record is kept, positions are used instead of offsets.
+
+        :param offset: Byte offset of the line of the record.
+        :type offset: int
+        :param record: The parsed record.
+        :type record: dict
+        """
+        if self._records is not None:
+            self._records.append(record)
+            offset = len(self._records) - 1
+        self._add_entry(offset, record.get("id"), record.get("time"))
+
+    def _add_entry(self, offset: int, item_id: Any, time: Any) -> None:
+        """
+        Add the offset, id and time of a record.
+
+        :param offset: Byte offset of the record.
+        :type offset: int
+        :param item_id: Id of the record.
+        :type item_id: Any
+        :param time: Time of the record.
+        :type time: Any
+        """
+        self._offsets.append(offset)
+        self._ids.append(item_id)
+        self._offset_by_id[item_id] = offset
+        self._id_by_time[time] = item_id
+
+    def append(self, offset: int, item_id: Any, time: Any) -> None:
+        """
+        Add a record that was appended to the data file.
+
+        :param offset: Byte offset of the line of the record.
+        :type offset: int
+        :param item_id: Id of the record.
+        :type item_id: Any
+        :param time: Time of the record.
+        :type time: Any
+        """
+        if self._records is None:
+            self._add_entry(offset, item_id, time)
+            return
+        self._add_line(offset, self._read(offset, True))
+
+    def _load_array(self, content: bytes) -> int:
+        """
+        Keep the records of a data file written as one JSON array, the
+        records can not be read one by one. Records appended as lines
+        after the array are kept as well.
+
+        :param content: Content of the data file.
+        :type content: bytes
+        :return: Byte offset after the array.
+        :rtype: int
+        """
+        text = content.decode()
+        records, end = json.JSONDecoder().raw_decode(text)
+        self._records = []
+        for record in records:
+            self._add_line(0, record)
+        return len(text[:end].encode())
+
+    def _read(self, offset: int, line: bool = False) -> Dict[str, Any]:
+        """
+        Parse the record at a byte offset.
+
+        :param offset: Byte offset of the record, the position for JSON
+            array files.
+        :type offset: int
+        :param line: Read the line at the offset also for JSON array
+            files.
+        :type line: bool
+        :return: The record.
+        :rtype: dict
+        """
+        if self._records is not None and not line:
+            return self._records[offset]
+        with open(self._filename, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def __len__(self) -> int:
+        """
+        Number of indexed records.
+
+        :rtype: int
+        """
+        return len(self._offsets)
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        """
+        Parse the record at a position of the file.
+
+        :param index: Position of the record.
+        :type index: int
+        :return: The record.
+        :rtype: dict
+        """
+        return self._read(self._offsets[index])
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """
+        Parse all records in the order of the file, reading it once.
+
+        :return: Iterator over the records.
+        :rtype: Iterator[dict]
+        """
+        if self._records is not None:
+            yield from self._records
+            return
+        if not self._offsets:
+            return
+        with open(self._filename, "rb") as f:
+            for offset in self._offsets:
+                f.seek(offset)
+                yield json.loads(f.readline())
+
+    @property
+    def ids(self) -> List[Any]:
+        """
+        Ids of the records in the order of the file.
+
+        :rtype: list
+        """
+        return list(self._ids)
+
+    def get(self, item_id: Any) -> Optional[Dict[str, Any]]:
+        """
+        Parse the record with an id.
+
+        :param item_id: Id of the record.
+        :type item_id: Any
+        :return: The record or None if there is no record with the id.
+        :rtype: dict or None
+        """
+        offset = self._offset_by_id.get(item_id)
+        if offset is None:
+            return None
+        return self._read(offset)
+
+    def id_at(self, time: int) -> Optional[Any]:
+        """
+        Id of the record taken at a time.
+
+        :param time: Time of the record in 1/100 seconds.
+        :type time: int
+        :return: Id of the record or None if there is no record at the
+            time.
+        :rtype: Any
+        """
+        return self._id_by_time.get(time)
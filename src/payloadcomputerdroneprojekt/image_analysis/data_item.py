@@ -1,8 +1,8 @@
 from time import time
-from os.path import join
 from typing import Any, Dict, List, Optional
 import numpy as np
-import cv2
+from payloadcomputerdroneprojekt.image_analysis.archive import Archive
+from payloadcomputerdroneprojekt.image_analysis.detection import Detection
 
 
 class DataItem:
@@ -12,17 +12,31 @@ class DataItem:
 
     :param path: Directory path where images will be saved.
     :type path: str
+    :param archive: Stores the images, if None they are written directly
+        with the default backends.
+    :type archive: Archive or None
+    :param timestamp: Time of the item in 1/100 seconds, now if None.
+    :type timestamp: int or None
     """
 
-    def __init__(self, path: str):
+    def __init__(self, path: str, archive: Optional[Archive] = None,
+                 timestamp: Optional[int] = None):
         """
         Initialize a DataItem instance.
 
         :param path: Directory path for saving images.
         :type path: str
+        :param archive: Stores the images, if None they are written directly
+            with the default backends.
+        :type archive: Archive or None
+        :param timestamp: Time of the item in 1/100 seconds, now if None.
+        :type timestamp: int or None
         """
         self._path: str = path
-        self._time: int = int(time() * 100)
+        self._archive: Archive = archive if archive is not None \
+            else Archive(path)
+        self._time: int = int(time() * 100) if timestamp is None \
+            else timestamp
         self._data: Dict[str, Any] = {"time": self._time, "found_objs": []}
         self._id: Optional[int] = None
 
@@ -42,42 +56,85 @@ class DataItem:
         :param image: Raw image as a numpy array.
         :type image: np.ndarray
         """
-        self.add_image(image, "raw_image")
+        self.add_image(image, "raw_image", "raw")
 
-    def add_image(self, image, name: str) -> None:
+    def add_image(self, image, name: str, kind: str = "image") -> None:
         """
-        Save and register an image with a specific name.
+        Save and register an image with a specific name. With a writer the
+        image is only queued, it is registered right away. The backend used
+        for the image is recorded under ``archive``.
 
         :param image: Image as a numpy array.
         :type image: np.ndarray
         :param name: Name for the saved image.
         :type name: str
+        :param kind: Kind of the image: raw, image or mask.
+        :type kind: str
         """
-        image_path: str = join(self._path, f"{self._time}_{name}.jpg")
-        cv2.imwrite(image_path, image)
-        self._data[name] = f"{self._time}_{name}.jpg"
+        filename, record = self._archive.store(
+            image, f"{self._time}_{name}", kind)
+        self.add_stored_image(name, filename, record)
 
-    def add_computed_image(self, image: np.ndarray) -> None:
+    def add_stored_image(self, name: str, filename: str,
+                         record: Dict[str, Any]) -> None:
+        """
+        Register an image that is already stored, e.g. by another process.
+
+        :param name: Name of the image.
+        :type name: str
+        :param filename: File name relative to the path of the item.
+        :type filename: str
+        :param record: Archive record of the image.
+        :type record: Dict[str, Any]
+        """
+        self._data[name] = filename
+        self._data.setdefault("archive", {})[name] = record
+
+    def add_computed_image(self, image: np.ndarray,
+                           kind: str = "image") -> None:
         """
         Save and register the computed (processed) image.
 
         :param image: Computed image as a numpy array.
         :type image: np.ndarray
+        :param kind: Kind of the image, selects the archive backend, e.g.
+            ``mask`` for a color mask.
+        :type kind: str
         """
-        self.add_image(image, "computed_image")
+        self.add_image(image, "computed_image", kind)
 
-    def add_objects(self, objects: List[Dict[str, Any]]) -> None:
+    def add_objects(self, objects: List[Detection]) -> None:
         """
         Add detected objects to the data item and assign unique IDs to each.
 
-        :param objects: List of detected object dictionaries.
-        :type objects: List[Dict[str, Any]]
+        :param objects: List of detected objects.
+        :type objects: List[Detection]
         """
         self._data["found_objs"] = objects
         # Assign a unique ID to each object based on the DataItem's ID and
         # object index
         for i, obj in enumerate(objects):
-            obj["id"] = f"{self._id}_{i}"
+            obj.id = f"{self._id}_{i}"
+
+    @property
+    def objects(self) -> List[Detection]:
+        """
+        The detected objects of the data item.
+
+        :return: List of detected objects.
+        :rtype: List[Detection]
+        """
+        return self._data["found_objs"]
+
+    @property
+    def time(self) -> int:
+        """
+        The time the data item was created, in 1/100 seconds.
+
+        :return: Timestamp.
+        :rtype: int
+        """
+        return self._time
 
     def add_quality(self, quality: float) -> None:
         """
@@ -88,6 +145,37 @@ class DataItem:
         """
         self._data["quality"] = float(quality)
 
+    def add_rejected(self, reason: str, metrics: Dict[str, float]) -> None:
+        """
+        Mark the data item as a frame rejected by the quality gate.
+
+        :param reason: Name of the failed check.
+        :type reason: str
+        :param metrics: Quality metrics of the frame.
+        :type metrics: Dict[str, float]
+        """
+        self._data["rejected"] = reason
+        self._data["quality_metrics"] = metrics
+
+    def add_source(self, item_id: Any) -> None:
+        """
+        Add the id of the item of an earlier run this item was computed
+        from.
+
+        :param item_id: Id of the source item.
+        :type item_id: Any
+        """
+        self._data["source_id"] = item_id
+
+    def add_timings(self, timings: Dict[str, float]) -> None:
+        """
+        Add the time the stages of the frame took.
+
+        :param timings: Milliseconds by stage.
+        :type timings: Dict[str, float]
+        """
+        self._data["timings"] = timings
+
     def add_height(self, height: float) -> None:
         """
         Add the height at which the image was taken.
@@ -99,10 +187,12 @@ class DataItem:
 
     def get_dict(self) -> Dict[str, Any]:
         """
-        Get the data item as a dictionary, including its ID.
+        Get the data item as a dictionary, including its ID. The detected
+        objects are serialized to dictionaries.
 
         :return: Dictionary representation of the data item.
         :rtype: Dict[str, Any]
         """
         self._data["id"] = self._id
-        return self._data
+        return {**self._data, "found_objs": [
+            obj.to_dict() for obj in self._data["found_objs"]]}
@@ -0,0 +1,285 @@
+import cv2
+import numpy as np
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+Stage = Callable[[np.ndarray], np.ndarray]
+
+# Reproduces the mask filter that has been used so far: only the 7x7 blur
+# and the Otsu threshold have an effect on the resulting mask.
+DEFAULT_DENOISE: List[Dict[str, Any]] = [
+    {"op": "gaussian_blur", "size": 7},
+    {"op": "threshold", "otsu": True}
+]
+
+KERNEL_SHAPES: Dict[str, int] = {
+    "rect": cv2.MORPH_RECT,
+    "ellipse": cv2.MORPH_ELLIPSE,
+    "cross": cv2.MORPH_CROSS
+}
+
+MORPH_OPS: Dict[str, int] = {
+    "open": cv2.MORPH_OPEN,
+    "close": cv2.MORPH_CLOSE
+}
+
+# float epsilon OpenCV uses in its Otsu threshold
+FLT_EPSILON = float(np.finfo(np.float32).eps)
+
+
+class DenoisePipeline:
+    """
+    Precompiled chain of filters that turns a raw color mask into the final
+    binary mask.
+
+    Every stage is described by a dict with an ``op`` key and its parameters,
+    e.g. ``{"op": "open", "size": 7, "shape": "rect"}``. Structuring elements
+    are created once when the pipeline is compiled, and stages that have no
+    effect (``"enabled": false`` or a kernel size of 1) are dropped.
+
+    Supported operations:
+
+    * ``gaussian_blur``: ``size``, ``sigma`` (default 0)
+    * ``box_blur``: ``size``; constant cost per pixel regardless of the size
+    * ``median_blur``: ``size``
+    * ``erode``, ``dilate``, ``open``, ``close``: ``size``, ``shape``
+      (``rect``, ``ellipse`` or ``cross``), ``iterations`` (default 1)
+    * ``threshold``: ``value`` (default 127) or ``otsu`` (default false)
+
+    ``size`` is either an int or ``[width, height]``; a size like ``[15, 1]``
+    gives a single separable pass.
+
+    To filter parts of a frame the same way as the whole frame, the parts
+    are padded by :attr:`radius` pixels, run through :meth:`prefilter` and
+    finished by :meth:`finish` with the Otsu threshold of the frame, see
+    :func:`otsu_threshold`.
+
+    :param stages: Stage descriptions in order of execution.
+    :type stages: list[dict]
+    :raises ValueError: If a stage is unknown or malformed.
+    """
+
+    def __init__(self, stages: List[Dict[str, Any]]) -> None:
+        """
+        Compile the given stages.
+
+        :param stages: Stage descriptions in order of execution.
+        :type stages: list[dict]
+        """
+        self._stages: List[Stage] = []
+        # index of the first Otsu threshold, the stages before it decide
+        # which threshold it chooses
+        self._otsu: Optional[int] = None
+        self.radius: int = 0
+        for stage in stages:
+            compiled = _compile_stage(stage)
+            if compiled is not None:
+                if self._otsu is None and stage.get("op") == "threshold" \
+                        and stage.get("otsu", False):
+                    self._otsu = len(self._stages)
+                self._stages.append(compiled)
+                self.radius += _stage_radius(stage)
+
+    def __len__(self) -> int:
+        """
+        Number of stages that are actually executed.
+
+        :return: Number of compiled stages.
+        :rtype: int
+        """
+        return len(self._stages)
+
+    def __call__(self, mask: np.ndarray) -> np.ndarray:
+        """
+        Run the pipeline on a mask.
+
+        :param mask: Raw color mask.
+        :type mask: np.ndarray
+        :return: Filtered mask.
+        :rtype: np.ndarray
+        """
+        for stage in self._stages:
+            mask = stage(mask)
+        return mask
+
+    @property
+    def has_otsu(self) -> bool:
+        """
+        Whether the pipeline chooses a threshold with Otsu's method.
+
+        :rtype: bool
+        """
+        return self._otsu is not None
+
+    def prefilter(self, mask: np.ndarray) -> np.ndarray:
+        """
+        Run the stages before the Otsu threshold, all stages if there is
+        none.
+
+        :param mask: Raw color mask.
+        :type mask: np.ndarray
+        :return: Mask the Otsu threshold is chosen on.
+        :rtype: np.ndarray
+        """
+        for stage in self._stages[:self._otsu]:
+            mask = stage(mask)
+        return mask
+
+    def finish(
+        self,
+        mask: np.ndarray,
+        threshold: Optional[float] = None
+    ) -> np.ndarray:
+        """
+        Run the stages after :meth:`prefilter`.
+
+        :param mask: Result of :meth:`prefilter`.
+        :type mask: np.ndarray
+        :param threshold: Value used instead of choosing the Otsu threshold
+            on the mask itself.
+        :type threshold: float or None
+        :return: Filtered mask.
+        :rtype: np.ndarray
+        """
+        if self._otsu is None:
+            return mask
+        if threshold is None:
+            mask = self._stages[self._otsu](mask)
+        else:
+            mask = cv2.threshold(mask, threshold, 255, cv2.THRESH_BINARY)[1]
+        for stage in self._stages[self._otsu + 1:]:
+            mask = stage(mask)
+        return mask
+
+
+def otsu_threshold(histogram: np.ndarray) -> float:
+    """
+    The threshold Otsu's method chooses for an 8 bit histogram, computed
+    the same way as by ``cv2.threshold``.
+
+    :param histogram: Pixel counts of the 256 values.
+    :type histogram: np.ndarray
+    :return: Threshold, values above it are set.
+    :rtype: float
+    """
+    counts = [float(count) for count in histogram]
+    scale = 1. / sum(counts)
+    mu = 0.
+    for i, count in enumerate(counts):
+        mu += i * count
+    mu *= scale
+    mu1 = q1 = 0.
+    max_sigma = max_value = 0.
+    for i, count in enumerate(counts):
+        p_i = count * scale
+        mu1 *= q1
+        q1 += p_i
+        q2 = 1. - q1
+        if min(q1, q2) < FLT_EPSILON or max(q1, q2) > 1. - FLT_EPSILON:
+            continue
+        mu1 = (mu1 + i * p_i) / q1
+        mu2 = (mu - q1 * mu1) / q2
+        sigma = q1 * q2 * (mu1 - mu2) * (mu1 - mu2)
+        if sigma > max_sigma:
+            max_sigma = sigma
+            max_value = float(i)
+    return max_value
+
+
+def _get_size(stage: Dict[str, Any]) -> Tuple[int, int]:
+    """
+    Read the kernel size of a stage as (width, height).
+
+    :param stage: Stage description.
+    :type stage: dict
+    :return: Kernel size.
+    :rtype: tuple
+    """
+    size: Union[int, List[int]] = stage.get("size", 3)
+    if isinstance(size, (list, tuple)):
+        return int(size[0]), int(size[1])
+    return int(size), int(size)
+
+
+def _stage_radius(stage: Dict[str, Any]) -> int:
+    """
+    Number of pixels around a pixel a stage reads.
+
+    :param stage: Stage description.
+    :type stage: dict
+    :return: Radius in pixels.
+    :rtype: int
+    """
+    if stage.get("op") == "threshold":
+        return 0
+    radius = max(_get_size(stage)) // 2
+    if stage.get("op") in ("erode", "dilate", "open", "close"):
+        radius *= stage.get("iterations", 1)
+        if stage.get("op") in ("open", "close"):
+            radius *= 2
+    return radius
+
+
+def _compile_stage(stage: Dict[str, Any]) -> Optional[Stage]:
+    """
+    Compile one stage description into a function.
+
+    :param stage: Stage description.
+    :type stage: dict
+    :return: Function applying the stage, or None if it has no effect.
+    :rtype: callable or None
+    :raises ValueError: If the stage is unknown or malformed.
+    """
+    if not stage.get("enabled", True):
+        return None
+    op = stage.get("op")
+
+    if op == "threshold":
+        if stage.get("otsu", False):
+            def otsu(mask: np.ndarray) -> np.ndarray:
+                return cv2.threshold(
+                    mask, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+            return otsu
+        value = stage.get("value", 127)
+
+        def threshold(mask: np.ndarray) -> np.ndarray:
+            return cv2.threshold(mask, value, 255, cv2.THRESH_BINARY)[1]
+        return threshold
+
+    size = _get_size(stage)
+    if size[0] < 1 or size[1] < 1:
+        raise ValueError(f"invalid kernel size {size} in stage {op}")
+    if size == (1, 1):
+        return None
+
+    if op == "gaussian_blur":
+        if size[0] % 2 == 0 or size[1] % 2 == 0:
+            raise ValueError(f"gaussian_blur needs an odd size, got {size}")
+        sigma = stage.get("sigma", 0)
+        return lambda mask: cv2.GaussianBlur(mask, size, sigma)
+    if op == "box_blur":
+        return lambda mask: cv2.blur(mask, size)
+    if op == "median_blur":
+        if size[0] != size[1] or size[0] % 2 == 0:
+            raise ValueError(
+                f"median_blur needs an odd square size, got {size}")
+        return lambda mask: cv2.medianBlur(mask, size[0])
+
+    if op in ("erode", "dilate", "open", "close"):
+        shape = stage.get("shape", "rect")
+        if shape not in KERNEL_SHAPES:
+            raise ValueError(f"unknown kernel shape {shape}")
+        kernel = cv2.getStructuringElement(KERNEL_SHAPES[shape], size)
+        iterations = stage.get("iterations", 1)
+        if iterations < 1:
+            return None
+        if op == "erode":
+            return lambda mask: cv2.erode(
+                mask, kernel, iterations=iterations)
+        if op == "dilate":
+            return lambda mask: cv2.dilate(
+                mask, kernel, iterations=iterations)
+        morph = MORPH_OPS[op]
+        return lambda mask: cv2.morphologyEx(
+            mask, morph, kernel, iterations=iterations)
+
+    raise ValueError(f"unknown denoise stage {op}")
@@ -0,0 +1,147 @@
+import numpy as np
+from typing import Any, Dict, List, Optional, Union
+
+# results set during the analysis, only serialized if they are set
+RESULTS = ("shape", "code", "code_confidence", "h", "h_residual", "lat_lon",
+           "id", "time")
+
+
+class Detection:
+    """
+    A single object detected in a frame.
+
+    Detections are kept as these records through the whole analysis and are
+    only turned into dictionaries when they are saved, see :meth:`to_dict`.
+
+    :param color: Color name of the object.
+    :type color: str
+    :param x_start: Left border of the bounding box in pixels.
+    :type x_start: int
+    :param y_start: Top border of the bounding box in pixels.
+    :type y_start: int
+    :param x_stop: Right border of the bounding box in pixels.
+    :type x_stop: int
+    :param y_stop: Bottom border of the bounding box in pixels.
+    :type y_stop: int
+    :param contour: Corners of the object of shape (4, 2), None if it is not
+        a quadrilateral.
+    :type contour: np.ndarray or None
+    """
+
+    __slots__ = ("color", "x_start", "y_start", "x_stop", "y_stop",
+                 "contour", "shape", "code", "code_confidence", "h",
+                 "h_residual", "lat_lon", "id", "time")
+
+    def __init__(
+        self,
+        color: str,
+        x_start: int,
+        y_start: int,
+        x_stop: int,
+        y_stop: int,
+        contour: Optional[np.ndarray] = None
+    ) -> None:
+        """
+        Initialize the Detection, all later results are unset.
+
+        :param color: Color name of the object.
+        :type color: str
+        :param x_start: Left border of the bounding box in pixels.
+        :type x_start: int
+        :param y_start: Top border of the bounding box in pixels.
+        :type y_start: int
+        :param x_stop: Right border of the bounding box in pixels.
+        :type x_stop: int
+        :param y_stop: Bottom border of the bounding box in pixels.
+        :type y_stop: int
+        :param contour: Corners of the object of shape (4, 2), None if it is
+            not a quadrilateral.
+        :type contour: np.ndarray or None
+        """
+        self.color: str = color
+        self.x_start: int = x_start
+        self.y_start: int = y_start
+        self.x_stop: int = x_stop
+        self.y_stop: int = y_stop
+        self.contour: Optional[np.ndarray] = contour
+        self.shape: Optional[Union[str, bool]] = None
+        self.code: Optional[List[Dict[str, int]]] = None
+        self.code_confidence: Optional[float] = None
+        self.h: Optional[float] = None
+        self.h_residual: Optional[float] = None
+        self.lat_lon: Optional[List[float]] = None
+        self.id: Optional[str] = None
+        self.time: Optional[int] = None
+
+    @property
+    def x_center(self) -> int:
+        """
+        Horizontal center of the bounding box in pixels.
+
+        :rtype: int
+        """
+        return self.x_start + (self.x_stop - self.x_start) // 2
+
+    @property
+    def y_center(self) -> int:
+        """
+        Vertical center of the bounding box in pixels.
+
+        :rtype: int
+        """
+        return self.y_start + (self.y_stop - self.y_start) // 2
+
+    @property
+    def bound_box(self) -> Dict[str, int]:
+        """
+        The bounding box as dictionary with x_start, x_stop, y_start and
+        y_stop.
+
+        :rtype: dict
+        """
+        return {
+            "x_start": self.x_start,
+            "x_stop": self.x_stop,
+            "y_start": self.y_start,
+            "y_stop": self.y_stop
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Serialize the detection, unset results are left out.
+
+        :return: JSON serializable dictionary.
+        :rtype: dict
+        """
+        out: Dict[str, Any] = {
+            "color": self.color,
+            "bound_box": self.bound_box,
+            "x_center": self.x_center,
+            "y_center": self.y_center
+        }
+        if self.contour is not None:
+            out["contour"] = self.contour.tolist()
+        for key in RESULTS:
+            value = getattr(self, key)
+            if value is not None:
+                out[key] = value
+        return out
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Detection":
+        """
+        Create a detection from its serialized form, see :meth:`to_dict`.
+
+        :param data: Serialized detection.
+        :type data: dict
+        :return: The detection.
+        :rtype: Detection
+        """
+        bound_box = data["bound_box"]
+        contour = data.get("contour")
+        obj = cls(data["color"], bound_box["x_start"], bound_box["y_start"],
+                  bound_box["x_stop"], bound_box["y_stop"],
+                  None if contour is None else np.array(contour))
+        for key in RESULTS:
+            setattr(obj, key, data.get(key))
+        return obj
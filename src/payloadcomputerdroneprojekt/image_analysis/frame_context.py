@@ -0,0 +1,232 @@
+import cv2
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from payloadcomputerdroneprojekt.image_analysis.denoise import \
+    DenoisePipeline, otsu_threshold
+from payloadcomputerdroneprojekt.image_analysis.segmentation import \
+    ColorSegmenter, SHAPE_COLOR
+from payloadcomputerdroneprojekt.image_analysis.roi import Box
+
+
+class FrameContext:
+    """
+    Per-frame cache for the intermediate results of the image analysis.
+
+    The LAB conversion, the label image and every denoised color mask are
+    computed lazily on first access and reused for the rest of the frame, so
+    several analysis steps on the same image only pay for them once.
+
+    If regions of interest are set, only these regions are segmented and the
+    masks are zero everywhere else. Every region is segmented with a margin
+    of the denoise radius and the Otsu threshold is chosen on all regions
+    together, as if the rest of the frame was empty, so the masks match the
+    ones of the whole frame as long as the regions contain all blobs.
+
+    :param image: BGR image of the frame.
+    :type image: np.ndarray
+    :param segmenter: Compiled color segmenter.
+    :type segmenter: ColorSegmenter
+    :param denoise: Pipeline turning a raw color mask into the final mask.
+    :type denoise: DenoisePipeline
+    """
+
+    def __init__(
+        self,
+        image: np.ndarray,
+        segmenter: ColorSegmenter,
+        denoise: DenoisePipeline
+    ) -> None:
+        """
+        Initialize the FrameContext; nothing is computed yet.
+
+        :param image: BGR image of the frame.
+        :type image: np.ndarray
+        :param segmenter: Compiled color segmenter.
+        :type segmenter: ColorSegmenter
+        :param denoise: Pipeline turning a raw color mask into the final
+            mask.
+        :type denoise: DenoisePipeline
+        """
+        self.image: np.ndarray = image
+        self._segmenter: ColorSegmenter = segmenter
+        self._denoise: DenoisePipeline = denoise
+        self._lab: Optional[np.ndarray] = None
+        self._labels: Optional[np.ndarray] = None
+        self._masks: Dict[str, np.ndarray] = {}
+        self._scaled: Dict[float, "FrameContext"] = {}
+        # boxes with their padded boxes and the contexts of the padded boxes
+        self._crops: Optional[List[Tuple[Box, Box, "FrameContext"]]] = None
+
+    @property
+    def rois(self) -> Optional[List[Box]]:
+        """
+        The regions of interest, None if the whole frame is analysed.
+
+        :return: Boxes as (x_start, y_start, x_stop, y_stop).
+        :rtype: list[tuple] or None
+        """
+        if self._crops is None:
+            return None
+        return [box for box, _, _ in self._crops]
+
+    def set_rois(self, rois: Optional[List[Box]]) -> None:
+        """
+        Restrict the segmentation to the given regions of interest.
+
+        :param rois: Disjoint boxes as (x_start, y_start, x_stop, y_stop), or
+            None for the whole frame.
+        :type rois: list[tuple] or None
+        """
+        self._masks = {}
+        if rois is None:
+            self._crops = None
+            return
+        height, width = self.image.shape[:2]
+        radius = self._denoise.radius
+        self._crops = []
+        for box in rois:
+            padded = (max(box[0] - radius, 0), max(box[1] - radius, 0),
+                      min(box[2] + radius, width),
+                      min(box[3] + radius, height))
+            self._crops.append((box, padded, self.crop(padded)))
+
+    @property
+    def boxes(self) -> List[Box]:
+        """
+        The regions of interest; the whole frame if no regions are set.
+
+        :return: Boxes as (x_start, y_start, x_stop, y_stop).
+        :rtype: list[tuple]
+        """
+        if self._crops is None:
+            height, width = self.image.shape[:2]
+            return [(0, 0, width, height)]
+        return [box for box, _, _ in self._crops]
+
+    def crop(self, box: Box) -> "FrameContext":
+        """
+        Create the context of a part of the frame.
+
+        :param box: Box as (x_start, y_start, x_stop, y_stop).
+        :type box: tuple
+        :return: Context of the cropped image.
+        :rtype: FrameContext
+        """
+        x_start, y_start, x_stop, y_stop = box
+        return FrameContext(self.image[y_start:y_stop, x_start:x_stop],
+                            self._segmenter, self._denoise)
+
+    def scaled(self, scale: float) -> "FrameContext":
+        """
+        Get the context of a downscaled version of the frame.
+
+        :param scale: Scale factor, e.g. 0.25.
+        :type scale: float
+        :return: Context of the downscaled image.
+        :rtype: FrameContext
+        """
+        if scale not in self._scaled:
+            self._scaled[scale] = FrameContext(
+                cv2.resize(self.image, None, fx=scale, fy=scale,
+                           interpolation=cv2.INTER_AREA),
+                self._segmenter, self._denoise)
+        return self._scaled[scale]
+
+    @property
+    def lab(self) -> np.ndarray:
+        """
+        The frame converted to LAB color space.
+
+        :return: LAB image.
+        :rtype: np.ndarray
+        """
+        if self._lab is None:
+            self._lab = cv2.cvtColor(self.image, cv2.COLOR_BGR2LAB)
+        return self._lab
+
+    @property
+    def labels(self) -> np.ndarray:
+        """
+        The bit-packed label image of all colors.
+
+        :return: Label image, see :meth:`ColorSegmenter.classify`.
+        :rtype: np.ndarray
+        """
+        if self._labels is None:
+            self._labels = self._segmenter.classify(self.lab)
+        return self._labels
+
+    def get_raw_mask(self, color: str) -> np.ndarray:
+        """
+        Get the mask of a color before the denoising.
+
+        :param color: Color name or :data:`SHAPE_COLOR`.
+        :type color: str
+        :return: Binary mask.
+        :rtype: np.ndarray
+        :raises IndexError: If the color is not defined.
+        """
+        return self._segmenter.get_mask(self.labels, color)
+
+    def get_mask(self, color: str) -> np.ndarray:
+        """
+        Get the denoised mask of a color.
+
+        :param color: Color name or :data:`SHAPE_COLOR`.
+        :type color: str
+        :return: Binary mask.
+        :rtype: np.ndarray
+        :raises IndexError: If the color is not defined.
+        """
+        if color not in self._masks:
+            if self._crops is None:
+                self._masks[color] = self._denoise(
+                    self._segmenter.get_mask(self.labels, color))
+            else:
+                self._masks[color] = self._get_roi_mask(color)
+        return self._masks[color]
+
+    def _get_roi_mask(self, color: str) -> np.ndarray:
+        """
+        Denoise the padded regions of interest and combine them to the mask
+        of the frame.
+
+        :param color: Color name or :data:`SHAPE_COLOR`.
+        :type color: str
+        :return: Binary mask.
+        :rtype: np.ndarray
+        """
+        parts = []
+        histogram = np.zeros(256, dtype=np.int64)
+        for box, padded, crop in self._crops:
+            x_start, y_start, x_stop, y_stop = box
+            inner = (slice(y_start - padded[1], y_stop - padded[1]),
+                     slice(x_start - padded[0], x_stop - padded[0]))
+            prefiltered = self._denoise.prefilter(
+                self._segmenter.get_mask(crop.labels, color))
+            if self._denoise.has_otsu:
+                histogram += np.bincount(
+                    prefiltered[inner].ravel(), minlength=256)
+            parts.append((box, inner, prefiltered))
+
+        threshold = None
+        if self._denoise.has_otsu:
+            # the rest of the frame counts as empty
+            histogram[0] += self.image.shape[0] * self.image.shape[1] - \
+                histogram.sum()
+            threshold = otsu_threshold(histogram)
+        mask = np.zeros(self.image.shape[:2], dtype=np.uint8)
+        for (x_start, y_start, x_stop, y_stop), inner, prefiltered in parts:
+            mask[y_start:y_stop, x_start:x_stop] = self._denoise.finish(
+                prefiltered, threshold)[inner]
+        return mask
+
+    @property
+    def shape_mask(self) -> np.ndarray:
+        """
+        The denoised mask of the shape color.
+
+        :return: Binary mask.
+        :rtype: np.ndarray
+        """
+        return self.get_mask(SHAPE_COLOR)
@@ -1,16 +1,45 @@
 import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from multiprocessing import shared_memory
 import cv2
 import numpy as np
 from numpy.linalg import norm
-from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from typing import (
+    Any, Callable, Dict, Iterable, List, Optional, Tuple, Union)
 from payloadcomputerdroneprojekt.camera.abstract_class import AbstractCamera
 from payloadcomputerdroneprojekt.communications import Communications
 from payloadcomputerdroneprojekt.image_analysis.data_handler import DataHandler
 from payloadcomputerdroneprojekt.image_analysis.data_item import DataItem
+from payloadcomputerdroneprojekt.image_analysis.detection import Detection
+from payloadcomputerdroneprojekt.image_analysis.image_writer import \
+    ImageWriter
 import payloadcomputerdroneprojekt.image_analysis.math_helper as mh
+from payloadcomputerdroneprojekt.image_analysis.segmentation import \
+    ColorSegmenter, SHAPE_COLOR
+from payloadcomputerdroneprojekt.image_analysis.quality import QualityGate
+from payloadcomputerdroneprojekt.image_analysis.timing import \
+    DISABLED_TIMER, FrameTimer, TimingStats
+from payloadcomputerdroneprojekt.image_analysis.frame_context import \
+    FrameContext
+from payloadcomputerdroneprojekt.image_analysis.denoise import \
+    DenoisePipeline, DEFAULT_DENOISE
+import payloadcomputerdroneprojekt.image_analysis.roi as roi
+from payloadcomputerdroneprojekt.image_analysis.tracker import TargetTracker
+from payloadcomputerdroneprojekt.image_analysis.object_tracker import \
+    ObjectTracker
+import payloadcomputerdroneprojekt.image_analysis.worker as worker
 from payloadcomputerdroneprojekt.helper import smart_print as sp
 import time
 
+# counters of the capture loop, see ImageAnalysis.frame_stats; every captured
+# frame is counted once more as processed, dropped, skipped or rejected
+FRAME_STATS = ("captured", "processed", "dropped", "skipped", "late",
+               "rejected")
+
+# joins the dotted raw blobs of the coarse search
+COARSE_KERNEL = np.ones((5, 5), dtype=np.uint8)
+
 
 class ImageAnalysis:
     """
@@ -29,7 +58,8 @@ class ImageAnalysis:
         self,
         config: dict,
         camera: AbstractCamera,
-        comms: Communications
+        comms: Communications,
+        store_data: bool = True
     ) -> None:
         """
         Initialize the ImageAnalysis object.
@@ -40,14 +70,41 @@ class ImageAnalysis:
         :type camera: AbstractCamera
         :param comms: Communications object.
         :type comms: Communications
+        :param store_data: If False, no data handler is created, used by the
+            analysis worker processes.
+        :type store_data: bool
         """
         self._detected_objects: list = []
         self.config: dict = config
         self._camera: AbstractCamera = camera
         self._comms: Communications = comms
         self._task: Optional[asyncio.Task] = None
-        self._data_handler: DataHandler = DataHandler(config.setdefault(
-            "path", "data/images"))
+        self._data_handler: Optional[DataHandler] = None
+        if store_data:
+            writer: Optional[ImageWriter] = None
+            if config.get("image_writer_threads", 2) > 0:
+                writer = ImageWriter(config.get("image_writer_threads", 2),
+                                     config.get("image_writer_queue_size", 8))
+            self._data_handler = DataHandler(config.setdefault(
+                "path", "data/images"), writer, config.get("archive"),
+                config.get("memory_items", 100))
+
+        # frames are analysed in worker processes if configured, the results
+        # are stored in the order the frames were taken. The processes are
+        # started with the first frame and stopped by close.
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._workers: int = config.get("analysis_workers", 0)
+        self._in_flight: int = 0
+        # notified when a worker result is stored, only while capturing
+        self._slot_free: Optional[asyncio.Condition] = None
+        self._pending: Optional[asyncio.Future] = None
+        self.frame_stats: Dict[str, int] = dict.fromkeys(FRAME_STATS, 0)
+        self._quality: QualityGate = QualityGate(config)
+        # stage times of the frames, recorded into the data items
+        self._timing: bool = config.get("stage_timing", False)
+        self.timing_stats: TimingStats = TimingStats(
+            config.get("stage_timing_window", 100))
+        self._rejected: int = 0
 
         def convert_to_lab(val: list) -> np.ndarray:
             """
@@ -84,10 +141,26 @@ class ImageAnalysis:
             "upper": convert_to_lab(config["shape_color"]["upper"])
         }
 
-        self.shape_funcs: Dict[str, Callable[..., List[dict]]] = {
+        # all color ranges are compiled once so a frame is classified for
+        # every color and the shape color in a single pass
+        self._segmenter: ColorSegmenter = ColorSegmenter(
+            {**self.colors, SHAPE_COLOR: self.shape_color})
+        self._denoise: DenoisePipeline = DenoisePipeline(
+            config.get("denoise", DEFAULT_DENOISE))
+
+        self.shape_funcs: Dict[str, Callable[..., List[Detection]]] = {
             "Code": self._get_closest_code
         }
 
+        # only the predicted window of consecutive frames is searched while
+        # the target is tracked
+        self._tracker: Optional[TargetTracker] = None
+        if config.get("tracking", False):
+            self._tracker = TargetTracker(config.get("tracking_timeout", 1))
+
+        # objects found while scanning, updated with every stored frame
+        self._objects: ObjectTracker = ObjectTracker(config)
+
     def start_cam(self, images_per_second: float = 1.0) -> bool:
         """
         Start capturing and saving images asynchronously.
@@ -107,20 +180,53 @@ class ImageAnalysis:
             sp(f"Error starting the capture: {e}")
             return False
 
-    def stop_cam(self) -> bool:
+    async def stop_cam(self) -> bool:
         """
-        Stop capturing and saving images.
+        Stop capturing and saving images, waits until the frames in analysis
+        are stored and their images are written.
 
         :return: True if stopped successfully, False otherwise.
         :rtype: bool
         """
         try:
-            self._task.cancel()
+            if self._task is not None:
+                self._task.cancel()
+                await asyncio.wait([self._task])
+            if self._pending is not None:
+                await asyncio.wait([self._pending])
+            if self._data_handler is not None:
+                self._data_handler.flush()
             return True
         except Exception as e:
             sp(f"Error stopping the capture: {e}")
             return False
 
+    async def close(self) -> None:
+        """
+        Stop the capture, wait until the frames in analysis are stored and
+        stop the analysis worker processes. They are started again with the
+        next analysed frame.
+
+        :return: None
+        """
+        await self.stop_cam()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """
+        The pool of the analysis worker processes, created on first use.
+
+        :return: The process pool.
+        :rtype: ProcessPoolExecutor
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                self._workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=worker.init_worker, initargs=(self.config,))
+        return self._executor
+
     async def take_image(self) -> bool:
         """
         Take a single image asynchronously.
@@ -145,6 +251,8 @@ class ImageAnalysis:
             self._camera.start_camera()
             await asyncio.sleep(2)
         await self.image_loop()
+        if self._pending is not None:
+            await self._pending
 
     async def _async_analysis(self, images_per_second: float) -> None:
         """
@@ -161,20 +269,287 @@ class ImageAnalysis:
                f"using Standard images_per_second=1; {e}")
             images_per_second = 1.0
         interval: float = 1.0 / images_per_second
-        image_count: int = 0
-
+        policy: str = self.config.get("frame_drop_policy", "drop_oldest")
+        queue: asyncio.Queue = asyncio.Queue(
+            self.config.get("frame_queue_size", 2))
+        self.frame_stats = dict.fromkeys(FRAME_STATS, 0)
+
+        loop = asyncio.get_running_loop()
+        self._slot_free = asyncio.Condition()
+        consumer = asyncio.ensure_future(self._analysis_consumer(queue))
+        deadline: float = loop.time()
         try:
             while True:
-                sp(f"Current amount of images: {image_count}")
-                image_count += 1
                 try:
-                    await self.image_loop()
+                    timer = self._frame_timer()
+                    frame = (*await self._capture_frame(timer), timer)
+                    self.frame_stats["captured"] += 1
+                    if not queue.full():
+                        queue.put_nowait(frame)
+                    elif policy == "drop_newest":
+                        self.frame_stats["dropped"] += 1
+                    elif policy == "skip_analysis":
+                        self.frame_stats["skipped"] += 1
+                        self._pending = asyncio.ensure_future(
+                            self._store_skipped_frame(self._pending, *frame))
+                    else:
+                        queue.get_nowait()
+                        queue.task_done()
+                        self.frame_stats["dropped"] += 1
+                        queue.put_nowait(frame)
                 except Exception as e:
-                    sp(f"Error {e} on Image with count: {image_count}")
-                await asyncio.sleep(interval)
+                    sp(f"Error {e} on Image with count: "
+                       f"{self.frame_stats['captured']}")
+                sp(f"Frames: {self.frame_stats}")
+
+                # fixed rate ticks, a missed tick is not made up for
+                deadline += interval
+                now = loop.time()
+                if now > deadline:
+                    self.frame_stats["late"] += 1
+                    deadline = now
+                await asyncio.sleep(deadline - now)
         except asyncio.CancelledError:
+            consumer.cancel()
+            await asyncio.wait([consumer])
+            # frames still queued are not analysed anymore
+            while not queue.empty():
+                queue.get_nowait()
+                queue.task_done()
+                self.frame_stats["dropped"] += 1
+            self._slot_free = None
             sp("Capturing stopped.")
 
+    async def _analysis_consumer(self, queue: asyncio.Queue) -> None:
+        """
+        Analyse the frames of the capture queue one after another. The
+        analysis runs in the worker processes or in a thread, so the event
+        loop keeps capturing meanwhile and the queue fills up if the
+        analysis is slower than the capture.
+
+        Only frames handed to the analysis count as processed, frames
+        rejected by the quality gate are counted by it and a frame taken
+        from the queue but not analysed is counted as dropped.
+
+        :param queue: Queue of (image, position_data, timer) tuples.
+        :type queue: asyncio.Queue
+        :return: None
+        """
+        while True:
+            image, position_data, timer = await queue.get()
+            timer.lap("queue")
+            analysed = False
+            try:
+                if self._workers > 0:
+                    # wait for a free worker slot instead of skipping
+                    async with self._slot_free:
+                        await self._slot_free.wait_for(
+                            lambda: self._in_flight < 2 * self._workers)
+                    analysed = await self._analyse_captured(
+                        image, position_data, timer)
+                elif self._pass_quality_gate(image, position_data):
+                    timer.lap("quality")
+                    # stored by close even if the consumer is cancelled
+                    analysed = True
+                    await self._analyse_in_thread(
+                        image, position_data, position_data[2], timer)
+            except asyncio.CancelledError:
+                if not analysed:
+                    self.frame_stats["dropped"] += 1
+                raise
+            except Exception as e:
+                sp(f"Error {e} in frame analysis")
+                if not analysed:
+                    self.frame_stats["dropped"] += 1
+            finally:
+                if analysed:
+                    self.frame_stats["processed"] += 1
+                queue.task_done()
+
+    async def _analyse_in_thread(
+        self,
+        image: np.ndarray,
+        position_data: List[Any],
+        height: float,
+        timer: FrameTimer = DISABLED_TIMER
+    ) -> None:
+        """
+        Analyse a frame in a thread and wait until it is stored after the
+        frames before.
+
+        :param image: Image array.
+        :type image: np.array
+        :param position_data: Position (lat, lon, alt, ...).
+        :type position_data: list
+        :param height: Height value.
+        :type height: float
+        :param timer: Stage timer of the frame.
+        :type timer: FrameTimer
+        :return: None
+        """
+        future = asyncio.get_running_loop().run_in_executor(
+            None, self._analyse_frame, image, position_data, height, timer)
+        self._pending = asyncio.ensure_future(self._store_frame_result(
+            self._pending, future, image, position_data, height, None,
+            timer))
+        # not cancelled with the consumer, close waits for it
+        await asyncio.wait([self._pending])
+
+    async def _store_skipped_frame(
+        self,
+        previous: Optional[asyncio.Future],
+        image: np.ndarray,
+        position_data: List[Any],
+        timer: FrameTimer = DISABLED_TIMER
+    ) -> None:
+        """
+        Store a frame without analysing it, after the frames before.
+
+        :param previous: Storing of the frame before, if any.
+        :type previous: asyncio.Future or None
+        :param image: Image array.
+        :type image: np.array
+        :param position_data: Position (lat, lon, alt, ...).
+        :type position_data: list
+        :param timer: Stage timer of the frame.
+        :type timer: FrameTimer
+        :return: None
+        """
+        if previous is not None:
+            await asyncio.wait([previous])
+        await self._wait_for_writer(1)
+        timer.lap("queue")
+        with self._data_handler as item:
+            self._store_frame(
+                item, image, position_data, position_data[2],
+                {"objects": [], "images": {}}, timer)
+
+    async def _wait_for_writer(self, images: int) -> None:
+        """
+        Wait until the image writer can take the images of a frame, so
+        storing the frame does not block the event loop.
+
+        :param images: Number of images that are stored.
+        :type images: int
+        :return: None
+        """
+        writer = self._data_handler.archive.writer
+        if writer is not None:
+            await writer.wait_ready(images)
+
+    async def _capture_frame(
+        self,
+        timer: FrameTimer = DISABLED_TIMER
+    ) -> Tuple[np.ndarray, List[Any]]:
+        """
+        Take the current frame and the position interpolated at the time it
+        was taken.
+
+        :param timer: Stage timer of the frame.
+        :type timer: FrameTimer
+        :return: Tuple of (image, position_data).
+        :rtype: tuple
+        """
+        image, timestamp = self._camera.get_current_frame_with_time()
+        timer.lap("camera")
+        position_data: List[Any] = \
+            await self._comms.get_position_lat_lon_alt_at(timestamp)
+        timer.lap("telemetry")
+        return image, position_data
+
+    def _frame_timer(self) -> FrameTimer:
+        """
+        Timer of the stages of a new frame, a timer that records nothing if
+        ``stage_timing`` is disabled.
+
+        :return: The timer.
+        :rtype: FrameTimer
+        """
+        return FrameTimer() if self._timing else DISABLED_TIMER
+
+    def _record_timings(self, item: DataItem, timer: FrameTimer) -> None:
+        """
+        Record the stage times of a frame into its data item and the
+        rolling statistics.
+
+        :param item: Data item of the frame.
+        :type item: DataItem
+        :param timer: Stage timer of the frame.
+        :type timer: FrameTimer
+        :return: None
+        """
+        times = timer.result()
+        if times is None:
+            return
+        item.add_timings(times)
+        self.timing_stats.add(times)
+
+    async def _analyse_captured(
+        self,
+        image: np.ndarray,
+        position_data: List[Any],
+        timer: FrameTimer = DISABLED_TIMER
+    ) -> bool:
+        """
+        Analyse a captured frame, in the worker processes if configured.
+        Frames rejected by the quality gate are neither stored nor analysed.
+
+        :param image: Image array.
+        :type image: np.array
+        :param position_data: Position (lat, lon, alt, ...).
+        :type position_data: list
+        :param timer: Stage timer of the frame.
+        :type timer: FrameTimer
+        :return: True if the frame is analysed, False if it was rejected or
+            all workers are busy.
+        :rtype: bool
+        """
+        if not self._pass_quality_gate(image, position_data):
+            return False
+        timer.lap("quality")
+        if self._workers > 0:
+            return self._submit_frame(
+                image, position_data, position_data[2], timer)
+        self._image_sub_routine(
+            image, position_data, position_data[2], timer)
+        return True
+
+    def _pass_quality_gate(
+        self,
+        image: np.ndarray,
+        position_data: List[Any]
+    ) -> bool:
+        """
+        Check a frame with the quality gate. Of the rejected frames only
+        every ``rejected_record_every``-th is recorded, as a data item with
+        the position and the metrics but without images.
+
+        :param image: Image array.
+        :type image: np.array
+        :param position_data: Position (lat, lon, alt, ...).
+        :type position_data: list
+        :return: True if the frame should be analysed.
+        :rtype: bool
+        """
+        if not self._quality.enabled:
+            return True
+        metrics = self._quality.measure(image)
+        if (reason := self._quality.check(metrics)) is None:
+            return True
+
+        sp(f"Skipped Image; {reason} check failed")
+        self.frame_stats["rejected"] += 1
+        every: int = self.config.get("rejected_record_every", 1)
+        if every > 0 and self._rejected % every == 0 \
+                and self._data_handler is not None:
+            with self._data_handler as item:
+                item.add_image_position(position_data)
+                item.add_height(position_data[2])
+                item.add_quality(metrics["sharpness"])
+                item.add_rejected(reason, metrics)
+        self._rejected += 1
+        return False
+
     async def image_loop(self) -> None:
         """
         Main logic for per-frame image analysis.
@@ -182,22 +557,133 @@ class ImageAnalysis:
         :return: None
         """
         start_time: float = time.time()
-        image: np.ndarray = self._camera.get_current_frame()
-        position_data: List[Any] = await self._comms.get_position_lat_lon_alt()
-        if start_time - time.time() < 0.25:
-            self._image_sub_routine(image, position_data, position_data[2])
+        timer = self._frame_timer()
+        image, position_data = await self._capture_frame(timer)
+        if time.time() - start_time < 0.25:
+            await self._analyse_captured(image, position_data, timer)
         else:
             sp("skipped image")
 
+    def _submit_frame(
+        self,
+        image: np.ndarray,
+        position_data: List[Any],
+        height: float,
+        timer: FrameTimer = DISABLED_TIMER
+    ) -> bool:
+        """
+        Send a frame to the analysis worker processes. The frame is copied
+        once into shared memory instead of being pickled and the workers
+        store the result images themselves. The result is stored after the
+        results of all earlier frames.
+
+        :param image: Image array.
+        :type image: np.array
+        :param position_data: Position (lat, lon, alt, ...).
+        :type position_data: list
+        :param height: Height value.
+        :type height: float
+        :param timer: Stage timer of the frame.
+        :type timer: FrameTimer
+        :return: False if the frame was skipped because all workers are
+            busy.
+        :rtype: bool
+        """
+        if self._in_flight >= 2 * self._workers:
+            sp("skipped image; analysis busy")
+            return False
+        shm = shared_memory.SharedMemory(create=True, size=image.nbytes)
+        frame = np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)
+        frame[:] = image
+        self._in_flight += 1
+
+        # the result images are named after the data item
+        timestamp = int(time.time() * 100)
+        future = asyncio.get_running_loop().run_in_executor(
+            self._get_executor(), worker.analyse_shared_frame, shm.name,
+            image.shape, image.dtype.str, position_data, height,
+            self._timing, self._data_handler.path, str(timestamp))
+        self._pending = asyncio.ensure_future(self._store_frame_result(
+            self._pending, future, frame, position_data, height, timestamp,
+            timer, shm))
+        return True
+
+    async def _store_frame_result(
+        self,
+        previous: Optional[asyncio.Future],
+        future: asyncio.Future,
+        frame: np.ndarray,
+        position_data: List[Any],
+        height: float,
+        timestamp: Optional[int],
+        timer: FrameTimer = DISABLED_TIMER,
+        shm: Optional[shared_memory.SharedMemory] = None
+    ) -> None:
+        """
+        Wait for the analysis of a frame and store it once the frame before
+        is stored. The shared memory of a frame analysed by a worker is
+        released and its worker slot is freed afterwards. The stage
+        times of the worker are added to the timer prefixed with
+        ``worker.``, the ``worker`` stage is the whole time waited for the
+        result.
+
+        :param previous: Storing of the frame before, if any.
+        :type previous: asyncio.Future or None
+        :param future: Result of the worker process.
+        :type future: asyncio.Future
+        :param frame: The frame, backed by the shared memory if analysed by
+            a worker.
+        :type frame: np.array
+        :param position_data: Position (lat, lon, alt, ...).
+        :type position_data: list
+        :param height: Height value.
+        :type height: float
+        :param timestamp: Time of the data item in 1/100 seconds, now if
+            None.
+        :type timestamp: int or None
+        :param timer: Stage timer of the frame.
+        :type timer: FrameTimer
+        :param shm: Shared memory block of a frame analysed by a worker.
+        :type shm: shared_memory.SharedMemory or None
+        :return: None
+        """
+        try:
+            if previous is not None:
+                await asyncio.wait([previous])
+            try:
+                result = await future
+            except Exception as e:
+                sp(f"Error {e} in image analysis worker")
+                return
+            # raw and computed image and the result images
+            await self._wait_for_writer(len(result["images"]) + 2)
+            if shm is not None:
+                # the worker stages are part of the worker lap
+                timer.lap("worker")
+                timer.add(result.get("timings"), "worker.")
+            with self._data_handler.new_item(timestamp) as item:
+                self._store_frame(item, frame, position_data, height, result,
+                                  timer)
+        finally:
+            del frame
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+                self._in_flight -= 1
+                if self._slot_free is not None:
+                    async with self._slot_free:
+                        self._slot_free.notify_all()
+
     def _image_sub_routine(
         self,
         image: np.ndarray,
         position_data: List[Any],
-        height: float
+        height: float,
+        timer: FrameTimer = DISABLED_TIMER
     ) -> None:
         """
-        Process a single image: save, check quality, detect objects, and
-        annotate.
+        Process a single image that passed the quality gate: detect objects,
+        annotate and save.
 
         :param image: Image array.
         :type image: np.array
@@ -205,126 +691,310 @@ class ImageAnalysis:
         :type position_data: list
         :param height: Height value.
         :type height: float
+        :param timer: Stage timer of the frame.
+        :type timer: FrameTimer
         :return: None
         """
+        result = self._analyse_frame(image, position_data, height, timer)
         with self._data_handler as item:
-            item.add_image_position(position_data)
-            item.add_raw_image(image)
-            item.add_height(height)
-            if (quality := self.quality_of_image(
-                    image)) < self.config.get("threashold", -1):
-                sp("Skipped Image; Quality to low")
-                item.add_quality(quality)
-                return
-            if position_data[0] == 0:
-                return
-            objects, shape_image = self.compute_image(image, item, height)
-            item.add_objects(objects)
+            self._store_frame(item, image, position_data, height, result,
+                              timer)
 
-            loc_to_global: Callable[[float, float], Any] = mh.local_to_global(
-                position_data[0], position_data[1])
+    def _analyse_frame(
+        self,
+        image: np.ndarray,
+        position_data: List[Any],
+        height: float,
+        timer: FrameTimer = DISABLED_TIMER,
+        context: Optional[FrameContext] = None
+    ) -> Dict[str, Any]:
+        """
+        Detect and locate the objects of a single image and create the
+        debug images. The image is not modified, so this can
+        run in a worker process.
 
-            for obj in objects:
-                obj["shape"] = self.get_shape(obj, shape_image, height)
-                self.add_lat_lon(
-                    obj, position_data[3:6], height, shape_image.shape[:2],
-                    loc_to_global)
+        :param image: Image array.
+        :type image: np.array
+        :param position_data: Position (lat, lon, alt, ...).
+        :type position_data: list
+        :param height: Height value.
+        :type height: float
+        :param timer: Stage timer of the frame.
+        :type timer: FrameTimer
+        :param context: Frame context of the image, created if not given,
+            e.g. to use its masks afterwards.
+        :type context: FrameContext or None
+        :return: Dictionary with the detected objects and the images to save
+            by name.
+        :rtype: dict
+        """
+        result: Dict[str, Any] = {"objects": [], "images": {}}
+        if position_data[0] == 0:
+            return result
+        if context is None:
+            context = self.frame_context(image)
+        objects, shape_image = self.compute_image(
+            image, None, height, context, timer)
+        result["objects"] = objects
+        timer.lap("detection")
+
+        save_images = self.config.get("save_shape_image", False)
+        if save_images:
+            for color in self.colors.keys():
+                result["images"][color] = context.get_mask(color)
+            image = image.copy()
+            timer.lap("annotation")
+
+        loc_to_global: Callable[[float, float], Any] = mh.local_to_global(
+            position_data[0], position_data[1])
+        timer.lap("geolocation")
+
+        for obj in objects:
+            obj.shape = self.get_shape(obj, shape_image, height)
+            timer.lap("shape")
+            self.add_lat_lon(
+                obj, position_data[3:6], height, shape_image.shape[:2],
+                loc_to_global)
+            timer.lap("geolocation")
+            if save_images:
                 cv2.circle(
-                    image, (obj["x_center"], obj["y_center"]),
+                    image, (obj.x_center, obj.y_center),
                     5, (166, 0, 178), -1)
-                bounding_box = obj["bound_box"]
-                cv2.rectangle(image,
-                              (bounding_box["x_start"],
-                               bounding_box["y_start"]),
-                              (bounding_box["x_stop"],
-                               bounding_box["y_stop"]), (0, 255, 0), 2)
+                cv2.rectangle(image, (obj.x_start, obj.y_start),
+                              (obj.x_stop, obj.y_stop), (0, 255, 0), 2)
+                timer.lap("annotation")
+
+        if save_images:
+            result["images"]["computed_image"] = image
+            result["images"]["shape"] = shape_image
+        return result
+
+    def _store_frame(
+        self,
+        item: DataItem,
+        image: np.ndarray,
+        position_data: List[Any],
+        height: float,
+        result: Dict[str, Any],
+        timer: FrameTimer = DISABLED_TIMER
+    ) -> None:
+        """
+        Store a single image and the result of its analysis in a data item
+        and update the object tracks with its objects. With ``stage_timing``
+        the stage times of the frame are recorded as well.
 
-            if self.config.get("save_shape_image", False):
-                item.add_computed_image(image)
-                item.add_image(shape_image, "shape")
+        :param item: Data item of the image.
+        :type item: DataItem
+        :param image: Raw image array.
+        :type image: np.array
+        :param position_data: Position (lat, lon, alt, ...).
+        :type position_data: list
+        :param height: Height value.
+        :type height: float
+        :param result: Result of :meth:`_analyse_frame`, images already
+            stored by a worker are under ``stored_images``.
+        :type result: dict
+        :param timer: Stage timer of the frame.
+        :type timer: FrameTimer
+        :return: None
+        """
+        item.add_image_position(position_data)
+        item.add_raw_image(image)
+        item.add_height(height)
+        timer.lap("store_raw")
+        item.add_objects(result["objects"])
+        self._objects.update(result["objects"], item.time, height)
+        timer.lap("tracking")
+        for name, result_image in result["images"].items():
+            item.add_image(result_image, name,
+                           "mask" if result_image.ndim == 2 else "image")
+        for name, (filename, record) in \
+                result.get("stored_images", {}).items():
+            item.add_stored_image(name, filename, record)
+        timer.lap("store_images")
+        self._record_timings(item, timer)
+
+    def frame_context(self, image: np.ndarray) -> FrameContext:
+        """
+        Create the analysis context of a single frame.
+
+        :param image: Input image.
+        :type image: np.array
+        :return: Context caching the LAB image and the masks of the frame.
+        :rtype: FrameContext
+        """
+        return FrameContext(image, self._segmenter, self._denoise)
 
     def compute_image(self, image: np.ndarray, item: Optional[DataItem] = None,
-                      height: float = 1) -> Tuple[List[dict], np.ndarray]:
+                      height: float = 1,
+                      context: Optional[FrameContext] = None,
+                      timer: FrameTimer = DISABLED_TIMER
+                      ) -> Tuple[List[Detection], np.ndarray]:
         """
         Filter image for defined colors and detect objects.
 
         :param image: Input image.
         :type image: np.array
+        :param context: Frame context of the image, created if not given.
+        :type context: FrameContext or None
+        :param timer: Stage timer of the frame, the masks are computed in
+            the ``segmentation`` stage before the objects are detected.
+        :type timer: FrameTimer
         :return: Tuple of (list of detected objects, shape-filtered image).
-        :rtype: tuple[list[dict], np.array]
-        """
-        objects: List[dict] = []
-        filtered_images, shape_image = self.filter_colors(image)
-        for filtered_image in filtered_images:
-            self.detect_obj(objects, filtered_image, height=height)
+        :rtype: tuple[list[Detection], np.array]
+        """
+        if context is None:
+            context = self.frame_context(image)
+        self._set_coarse_rois(context, self.colors.keys(), height)
+        for color in self.colors.keys():
+            context.get_mask(color)
+        shape_image = context.shape_mask
+        timer.lap("segmentation")
+
+        objects: List[Detection] = []
+        for color in self.colors.keys():
+            self._detect_color(objects, context, color, height)
             if item is not None and self.config.get("save_shape_image", False):
-                item.add_image(filtered_image["filtered_image"],
-                               filtered_image["color"])
+                item.add_image(context.get_mask(color), color, "mask")
         return objects, shape_image
 
+    def _set_coarse_rois(
+        self,
+        context: FrameContext,
+        colors: Iterable[str],
+        height: float = 1
+    ) -> None:
+        """
+        Coarse-to-fine mode: search the colors on a downscaled version of the
+        frame and restrict the full resolution analysis to the padded boxes
+        of the blobs found there. Does nothing if ``coarse_scale`` is not
+        below 1 or the context already has regions of interest.
+
+        :param context: Frame context of the image.
+        :type context: FrameContext
+        :param colors: Color names to search for.
+        :type colors: iterable[str]
+        :param height: Height for the minimum blob size.
+        :type height: float
+        :return: None
+        """
+        scale = self.config.get("coarse_scale", 1)
+        if scale >= 1 or context.rois is not None:
+            return
+        if height <= 0:
+            height = 0.01
+
+        coarse = context.scaled(scale)
+        # blobs shrink through the denoising at the low resolution, so only
+        # half of the minimum diagonal is required there
+        min_diagonal = self.config.get(
+            "min_diagonal", 10) / height * scale / 2
+        # thin or dotted blobs vanish in the denoising at the low resolution,
+        # so the dilated raw masks are searched as well
+        boxes = [roi.mask_boxes(cv2.bitwise_or(
+            coarse.get_mask(color),
+            cv2.dilate(coarse.get_raw_mask(color), COARSE_KERNEL)),
+            min_diagonal) for color in colors]
+        if len(boxes) == 0:
+            context.set_rois([])
+            return
+        context.set_rois(roi.merge_boxes(roi.scale_boxes(
+            np.concatenate(boxes), 1 / scale,
+            self.config.get("coarse_padding", 16), context.image.shape[:2])))
+
+    def _detect_color(
+        self,
+        objects: List[Detection],
+        context: FrameContext,
+        color: str,
+        height: float = 1
+    ) -> None:
+        """
+        Detect the objects of one color in every region of interest of the
+        frame and append them to objects list.
+
+        :param objects: List to append detected objects.
+        :type objects: list[Detection]
+        :param context: Frame context of the image.
+        :type context: FrameContext
+        :param color: Color name.
+        :type color: str
+        :param height: Minimum height for object detection.
+        :type height: float
+        :return: None
+        """
+        mask = context.get_mask(color)
+        for x_start, y_start, x_stop, y_stop in context.boxes:
+            self.detect_obj(
+                objects, {"color": color,
+                          "filtered_image": mask[y_start:y_stop,
+                                                 x_start:x_stop]},
+                height=height, offset=(x_start, y_start))
+
     def detect_obj(
         self,
-        objects: List[dict],
+        objects: List[Detection],
         filtered_image: Dict[str, Any],
-        height: float = 1
+        height: float = 1,
+        offset: Tuple[int, int] = (0, 0)
     ) -> None:
         """
         Detect objects in a filtered image and append to objects list.
 
         :param objects: List to append detected objects.
-        :type objects: list[dict]
+        :type objects: list[Detection]
         :param filtered_image: Dictionary with color and filtered image.
         :type filtered_image: dict
         :param height: Minimum height for object detection.
         :type height: float
+        :param offset: Position (x, y) of the filtered image in the frame, if
+            it is only a part of it.
+        :type offset: tuple
         :return: None
         """
         if height <= 0:
             height = 0.01
 
         gray: np.ndarray = filtered_image["filtered_image"]
+        min_diagonal = self.config.get("min_diagonal", 10) / height
+        epsilon_factor = self.config.get("approx_poly_epsilon", 0.04)
+        strong_bounding_check = self.config.get(
+            "strong_bounding_check", False)
+
+        if self.config.get("detect_backend", "components") == "components":
+            # the box of the polygon lies inside the box of its component,
+            # so components that are too small are dropped before the
+            # contours are traced
+            gray = roi.remove_small_blobs(gray, min_diagonal)
+            if gray is None:
+                return
 
         contours, _ = cv2.findContours(
-            gray, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            gray, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE,
+            offset=tuple(int(v) for v in offset))
         for contour in contours:
-            epsilon = self.config.get("approx_poly_epsilon", 0.04
-                                      ) * cv2.arcLength(contour, True)
+            epsilon = epsilon_factor * cv2.arcLength(contour, True)
             approx = cv2.approxPolyDP(contour, epsilon, True)
             x, y, w, h = cv2.boundingRect(approx)
-            if (w**2 + h**2) < (self.config.get("min_diagonal", 10) / height
-                                )**2:
+            if (w**2 + h**2) < min_diagonal**2:
                 continue
-            x_center = x + (w // 2)
-            y_center = y + (h // 2)
 
-            if self.config.get("strong_bounding_check", False):
+            if strong_bounding_check:
                 if len(approx) != 4:
                     continue
             else:
                 if len(approx) > 16:
                     continue
-            objects.append({
-                "color": filtered_image["color"],
-                "bound_box": {
-                    "x_start": x,
-                    "x_stop": x+w,
-                    "y_start": y,
-                    "y_stop": y+h
-                },
-                "x_center": x_center,
-                "y_center": y_center
-            })
-            if len(approx) == 4:
-                objects[-1]["contour"] = [[int(coord)
-                                           for coord in pt[0]]
-                                          for pt in approx]
-
-    def _get_shrunk_subframe(self, bounding_box: dict,
+            objects.append(Detection(
+                filtered_image["color"], x, y, x+w, y+h,
+                approx.reshape(4, 2) if len(approx) == 4 else None))
+
+    def _get_shrunk_subframe(self, obj: Detection,
                              image: np.ndarray) -> np.ndarray:
         """
         Get a subframe of the image, shrunk by a configurable percentage.
-        :param bounding_box: Bounding box dictionary.
-        :type bounding_box: dict
+        :param obj: Detected object.
+        :type obj: Detection
         :param image: Input image.
         :type image: np.array
         :return: Subframe of the image.
@@ -332,10 +1002,10 @@ class ImageAnalysis:
         """
         shrink_percent = self.config.get(
             "bounding_box_shrink_percentage", 0)
-        x_start = bounding_box["x_start"]
-        x_stop = bounding_box["x_stop"]
-        y_start = bounding_box["y_start"]
-        y_stop = bounding_box["y_stop"]
+        x_start = obj.x_start
+        x_stop = obj.x_stop
+        y_start = obj.y_start
+        y_stop = obj.y_stop
         w = x_stop - x_start
         h = y_stop - y_start
         dx = int(w * shrink_percent / 2)
@@ -350,29 +1020,33 @@ class ImageAnalysis:
 
     def get_shape(
         self,
-        obj: dict,
-        shape_image: np.ndarray,
-        height: float = 1
+        obj: Detection,
+        shape_image: Optional[np.ndarray],
+        height: float = 1,
+        context: Optional[FrameContext] = None
     ) -> Union[str, bool]:
         """
         Detect the shape inside the object boundaries.
 
-        :param obj: Object dictionary.
-        :type obj: dict
-        :param shape_image: Shape-filtered image.
-        :type shape_image: np.array
+        :param obj: Detected object.
+        :type obj: Detection
+        :param shape_image: Shape-filtered image, taken from the context if
+            None.
+        :type shape_image: np.array or None
         :param height: Minimum height for shape detection.
         :type height: float
+        :param context: Frame context of the image.
+        :type context: FrameContext or None
         :return: Shape name ("Dreieck", "Rechteck", "Kreis") or False.
         :rtype: str or bool
         """
         if height <= 0:
             height = 0.01
-
-        bounding_box = obj["bound_box"]
+        if shape_image is None:
+            shape_image = context.shape_mask
 
         # Shrink bounding box by a configurable percentage (default 0%)
-        gray, *_ = self._get_shrunk_subframe(bounding_box, shape_image)
+        gray, *_ = self._get_shrunk_subframe(obj, shape_image)
         if gray.shape[0] < 5 or gray.shape[1] < 5:
             return False
 
@@ -417,99 +1091,151 @@ class ImageAnalysis:
 
     def find_code(
         self,
-        obj: dict,
-        shape_image: np.ndarray,
-        height: float = 1
+        obj: Detection,
+        shape_image: Optional[np.ndarray],
+        height: float = 1,
+        context: Optional[FrameContext] = None,
+        elements: Optional[np.ndarray] = None
     ) -> bool:
         """
-        Find code elements (e.g., QR code-like) inside the object.
+        Find code elements (e.g., QR code-like) inside the object. The three
+        elements forming the code marker are stored in ``obj.code`` ordered
+        as top left, bottom left and top right, with the confidence of the
+        marker in ``obj.code_confidence``.
 
-        :param obj: Object dictionary.
-        :type obj: dict
-        :param shape_image: Shape-filtered image.
-        :type shape_image: np.array
+        :param obj: Detected object.
+        :type obj: Detection
+        :param shape_image: Shape-filtered image, taken from the context if
+            None.
+        :type shape_image: np.array or None
         :param height: Minimum height for code element detection.
         :type height: float
+        :param context: Frame context of the image.
+        :type context: FrameContext or None
+        :param elements: Code elements of the whole frame, see
+            :meth:`find_code_elements`. Searched in the object if None.
+        :type elements: np.array or None
         :return: True if code found, False otherwise.
         :rtype: bool
         """
-        if height <= 0:
-            height = 0.01
-
-        bounding_box = obj["bound_box"]
+        if shape_image is None:
+            shape_image = context.shape_mask
 
         subframe, x_start, y_start = self._get_shrunk_subframe(
-            bounding_box, shape_image)
+            obj, shape_image)
         if subframe.shape[0] < 5 or subframe.shape[1] < 5:
             return False
+        if elements is None:
+            elements = self.find_code_elements(
+                subframe, height, (x_start, y_start))
+        else:
+            centers = elements[:, :2] + elements[:, 2:] // 2
+            elements = elements[
+                (centers[:, 0] >= x_start)
+                & (centers[:, 0] < x_start + subframe.shape[1])
+                & (centers[:, 1] >= y_start)
+                & (centers[:, 1] < y_start + subframe.shape[0])]
+
+        marker = mh.find_code_marker(
+            elements[:, :2] + elements[:, 2:] / 2,
+            norm(elements[:, 2:], axis=1))
+        if marker is None or marker[1] < self.config.get(
+                "min_code_confidence", 0):
+            return False
+        obj.code = [{"x": int(x), "y": int(y), "w": int(w), "h": int(h),
+                     "d": int(w**2 + h**2)}
+                    for x, y, w, h in elements[marker[0]]]
+        obj.code_confidence = marker[1]
+        return True
+
+    def find_code_elements(
+        self,
+        shape_image: np.ndarray,
+        height: float = 1,
+        offset: Tuple[int, int] = (0, 0)
+    ) -> np.ndarray:
+        """
+        Find the candidate code elements, the quadrilateral blobs of the
+        shape mask, in a single contour pass.
+
+        :param shape_image: Shape-filtered image.
+        :type shape_image: np.array
+        :param height: Minimum height for code element detection.
+        :type height: float
+        :param offset: Position of the image in the frame, added to the
+            element positions.
+        :type offset: tuple[int, int]
+        :return: Array of shape (N, 4) with x, y, w and h of the bounding
+            boxes of the elements.
+        :rtype: np.array
+        """
+        if height <= 0:
+            height = 0.01
+        min_diagonal = self.config.get("min_diagonal_code_element", 1) / height
+        epsilon = self.config.get("approx_poly_epsilon", 0.04)
 
         contours, _ = cv2.findContours(
-            subframe, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        code_elements: List[Dict[str, Any]] = []
+            shape_image, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE,
+            offset=offset)
+        elements: List[Tuple[int, int, int, int]] = []
         for contour in contours:
-            epsilon = self.config.get("approx_poly_epsilon", 0.04
-                                      ) * cv2.arcLength(contour, True)
-            approx = cv2.approxPolyDP(contour, epsilon, True)
+            approx = cv2.approxPolyDP(
+                contour, epsilon * cv2.arcLength(contour, True), True)
             x, y, w, h = cv2.boundingRect(approx)
-            if (w**2 + h**2) < (self.config.get("min_diagonal_code_element",
-                                                1) / height)**2:
-                continue
-            if len(approx) == 4:
-                code_elements.append(
-                    {"x": x_start+x, "y": y_start+y,
-                     "w": w, "h": h, "d": (w**2 + h**2)})
-
-        if len(code_elements) < 3:
-            return False
-        if len(code_elements) == 3:
-            obj["code"] = code_elements
-        else:
-            obj["code"] = sorted(
-                code_elements, key=lambda x: x["d"], reverse=True)[:3]
-        return True
+            if len(approx) == 4 and w**2 + h**2 >= min_diagonal**2:
+                elements.append((x, y, w, h))
+        return np.array(elements, dtype=np.int64).reshape(-1, 4)
 
     def filter_colors(
         self,
-        image: np.ndarray
+        image: np.ndarray,
+        context: Optional[FrameContext] = None
     ) -> Tuple[List[Dict[str, Any]], np.ndarray]:
         """
         Filter the image for each defined color and for the shape color.
 
         :param image: Input image.
         :type image: np.array
+        :param context: Frame context of the image, created if not given.
+        :type context: FrameContext or None
         :return: Tuple of (list of color-filtered dicts, shape-filtered image).
         :rtype: tuple[list[dict], np.array]
         """
+        if context is None:
+            context = self.frame_context(image)
         filtered_color_images: List[Dict[str, Any]] = []
-        lab_image = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
-        shape_mask = self._filter_color(
-            lab_image, self.shape_color)
-        for name, elements in self.colors.items():
+        for name in self.colors.keys():
             filtered_color_images.append(
                 {"color": name,
-                 "filtered_image": self._filter_color(
-                     lab_image, elements)})
+                 "filtered_image": context.get_mask(name)})
 
-        return filtered_color_images, shape_mask
+        return filtered_color_images, context.shape_mask
 
-    def filter_shape_color(self, image: np.ndarray) -> np.ndarray:
+    def filter_shape_color(
+        self,
+        image: np.ndarray,
+        context: Optional[FrameContext] = None
+    ) -> np.ndarray:
         """
         Filter the image for the shape color.
 
         :param image: Input image.
         :type image: np.array
+        :param context: Frame context of the image, created if not given.
+        :type context: FrameContext or None
         :return: Shape-filtered image.
         :rtype: np.array
         """
-        lab_image = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
-        return self._filter_color(
-            lab_image, self.shape_color)
+        if context is None:
+            context = self.frame_context(image)
+        return context.shape_mask
 
     def filter_color(
         self,
         image: np.ndarray,
         color: str,
-        shape_mask: Optional[np.ndarray] = None
+        shape_mask: Optional[np.ndarray] = None,
+        context: Optional[FrameContext] = None
     ) -> np.ndarray:
         """
         Filter the image for a specific color.
@@ -518,8 +1244,10 @@ class ImageAnalysis:
         :type image: np.array
         :param color: Color name (must be in defined colors).
         :type color: str
-        :param shape_mask: Optional shape mask to apply.
+        :param shape_mask: Unused, kept for compatibility.
         :type shape_mask: np.array or None
+        :param context: Frame context of the image, created if not given.
+        :type context: FrameContext or None
         :return: Filtered image.
         :rtype: np.array
         :raises IndexError: If color is not defined.
@@ -527,11 +1255,9 @@ class ImageAnalysis:
         if color not in self.colors.keys():
             raise IndexError(
                 f"the color {color} is not defined in the color list")
-        lab_image = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
-        if shape_mask is not None:
-            shape_mask = self._filter_color(
-                lab_image, self.shape_color)
-        return self._filter_color(lab_image, self.colors[color])
+        if context is None:
+            context = self.frame_context(image)
+        return context.get_mask(color)
 
     def _filter_color(
         self,
@@ -546,8 +1272,6 @@ class ImageAnalysis:
         :type lab: np.array
         :param elements: Color bounds (dict or list of dicts).
         :type elements: dict or list
-        :param shape_mask: Optional shape mask.
-        :type shape_mask: np.array or None
         :return: Filtered image.
         :rtype: np.array
         """
@@ -560,24 +1284,7 @@ class ImageAnalysis:
             mask = cv2.bitwise_or(masks[0], masks[1])
         else:
             mask = cv2.inRange(lab, elements["lower"], elements["upper"])
-
-        blurred = cv2.GaussianBlur(mask, (15, 15), 0)
-
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (15, 15))
-        denoised_mask = cv2.morphologyEx(blurred, cv2.MORPH_OPEN,
-                                         kernel)
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (7, 7))
-        denoised_mask = cv2.morphologyEx(denoised_mask, cv2.MORPH_OPEN,
-                                         kernel)
-
-        denoised_mask = cv2.morphologyEx(denoised_mask, cv2.MORPH_CLOSE,
-                                         kernel)
-
-        blurred = cv2.GaussianBlur(mask, (7, 7), 0)
-
-        _, thresh_mask = cv2.threshold(
-            blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        return thresh_mask
+        return self._denoise(mask)
 
     async def get_current_offset_closest(
         self,
@@ -603,6 +1310,7 @@ class ImageAnalysis:
         if not self._camera.is_active:
             self._camera.start_camera()
             await asyncio.sleep(2)
+        timer = self._frame_timer()
         with self._data_handler as item:
             position = await self._comms.get_position_xyz()
             if indoor:
@@ -615,13 +1323,19 @@ class ImageAnalysis:
                 sp(f"Warning: detected_alt below 0 ({relative_height:.2f}),"
                    " clamping to 0")
                 relative_height = 0.001
+            timer.lap("telemetry")
 
             image = self._camera.get_current_frame()
+            timer.lap("camera")
             item.add_image_position(position)
             item.add_raw_image(image)
             item.add_height(relative_height)
-            return self._get_current_offset_closest(
+            timer.lap("store_raw")
+            result = self._get_current_offset_closest(
                 position, relative_height, image, color, shape, yaw_zero, item)
+            timer.lap("detection")
+            self._record_timings(item, timer)
+            return result
 
     def _get_current_offset_closest(
         self,
@@ -651,36 +1365,113 @@ class ImageAnalysis:
         :return: Tuple (offset [x, y], height, yaw offset).
         :rtype: tuple or (None, None, None) if not found
         """
-        closest_obj = self.get_closest_element(image, color, shape, item,
-                                               height=relative_height)
+        context = self.frame_context(image)
+        closest_obj = None
+        target = f"{color}/{shape}"
+        if self._tracker is not None and self._tracker.is_tracking(target):
+            window = self._predict_roi(position, relative_height,
+                                       image.shape[:2])
+            if window is not None:
+                context.set_rois([window])
+                closest_obj = self.get_closest_element(
+                    image, color, shape, item, height=relative_height,
+                    context=context)
+                if closest_obj is not None and roi.touches_border(
+                        closest_obj.bound_box, window, image.shape[:2]):
+                    closest_obj = None
+                if closest_obj is None:
+                    # target lost, search the whole frame again
+                    context.set_rois(None)
+        if closest_obj is None:
+            closest_obj = self.get_closest_element(
+                image, color, shape, item, height=relative_height,
+                context=context)
         if closest_obj is None:
+            if self._tracker is not None:
+                self._tracker.reset()
             return None, None, None
+        if self._tracker is not None:
+            self._tracker.update(target, closest_obj.bound_box, position,
+                                 relative_height)
         item.add_objects([closest_obj])
         if yaw_zero:
             position[5] = 0
 
-        if "code" in closest_obj.keys():
+        if closest_obj.code is not None:
             return self._get_height_estimate_yaw(
                 closest_obj, position[3:6], relative_height, image.shape[:2])
         pos_out = self._get_height_estimate(
             closest_obj, position[3:6], relative_height, image.shape[:2])
         return [float(pos_out[0]), float(pos_out[1])], float(pos_out[2]), 0
 
+    def _predict_roi(
+        self,
+        position: List[float],
+        relative_height: float,
+        image_shape: Tuple[int, int]
+    ) -> Optional[roi.Box]:
+        """
+        Predict the window the tracked target is seen in on the current
+        frame. The corners of its last bounding box are projected to the
+        ground with the pose of the last frame and back into the image with
+        the current pose, so the movement and the attitude change of the
+        drone are taken into account.
+
+        :param position: Current drone position (xyz) and attitude.
+        :type position: list[float]
+        :param relative_height: Current relative height.
+        :type relative_height: float
+        :param image_shape: Image shape (height, width).
+        :type image_shape: tuple
+        :return: Box as (x_start, y_start, x_stop, y_stop) or None if the
+            target is not expected in the frame.
+        :rtype: tuple or None
+        """
+        last = self._tracker
+        box = last.bound_box
+        corners = self._get_local_offsets(
+            [(x, y) for x in (box["x_start"], box["x_stop"])
+             for y in (box["y_start"], box["y_stop"])],
+            last.position[3:6], last.height, image_shape)
+        pixels: List[Tuple[float, float]] = []
+        for local in corners:
+            pixel = self._get_pixel(
+                [local[0] + last.position[0] - position[0],
+                 local[1] + last.position[1] - position[1],
+                 relative_height],
+                position[3:6], image_shape)
+            if pixel is None:
+                return None
+            pixels.append(pixel)
+
+        xs, ys = zip(*pixels)
+        margin = self.config.get("tracking_margin", 0.5) * max(
+            max(xs) - min(xs), max(ys) - min(ys))
+        window = roi.scale_boxes(
+            [[min(xs) - margin, min(ys) - margin,
+              max(xs) + margin, max(ys) + margin]],
+            1, 0, image_shape)[0]
+        if window[2] <= window[0] or window[3] <= window[1]:
+            return None
+        return tuple(int(v) for v in window)
+
     def _get_height_estimate_yaw(
         self,
-        obj: dict,
+        obj: Detection,
         rotation: Union[List[float], np.ndarray],
         height_start: float,
         image_shape: Tuple[int, int]
     ) -> Tuple[List[float], float, float]:
         """
-        Estimate height and yaw using code elements.
+        Estimate height and yaw using code elements. The height is solved in
+        closed form from the left and top side of the code, the RMS of their
+        residuals is stored in ``obj.h_residual``.
 
-        :param obj: Object dictionary with code.
-        :type obj: dict
+        :param obj: Detected object with code.
+        :type obj: Detection
         :param rotation: Rotation vector.
         :type rotation: list or np.array
-        :param height_start: Initial height.
+        :param height_start: Height used if the sides can not be projected.
         :type height_start: float
         :param image_shape: Image shape.
         :type image_shape: tuple
@@ -688,35 +1479,24 @@ class ImageAnalysis:
         :rtype: tuple
         """
         code_side_length = self.config.get("length_code_side", 0.5)
-        height = height_start
-        top_left, bottom_left, top_right = mh.find_relative_position(
-            [(c["x"]+c["w"]/2, c["y"]+c["h"]/2, 0) for c in obj["code"]])
-        for _ in range(5):
-            top_left_pos = self._get_local_offset(
-                top_left[:2], rotation, height, image_shape)
-            bottom_left_pos = self._get_local_offset(
-                bottom_left[:2], rotation, height, image_shape)
-            top_right_pos = self._get_local_offset(
-                top_right[:2], rotation, height, image_shape)
-
-            left = norm(np.array(bottom_left_pos) - np.array(top_left_pos))
-            top = norm(np.array(top_right_pos) - np.array(top_left_pos))
-
-            height = height*(code_side_length/((left + top) / 2))
-
-        top_left_pos = self._get_local_offset(
-            top_left[:2], rotation, height, image_shape)
-        bottom_left_pos = self._get_local_offset(
-            bottom_left[:2], rotation, height, image_shape)
-        top_right_pos = self._get_local_offset(
-            top_right[:2], rotation, height, image_shape)
-
-        left = norm(np.array(bottom_left_pos) - np.array(top_left_pos))
-        top = norm(np.array(top_right_pos) - np.array(top_left_pos))
+        # obj.code is ordered as top left, bottom left and top right
+        pixels = [(c["x"]+c["w"]/2, c["y"]+c["h"]/2) for c in obj.code]
+        top_left, bottom_left, _ = pixels
+        directions, origin = self._get_ground_rays(
+            pixels, rotation, image_shape)
+
+        # left and top side at a height of 1, scaled by their mean length
+        sides = norm(directions[1:] - directions[0], axis=1)
+        height, _ = mh.estimate_height([np.mean(sides)], code_side_length)
+        if not np.isfinite(height):
+            height = height_start
+        residuals = height * sides - code_side_length
+        _, bottom_left_pos, top_right_pos = directions * height + origin
 
         pos = (bottom_left_pos + top_right_pos)[:2]
 
-        obj["h"] = height
+        obj.h = height
+        obj.h_residual = float(np.sqrt(np.mean(residuals**2)))
 
         return [float(pos[0]), float(pos[1])
                 ], float(height), -mh.compute_rotation_angle(
@@ -724,16 +1504,18 @@ class ImageAnalysis:
 
     def _get_height_estimate(
         self,
-        obj: dict,
+        obj: Detection,
         rotation: Union[List[float], np.ndarray],
         height_start: float,
         image_shape: Tuple[int, int]
     ) -> np.ndarray:
         """
-        Estimate height using object contour and known box sizes.
+        Estimate height using object contour and known box sizes. The height
+        is solved in closed form from the sides of the contour, the RMS of
+        their residuals is stored in ``obj.h_residual``.
 
-        :param obj: Object dictionary.
-        :type obj: dict
+        :param obj: Detected object.
+        :type obj: Detection
         :param rotation: Rotation vector.
         :type rotation: list or np.array
         :param height_start: Initial height.
@@ -745,32 +1527,28 @@ class ImageAnalysis:
         """
         short_side_length = self.config.get("length_box_short_side", 0.4)
         long_side_length = self.config.get("length_box_long_side", 0.6)
-        height = height_start
 
-        if "contour" not in obj.keys():
+        if obj.contour is None:
             return self._get_local_offset(
-                (obj["x_center"], obj["y_center"]),#
-                rotation, height, image_shape)
-        
-        for _ in range(3):
-            points: List[np.ndarray] = []
-            for point in obj["contour"]:
-                points.append(self._get_local_offset(
-                    point[:2], rotation, height, image_shape))
-            short_sides, long_sides = mh.find_shortest_longest_sides(points)
-
-            c = 0.0
-            for s in short_sides:
-                c += short_side_length/s
-
-            for s in long_sides:
-                c += long_side_length/s
-
-            height = height*c/(len(short_sides)+len(long_sides))
-        obj["h"] = height
-
-        return self._get_local_offset(
-            (obj["x_center"], obj["y_center"]), rotation, height, image_shape)
+                (obj.x_center, obj.y_center), rotation, height_start,
+                image_shape)
+
+        # the contour and the center in one projection
+        directions, origin = self._get_ground_rays(
+            np.vstack([obj.contour, [[obj.x_center, obj.y_center]]]),
+            rotation, image_shape)
+        short_sides, long_sides = mh.find_shortest_longest_sides(
+            list(directions[:-1]))
+        height, residuals = mh.estimate_height(
+            [*short_sides, *long_sides],
+            [short_side_length] * len(short_sides)
+            + [long_side_length] * len(long_sides))
+        if not np.isfinite(height):
+            height = height_start
+        obj.h = height
+        obj.h_residual = float(np.sqrt(np.mean(residuals**2)))
+
+        return directions[-1] * height + origin
 
     def get_closest_element(
         self,
@@ -778,8 +1556,9 @@ class ImageAnalysis:
         color: str,
         shape: Optional[str],
         item: Optional[DataItem] = None,
-        height: float = 1
-    ) -> Optional[dict]:
+        height: float = 1,
+        context: Optional[FrameContext] = None
+    ) -> Optional[Detection]:
         """
         Get the closest detected object of a given color and shape.
 
@@ -789,17 +1568,20 @@ class ImageAnalysis:
         :type color: str
         :param shape: Shape name.
         :type shape: str
-        :return: Closest object dictionary or None.
-        :rtype: dict or None
-        """
-        computed_image: Dict[str, Any] = {"color": color}
-        shape_image = self.filter_shape_color(image)
-        computed_image["filtered_image"] = self.filter_color(
-            image, color, shape_image)
-        item.add_computed_image(computed_image["filtered_image"])
-
-        objects: List[dict] = []
-        self.detect_obj(objects, computed_image, height=height)
+        :param context: Frame context of the image, created if not given.
+        :type context: FrameContext or None
+        :return: Closest detected object or None.
+        :rtype: Detection or None
+        """
+        if context is None:
+            context = self.frame_context(image)
+        self._set_coarse_rois(context, [color], height)
+        shape_image = self.filter_shape_color(image, context)
+        item.add_computed_image(self.filter_color(
+            image, color, context=context), "mask")
+
+        objects: List[Detection] = []
+        self._detect_color(objects, context, color, height)
         if shape is not None:
             if shape in self.shape_funcs:
                 relevant_objects = self.shape_funcs["Code"](
@@ -818,19 +1600,19 @@ class ImageAnalysis:
 
         image_size = shape_image.shape[:2]
 
-        def diag(obj: dict) -> float:
-            return (obj["x_start"] - image_size[1]/2)**2 + \
-                   (obj["y_start"] - image_size[1]/2)**2
+        def diag(obj: Detection) -> float:
+            return (obj.x_start - image_size[1]/2)**2 + \
+                   (obj.y_start - image_size[1]/2)**2
 
         return sorted(relevant_objects, key=diag)[0]
 
     def _get_correct_shape(
         self,
-        objects: List[dict],
+        objects: List[Detection],
         shape_image: np.ndarray,
         shape: str,
         height: float = 1
-    ) -> List[dict]:
+    ) -> List[Detection]:
         """
         Filter objects by matching shape.
 
@@ -843,7 +1625,7 @@ class ImageAnalysis:
         :return: List of objects with matching shape.
         :rtype: list
         """
-        relevant_objects: List[dict] = []
+        relevant_objects: List[Detection] = []
         for obj in objects:
             if self.get_shape(obj, shape_image, height) == shape:
                 relevant_objects.append(obj)
@@ -851,11 +1633,11 @@ class ImageAnalysis:
 
     def _get_closest_code(
         self,
-        objects: List[dict],
+        objects: List[Detection],
         shape_image: np.ndarray,
         shape: str,
         height: float = 1
-    ) -> List[dict]:
+    ) -> List[Detection]:
         """
         Filter objects by presence of code.
 
@@ -868,9 +1650,13 @@ class ImageAnalysis:
         :return: List of objects with code detected.
         :rtype: list
         """
-        relevant_objects: List[dict] = []
+        # a single contour pass for all objects once there are several
+        elements: Optional[np.ndarray] = None
+        if len(objects) > 1:
+            elements = self.find_code_elements(shape_image, height)
+        relevant_objects: List[Detection] = []
         for obj in objects:
-            if self.find_code(obj, shape_image, height):
+            if self.find_code(obj, shape_image, height, elements=elements):
                 relevant_objects.append(obj)
         return relevant_objects
 
@@ -884,6 +1670,28 @@ class ImageAnalysis:
         return self._data_handler.get_filterd_items(
             self.config.get("distance_objs", 5))
 
+    def get_tracks(
+        self,
+        color: Optional[str] = None,
+        shape: Optional[str] = None,
+        min_confidence: float = 0
+    ) -> List[dict]:
+        """
+        Get the live object tracks, updated with every analysed frame,
+        without clustering all stored objects.
+
+        :param color: Only tracks of this color if given.
+        :type color: str or None
+        :param shape: Only tracks of this shape if given.
+        :type shape: str or None
+        :param min_confidence: Minimum confidence of the tracks.
+        :type min_confidence: float
+        :return: Tracks with position (lat, lon and pos), confidence and best
+            observation, the most confident first.
+        :rtype: list[dict]
+        """
+        return self._objects.tracks(color, shape, min_confidence)
+
     def get_matching_objects(
         self,
         color: str,
@@ -946,7 +1754,7 @@ class ImageAnalysis:
 
     def get_local_offset(
         self,
-        obj: dict,
+        obj: Union[Detection, Dict[str, Any]],
         rotation: Union[List[float], np.ndarray],
         height: float,
         image_size: Tuple[int, int]
@@ -954,8 +1762,9 @@ class ImageAnalysis:
         """
         Get the local offset of an object in the drone's coordinate system.
 
-        :param obj: Object dictionary.
-        :type obj: dict
+        :param obj: Detected object or its dictionary, which needs at least
+            ``x_center`` and ``y_center``.
+        :type obj: Detection or dict
         :param rotation: Rotation vector.
         :type rotation: list or np.array
         :param height: Height value.
@@ -965,10 +1774,16 @@ class ImageAnalysis:
         :return: Local offset [x, y, z].
         :rtype: np.array
         """
-        if "contour" in obj.keys():
+        if isinstance(obj, dict):
+            if "contour" not in obj.keys():
+                return self._get_local_offset(
+                    (obj["x_center"], obj["y_center"]), rotation, height,
+                    image_size)
+            obj = Detection.from_dict(obj)
+        if obj.contour is not None:
             return self._get_height_estimate(obj, rotation, height, image_size)
         return self._get_local_offset(
-            (obj["x_center"], obj["y_center"]), rotation, height, image_size)
+            (obj.x_center, obj.y_center), rotation, height, image_size)
 
     def _get_local_offset(
         self,
@@ -991,22 +1806,121 @@ class ImageAnalysis:
         :return: Local offset [x, y, z].
         :rtype: np.array
         """
-        px, py = pixel
+        return self._get_local_offsets(
+            [pixel], rotation, height, image_size)[0]
+
+    def _get_local_offsets(
+        self,
+        pixels: Union[List[Tuple[int, int]], np.ndarray],
+        rotation: Union[List[float], np.ndarray],
+        height: float,
+        image_size: Tuple[int, int]
+    ) -> np.ndarray:
+        """
+        Internal method to compute the local offsets of many pixels of one
+        image at once.
+
+        :param pixels: Pixel coordinates (x, y) of shape (N, 2).
+        :type pixels: list or np.array
+        :param rotation: Rotation vector.
+        :type rotation: list or np.array
+        :param height: Height value.
+        :type height: float
+        :param image_size: Image size (height, width).
+        :type image_size: tuple
+        :return: Local offsets [x, y, z] of shape (N, 3).
+        :rtype: np.array
+        """
+        fov = self.config.get("fov", [66, 41])  # shape is height width
+        return mh.compute_ground_offsets(
+            pixels, rotation, height, image_size, fov,
+            rotation_offset=self.config.get("rotation_offset", [0, 0, 0]),
+            # offset of camera position in x and y compared to drone center
+            camera_offset=self.config.get("camera_offset", [0, 0, 0]))
+
+    def _get_ground_rays(
+        self,
+        pixels: Union[List[Tuple[int, int]], np.ndarray],
+        rotation: Union[List[float], np.ndarray],
+        image_size: Tuple[int, int]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Internal method to compute the rays of many pixels of one image,
+        the local offsets at a height h are ``directions * h + origin``.
+
+        :param pixels: Pixel coordinates (x, y) of shape (N, 2).
+        :type pixels: list or np.array
+        :param rotation: Rotation vector.
+        :type rotation: list or np.array
+        :param image_size: Image size (height, width).
+        :type image_size: tuple
+        :return: Directions of shape (N, 3) and origin of shape (3,).
+        :rtype: tuple[np.array, np.array]
+        """
+        fov = self.config.get("fov", [66, 41])  # shape is height width
+        return mh.compute_ground_rays(
+            pixels, rotation, image_size, fov,
+            rotation_offset=self.config.get("rotation_offset", [0, 0, 0]),
+            camera_offset=self.config.get("camera_offset", [0, 0, 0]))
+
+    def get_footprint(
+        self,
+        rotation: Union[List[float], np.ndarray],
+        height: float,
+        image_size: Tuple[int, int]
+    ) -> np.ndarray:
+        """
+        Get the area of the ground seen by an image in the drone's coordinate
+        system.
+
+        :param rotation: Rotation vector.
+        :type rotation: list or np.array
+        :param height: Height value.
+        :type height: float
+        :param image_size: Image size (height, width).
+        :type image_size: tuple
+        :return: Local offsets of the top left, top right, bottom right and
+            bottom left image corner, shape (4, 3).
+        :rtype: np.array
+        """
+        rays = mh.get_camera_rays(
+            image_size, self.config.get("fov", [66, 41]),
+            self.config.get("camera_offset", [0, 0, 0]))
+        return rays.footprint(
+            rotation, height, self.config.get("rotation_offset", [0, 0, 0]))
+
+    def _get_pixel(
+        self,
+        local_vec: Union[List[float], np.ndarray],
+        rotation: Union[List[float], np.ndarray],
+        image_size: Tuple[int, int]
+    ) -> Optional[Tuple[float, float]]:
+        """
+        Internal method to compute pixel coordinates from a local offset,
+        inverse of :meth:`_get_local_offset`.
+
+        :param local_vec: Local offset [x, y, z].
+        :type local_vec: list or np.array
+        :param rotation: Rotation vector.
+        :type rotation: list or np.array
+        :param image_size: Image size (height, width).
+        :type image_size: tuple
+        :return: Pixel coordinates (x, y) or None if not in front of the
+            camera.
+        :rtype: tuple or None
+        """
         rot_mat = mh.rotation_matrix(rotation)
         rotation = np.array(rotation) + \
             np.array(self.config.get("rotation_offset", [0, 0, 0]))
 
-        fov = self.config.get("fov", [66, 41])  # shape is height width
-        # offset of camera position in x and y compared to drone center
+        fov = self.config.get("fov", [66, 41])
         camera_offset = np.array(self.config.get("camera_offset", [0, 0, 0]))
-        local_vec = mh.compute_local(px, py, rotation, image_size, fov)
-
-        local_vec_stretched = local_vec * height / local_vec[2]
-        return local_vec_stretched + rot_mat @ camera_offset
+        return mh.compute_pixel(np.array(local_vec) - rot_mat @ camera_offset,
+                                rotation, image_size, fov)
 
     def add_lat_lon(
         self,
-        obj: dict,
+        obj: Detection,
         rotation: Union[List[float], np.ndarray],
         height: float,
         image_size: Tuple[int, int],
@@ -1015,8 +1929,8 @@ class ImageAnalysis:
         """
         Add latitude and longitude to an object based on its local offset.
 
-        :param obj: Object dictionary.
-        :type obj: dict
+        :param obj: Detected object.
+        :type obj: Detection
         :param rotation: Rotation vector.
         :type rotation: list or np.array
         :param height: Height value.
@@ -1030,5 +1944,6 @@ class ImageAnalysis:
         local_vec_stretched = self.get_local_offset(
             obj, rotation, height, image_size)
 
-        obj["lat_lon"] = loc_to_global(
-            local_vec_stretched[0], local_vec_stretched[1])[::-1]
+        # a list like after loading the item from the data file
+        obj.lat_lon = list(loc_to_global(
+            local_vec_stretched[0], local_vec_stretched[1])[::-1])
@@ -0,0 +1,170 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+import cv2
+from payloadcomputerdroneprojekt.helper import smart_print as sp
+
+
+class ImageWriter:
+    """
+    Encodes and writes images in background threads, so saving images does
+    not block the image analysis.
+
+    At most ``queue_size`` images are waiting or being written at a time;
+    further writes block until one is done. Coroutines wait for free slots
+    with :meth:`wait_ready` before writing instead.
+
+    :param threads: Number of writer threads.
+    :type threads: int
+    :param queue_size: Maximum number of pending images.
+    :type queue_size: int
+    """
+
+    def __init__(self, threads: int = 2, queue_size: int = 8) -> None:
+        """
+        Initialize the ImageWriter, the threads are started on first use.
+
+        :param threads: Number of writer threads.
+        :type threads: int
+        :param queue_size: Maximum number of pending images.
+        :type queue_size: int
+        """
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            threads, thread_name_prefix="image_writer")
+        self._queue_size: int = queue_size
+        self._slots: threading.BoundedSemaphore = threading.BoundedSemaphore(
+            queue_size)
+        self._lock: threading.Lock = threading.Lock()
+        self._pending: Dict[Future, None] = {}
+        self.stats: Dict[str, Any] = {
+            "written": 0, "failed": 0, "mean_latency": 0.0,
+            "max_latency": 0.0}
+
+    def write(self, path: str, image: np.ndarray,
+              params: Optional[Sequence[int]] = None) -> None:
+        """
+        Queue an image to be written, blocks while the queue is full. The
+        image is copied, so the caller may change it afterwards.
+
+        :param path: File path, the format is taken from the extension.
+        :type path: str
+        :param image: Image as a numpy array.
+        :type image: np.ndarray
+        :param params: Encoder parameters passed to cv2.imwrite.
+        :type params: list[int] or None
+        :return: None
+        """
+        self._slots.acquire()
+        image = np.array(image, copy=True)
+        future = self._executor.submit(
+            self._write, path, image, list(params or []), time.monotonic())
+        with self._lock:
+            self._pending[future] = None
+        future.add_done_callback(self._done)
+
+    async def wait_ready(self, images: int = 1) -> None:
+        """
+        Wait until the given number of images can be queued without
+        blocking. The event loop keeps running while the queue is full.
+
+        :param images: Number of images that are going to be written.
+        :type images: int
+        :return: None
+        """
+        images = min(images, self._queue_size)
+        if not self._take_slots(images, blocking=False):
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._take_slots, images, True)
+
+    def _take_slots(self, images: int, blocking: bool) -> bool:
+        """
+        Check if enough queue slots are free, by taking and releasing them.
+
+        :param images: Number of slots.
+        :type images: int
+        :param blocking: Wait until the slots are free.
+        :type blocking: bool
+        :return: True if the slots were free.
+        :rtype: bool
+        """
+        taken = 0
+        while taken < images and self._slots.acquire(blocking=blocking):
+            taken += 1
+        for _ in range(taken):
+            self._slots.release()
+        return taken == images
+
+    def _write(self, path: str, image: np.ndarray, params: List[int],
+               queued: float) -> None:
+        """
+        Write one image and record its latency, runs in a writer thread.
+
+        :param path: File path.
+        :type path: str
+        :param image: Image as a numpy array.
+        :type image: np.ndarray
+        :param params: Encoder parameters passed to cv2.imwrite.
+        :type params: list[int]
+        :param queued: Time the image was queued, as time.monotonic().
+        :type queued: float
+        :return: None
+        """
+        try:
+            ok = cv2.imwrite(path, image, params)
+        except Exception as e:
+            sp(f"Writing {path} failed: {e}")
+            ok = False
+        latency = time.monotonic() - queued
+        with self._lock:
+            if not ok:
+                self.stats["failed"] += 1
+                return
+            self.stats["written"] += 1
+            self.stats["mean_latency"] += (
+                latency - self.stats["mean_latency"]) / self.stats["written"]
+            self.stats["max_latency"] = max(
+                self.stats["max_latency"], latency)
+
+    def _done(self, future: Future) -> None:
+        """
+        Release the queue slot of a written image.
+
+        :param future: Future of the write.
+        :type future: Future
+        :return: None
+        """
+        with self._lock:
+            self._pending.pop(future, None)
+        self._slots.release()
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of images waiting or being written.
+
+        :rtype: int
+        """
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self) -> None:
+        """
+        Wait until all queued images are written.
+
+        :return: None
+        """
+        with self._lock:
+            futures = list(self._pending)
+        for future in futures:
+            future.exception()
+
+    def close(self) -> None:
+        """
+        Write all queued images and stop the threads.
+
+        :return: None
+        """
+        self._executor.shutdown(wait=True)
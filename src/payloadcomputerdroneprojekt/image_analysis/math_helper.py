@@ -1,10 +1,14 @@
+import functools
+import itertools
 import numpy as np
 import math
 from scipy.spatial.transform import Rotation as R
 from pyproj import CRS, Transformer
-from itertools import permutations
 from numpy.linalg import norm
 
+# code elements scored by find_code_marker, the largest ones are kept
+MAX_MARKER_CANDIDATES = 30
+
 
 def compute_local(pixel_x, pixel_y, rotation_angles,
                   image_size, field_of_view):
@@ -61,6 +65,280 @@ def compute_pixel_vec(pixel_x, pixel_y, image_size, field_of_view):
     ])
 
 
+class CameraRays:
+    """
+    Precomputed viewing rays of one camera. The ray of a pixel only depends
+    on the image size and the field of view, so they are computed once per
+    camera and every projection is a table lookup plus one matrix multiply.
+
+    The ray of pixel (x, y) is ``[rows[y], columns[x], 1]`` in the camera
+    frame, see :func:`compute_pixel_vec`.
+
+    :param image_size: Image size as (height, width).
+    :type image_size: tuple
+    :param field_of_view: Field of view as (horizontal_fov, vertical_fov) in
+        degrees.
+    :type field_of_view: tuple
+    :param camera_offset: Position of the camera relative to the drone
+        center.
+    :type camera_offset: tuple
+    """
+
+    def __init__(self, image_size, field_of_view, camera_offset=(0, 0, 0)):
+        self.image_size = tuple(image_size)
+        self.camera_offset = np.array(camera_offset, dtype=np.float64)
+        tan_x = math.tan(math.radians(field_of_view[0] / 2))
+        tan_y = math.tan(math.radians(field_of_view[1] / 2))
+        # rays are affine in the pixel coordinates
+        self._scale = np.array([-2 * tan_y / image_size[0],
+                                2 * tan_x / image_size[1]])
+        self._shift = np.array([tan_y, -tan_x])
+        self.rows = np.arange(image_size[0]) * self._scale[0] + self._shift[0]
+        self.columns = np.arange(image_size[1]) * self._scale[1] + \
+            self._shift[1]
+
+    def rays(self, pixels):
+        """
+        Get the rays of many pixels in the camera frame.
+
+        :param pixels: Pixel coordinates (x, y) as array of shape (N, 2).
+        :type pixels: list or np.ndarray
+        :return: Rays of shape (N, 3) with z = 1.
+        :rtype: np.ndarray
+        """
+        pixels = np.asarray(pixels).reshape(-1, 2)
+        rays = np.ones((len(pixels), 3))
+        if np.issubdtype(pixels.dtype, np.integer) and \
+                (pixels >= 0).all() and \
+                (pixels[:, 0] < self.image_size[1]).all() and \
+                (pixels[:, 1] < self.image_size[0]).all():
+            rays[:, 0] = self.rows[pixels[:, 1]]
+            rays[:, 1] = self.columns[pixels[:, 0]]
+        else:
+            rays[:, :2] = pixels[:, ::-1] * self._scale + self._shift
+        return rays
+
+    def ground_rays(self, pixels, rotation_angles, rotation_offset=None):
+        """
+        Get the rays of many pixels in the local frame, scaled to a height
+        of 1. The ground offset of a pixel at height h is
+        ``directions * h + origin``, so the offsets are linear in the height.
+
+        :param pixels: Pixel coordinates (x, y) as array of shape (N, 2).
+        :type pixels: list or np.ndarray
+        :param rotation_angles: Drone rotation angles (roll, pitch, yaw) in
+            degrees.
+        :type rotation_angles: list or np.ndarray
+        :param rotation_offset: Rotation of the camera relative to the drone
+            (roll, pitch, yaw) in degrees.
+        :type rotation_offset: list or np.ndarray or None
+        :return: Directions of shape (N, 3) with z = 1 and the origin, the
+            position of the camera, of shape (3,).
+        :rtype: tuple[np.ndarray, np.ndarray]
+        """
+        rotation_angles = np.asarray(rotation_angles, dtype=np.float64)
+        drone_mat = rotation_matrix(rotation_angles)
+        if rotation_offset is None or not np.any(rotation_offset):
+            camera_mat = drone_mat
+        else:
+            camera_mat = rotation_matrix(rotation_angles + rotation_offset)
+
+        directions = self.rays(pixels) @ camera_mat.T
+        directions /= directions[:, 2:3]
+        return directions, drone_mat @ self.camera_offset
+
+    def ground_offsets(self, pixels, rotation_angles, height,
+                       rotation_offset=None):
+        """
+        Project many pixels onto the ground.
+
+        :param pixels: Pixel coordinates (x, y) as array of shape (N, 2).
+        :type pixels: list or np.ndarray
+        :param rotation_angles: Drone rotation angles (roll, pitch, yaw) in
+            degrees.
+        :type rotation_angles: list or np.ndarray
+        :param height: Height of the camera above the ground.
+        :type height: float
+        :param rotation_offset: Rotation of the camera relative to the drone
+            (roll, pitch, yaw) in degrees.
+        :type rotation_offset: list or np.ndarray or None
+        :return: Local offsets [x, y, z] as array of shape (N, 3).
+        :rtype: np.ndarray
+        """
+        directions, origin = self.ground_rays(
+            pixels, rotation_angles, rotation_offset)
+        return directions * height + origin
+
+    def footprint(self, rotation_angles, height, rotation_offset=None):
+        """
+        Get the area of the ground seen by the whole image.
+
+        :param rotation_angles: Drone rotation angles (roll, pitch, yaw) in
+            degrees.
+        :type rotation_angles: list or np.ndarray
+        :param height: Height of the camera above the ground.
+        :type height: float
+        :param rotation_offset: Rotation of the camera relative to the drone
+            (roll, pitch, yaw) in degrees.
+        :type rotation_offset: list or np.ndarray or None
+        :return: Local offsets of the top left, top right, bottom right and
+            bottom left image corner, shape (4, 3).
+        :rtype: np.ndarray
+        """
+        height_px, width_px = self.image_size
+        return self.ground_offsets(
+            [(0, 0), (width_px, 0), (width_px, height_px), (0, height_px)],
+            rotation_angles, height, rotation_offset)
+
+
+@functools.lru_cache(maxsize=8)
+def _camera_rays(image_size, field_of_view, camera_offset):
+    return CameraRays(image_size, field_of_view, camera_offset)
+
+
+def get_camera_rays(image_size, field_of_view, camera_offset=(0, 0, 0)):
+    """
+    Get the cached rays of a camera, they are built on first use for every
+    combination of image size, field of view and camera offset.
+
+    :param image_size: Image size as (height, width).
+    :type image_size: tuple
+    :param field_of_view: Field of view as (horizontal_fov, vertical_fov) in
+        degrees.
+    :type field_of_view: tuple
+    :param camera_offset: Position of the camera relative to the drone
+        center.
+    :type camera_offset: tuple
+    :return: Rays of the camera.
+    :rtype: CameraRays
+    """
+    return _camera_rays(
+        tuple(int(v) for v in image_size[:2]),
+        tuple(float(v) for v in field_of_view),
+        tuple(float(v) for v in camera_offset))
+
+
+def compute_ground_offsets(pixels, rotation_angles, height, image_size,
+                           field_of_view, rotation_offset=None,
+                           camera_offset=None):
+    """
+    Projects many pixels of one image onto the ground at once, using the
+    cached rays of the camera, see :func:`get_camera_rays`.
+
+    :param pixels: Pixel coordinates (x, y) as array of shape (N, 2).
+    :type pixels: list or np.ndarray
+    :param rotation_angles: Drone rotation angles (roll, pitch, yaw) in
+        degrees.
+    :type rotation_angles: list or np.ndarray
+    :param height: Height of the camera above the ground.
+    :type height: float
+    :param image_size: Image size as (height, width).
+    :type image_size: tuple
+    :param field_of_view: Field of view as (horizontal_fov, vertical_fov) in
+        degrees.
+    :type field_of_view: tuple
+    :param rotation_offset: Rotation of the camera relative to the drone
+        (roll, pitch, yaw) in degrees.
+    :type rotation_offset: list or np.ndarray or None
+    :param camera_offset: Position of the camera relative to the drone
+        center.
+    :type camera_offset: list or np.ndarray or None
+    :return: Local offsets [x, y, z] as array of shape (N, 3).
+    :rtype: np.ndarray
+    """
+    if camera_offset is None:
+        camera_offset = (0, 0, 0)
+    return get_camera_rays(
+        image_size, field_of_view, camera_offset).ground_offsets(
+            pixels, rotation_angles, height, rotation_offset)
+
+
+def compute_ground_rays(pixels, rotation_angles, image_size, field_of_view,
+                        rotation_offset=None, camera_offset=None):
+    """
+    Gets the rays of many pixels of one image scaled to a height of 1, see
+    :meth:`CameraRays.ground_rays`.
+
+    :param pixels: Pixel coordinates (x, y) as array of shape (N, 2).
+    :type pixels: list or np.ndarray
+    :param rotation_angles: Drone rotation angles (roll, pitch, yaw) in
+        degrees.
+    :type rotation_angles: list or np.ndarray
+    :param image_size: Image size as (height, width).
+    :type image_size: tuple
+    :param field_of_view: Field of view as (horizontal_fov, vertical_fov) in
+        degrees.
+    :type field_of_view: tuple
+    :param rotation_offset: Rotation of the camera relative to the drone
+        (roll, pitch, yaw) in degrees.
+    :type rotation_offset: list or np.ndarray or None
+    :param camera_offset: Position of the camera relative to the drone
+        center.
+    :type camera_offset: list or np.ndarray or None
+    :return: Directions of shape (N, 3) and origin of shape (3,).
+    :rtype: tuple[np.ndarray, np.ndarray]
+    """
+    if camera_offset is None:
+        camera_offset = (0, 0, 0)
+    return get_camera_rays(
+        image_size, field_of_view, camera_offset).ground_rays(
+            pixels, rotation_angles, rotation_offset)
+
+
+def estimate_height(unit_lengths, lengths):
+    """
+    Solves the height from distances measured on the ground. Projected
+    distances grow linearly with the height, so the height is the mean
+    ratio of the known lengths to the lengths projected at a height of 1,
+    without iterating.
+
+    :param unit_lengths: Lengths projected at a height of 1.
+    :type unit_lengths: list or np.ndarray
+    :param lengths: Known lengths in meters, one for all or one per length.
+    :type lengths: float or list or np.ndarray
+    :return: Height and the residuals (projected - known length) in meters,
+        the height is nan if no length could be projected.
+    :rtype: tuple[float, np.ndarray]
+    """
+    unit_lengths = np.asarray(unit_lengths, dtype=np.float64)
+    lengths = np.broadcast_to(
+        np.asarray(lengths, dtype=np.float64), unit_lengths.shape)
+    valid = unit_lengths > 0
+    if not valid.any():
+        return float("nan"), np.full(unit_lengths.shape, np.nan)
+    height = float(np.mean(lengths[valid] / unit_lengths[valid]))
+    return height, height * unit_lengths - lengths
+
+
+def compute_pixel(local_vec, rotation_angles, image_size, field_of_view):
+    """
+    Computes the pixel a local 3D vector is seen at, inverse of
+    :func:`compute_local`.
+
+    :param local_vec: Local 3D vector from the camera.
+    :type local_vec: list or np.ndarray
+    :param rotation_angles: Camera rotation angles (roll, pitch, yaw) in
+        degrees.
+    :type rotation_angles: list or np.ndarray
+    :param image_size: Image size as (height, width).
+    :type image_size: tuple
+    :param field_of_view: Field of view as (horizontal_fov, vertical_fov) in
+        degrees.
+    :type field_of_view: tuple
+    :return: Pixel (x, y), None if the vector points away from the camera.
+    :rtype: tuple or None
+    """
+    pixel_vec = rotation_matrix(rotation_angles).T @ np.array(local_vec)
+    if pixel_vec[2] <= 0:
+        return None
+    pixel_vec = pixel_vec / pixel_vec[2]
+
+    norm_x = pixel_vec[1] / math.tan(math.radians(field_of_view[0] / 2))
+    norm_y = -pixel_vec[0] / math.tan(math.radians(field_of_view[1] / 2))
+    return ((norm_x / 2 + 0.5) * image_size[1],
+            (norm_y / 2 + 0.5) * image_size[0])
+
+
 def rotation_matrix(rotation_angles):
     """
     Creates a rotation matrix from Euler angles.
@@ -113,10 +391,76 @@ def local_to_global(origin_latitude, origin_longitude):
     return convert_local_to_global
 
 
+def find_code_marker(points, sizes=None,
+                     max_candidates=MAX_MARKER_CANDIDATES):
+    """
+    Finds the three code elements that form the corners of a code marker.
+    Every set of three elements is scored at once, with each element as top
+    left corner and the other two ordered so the cross product is positive:
+    the two vectors from the top left element to the bottom left and top
+    right element have to be orthogonal and of equal length, and the
+    elements should be of equal size.
+
+    The number of sets grows with the cube of the candidates, so only the
+    ``max_candidates`` largest elements are scored, or the first ones if no
+    sizes are given.
+
+    :param points: Centers of the candidate elements, (x, y) or (x, y, z).
+    :type points: list or np.ndarray
+    :param sizes: Sizes of the candidate elements, e.g. their diagonals.
+    :type sizes: list or np.ndarray or None
+    :param max_candidates: Maximum number of elements scored.
+    :type max_candidates: int
+    :return: Indices of (top_left, bottom_left, top_right) and the confidence
+        of the best triple between 0 and 1, None if there is no triple.
+    :rtype: tuple[np.ndarray, float] or None
+    """
+    points = np.asarray(points, dtype=np.float64)[:, :2]
+    candidates = np.arange(len(points))
+    if sizes is not None:
+        sizes = np.asarray(sizes, dtype=np.float64)
+        candidates = np.sort(
+            np.argsort(-sizes, kind="stable")[:max_candidates])
+    candidates = candidates[:max_candidates]
+    n = len(candidates)
+    if n < 3:
+        return None
+    sets = np.fromiter(itertools.chain.from_iterable(
+        itertools.combinations(candidates, 3)), dtype=np.intp).reshape(-1, 3)
+    # each element of a set as top left corner
+    triples = np.concatenate(
+        [sets, sets[:, [1, 2, 0]], sets[:, [2, 0, 1]]])
+
+    vec1 = points[triples[:, 1]] - points[triples[:, 0]]
+    vec2 = points[triples[:, 2]] - points[triples[:, 0]]
+    cross = vec1[:, 0] * vec2[:, 1] - vec1[:, 1] * vec2[:, 0]
+    # the other orientation, the score is symmetric in the two vectors
+    flip = cross < 0
+    triples[flip] = triples[flip][:, [0, 2, 1]]
+    len1 = norm(vec1, axis=1)
+    len2 = norm(vec2, axis=1)
+    valid = (cross != 0) & (len1 > 0) & (len2 > 0)
+    if not valid.any():
+        return None
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score = 1 - np.abs((vec1 * vec2).sum(axis=1)) / (len1 * len2) \
+            - np.abs(len1 - len2) / np.maximum(len1, len2)
+        if sizes is not None:
+            sizes = sizes[triples]
+            score -= (sizes.max(axis=1) - sizes.min(axis=1)) \
+                / sizes.max(axis=1)
+    score[~valid] = -np.inf
+
+    best = int(np.argmax(score))
+    return triples[best], float(np.clip(score[best], 0, 1))
+
+
 def find_relative_position(points: list):
     """
     Finds the relative positions of three points such that two vectors are
-    orthogonal and the cross product is positive.
+    orthogonal and the cross product is positive, see
+    :func:`find_code_marker`.
 
     :param points: List of 3D points.
     :type points: list
@@ -124,21 +468,11 @@ def find_relative_position(points: list):
         None.
     :rtype: tuple or None
     """
-    outs = []
-    for top_left, bottom_left, top_right in permutations(points, 3):
-        vec1 = np.array(bottom_left) - np.array(top_left)
-        vec2 = np.array(top_right) - np.array(top_left)
-
-        # Check if vectors are orthogonal
-        if np.cross(vec1, vec2)[2] > 0:
-            outs.append((np.dot(vec1, vec2), top_left, bottom_left, top_right))
-            if np.isclose(np.dot(vec1, vec2), 0, atol=0.05):
-                # Check orientation using cross product
-                return top_left, bottom_left, top_right
-
-    closest = sorted(outs, key=lambda x: x[0])[0]
-
-    return closest[1], closest[2], closest[3]
+    marker = find_code_marker(points)
+    if marker is None:
+        return None
+    top_left, bottom_left, top_right = marker[0]
+    return points[top_left], points[bottom_left], points[top_right]
 
 
 def compute_rotation_angle(top_left, bottom_left):
@@ -0,0 +1,273 @@
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+import numpy as np
+from payloadcomputerdroneprojekt.image_analysis.clustering import \
+    project_local, unproject_local
+from payloadcomputerdroneprojekt.image_analysis.detection import Detection
+
+
+class _Track:
+    """
+    Filtered position and observations of one object.
+    """
+
+    __slots__ = ("id", "color", "position", "variance", "hits", "time",
+                 "shapes", "best", "best_area", "cell")
+
+    def __init__(self, track_id: int, color: str, position: np.ndarray,
+                 variance: float, time: int) -> None:
+        self.id: int = track_id
+        self.color: str = color
+        self.position: np.ndarray = position
+        self.variance: float = variance
+        self.hits: int = 1
+        self.time: int = time
+        self.shapes: Counter = Counter()
+        self.best: Optional[Dict[str, Any]] = None
+        self.best_area: int = -1
+        self.cell: Tuple[int, int] = (0, 0)
+
+    @property
+    def shape(self) -> Optional[str]:
+        """
+        Most common shape of the observations, None if none is known.
+
+        :rtype: str or None
+        """
+        if len(self.shapes) == 0:
+            return None
+        return self.shapes.most_common(1)[0][0]
+
+    def observe(self, obj: Detection, time: int) -> None:
+        """
+        Count the shape of an observation and keep it if it is the best
+        one so far, the one with the largest bounding box.
+
+        :param obj: Detected object.
+        :type obj: Detection
+        :param time: Time of the frame in 1/100 seconds.
+        :type time: int
+        """
+        if obj.shape:
+            self.shapes[obj.shape] += 1
+        area = (obj.x_stop - obj.x_start) * (obj.y_stop - obj.y_start)
+        if area > self.best_area:
+            self.best_area = area
+            self.best = {**obj.to_dict(), "time": time}
+
+
+class ObjectTracker:
+    """
+    Online tracking of the detected objects during the flight.
+
+    Every frame the detections are assigned to the tracks of the same color
+    with a compatible shape within ``track_gate`` meters, the closest pairs
+    first. Detections without a track start a new one. The objects do not
+    move, so the position of a track is a Kalman filter with a constant
+    position: the variance grows with ``track_process_noise`` per second
+    for the drift of the GPS and every detection is weighted with its
+    variance, ``track_noise`` meters per meter of height. Tracks are kept
+    in a grid of ``track_gate`` cells, so a frame costs the same for any
+    number of tracks.
+
+    The confidence of a track is ``1 - 0.5 ** hits``, the best observation
+    is the one with the largest bounding box. The confidence saturates at
+    1.0 in floating point, so the tracks are ranked by their hits and the
+    variance of their position.
+
+    :param config: Image configuration dictionary.
+    :type config: dict
+    """
+
+    def __init__(self, config: Dict[str, Any]) -> None:
+        """
+        Initialize the ObjectTracker without tracks.
+
+        :param config: Image configuration dictionary.
+        :type config: dict
+        """
+        self.gate: float = config.get(
+            "track_gate", config.get("distance_objs", 5))
+        self.noise: float = config.get("track_noise", 0.05)
+        self.process_noise: float = config.get("track_process_noise", 0.01)
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Forget all tracks.
+
+        :return: None
+        """
+        self._origin: Optional[np.ndarray] = None
+        self._tracks: Dict[int, _Track] = {}
+        self._cells: Dict[str, Dict[Tuple[int, int], Set[int]]] = {}
+        self._next_id: int = 1
+
+    def _cell(self, position: np.ndarray) -> Tuple[int, int]:
+        """
+        Grid cell of a position.
+
+        :param position: Position in meters.
+        :type position: np.ndarray
+        :rtype: tuple
+        """
+        x, y = np.floor(position / max(self.gate, 1e-6))
+        return int(x), int(y)
+
+    def _near(self, color: str, position: np.ndarray) -> List[_Track]:
+        """
+        Tracks of a color in the cells around a position.
+
+        :param color: Color name.
+        :type color: str
+        :param position: Position in meters.
+        :type position: np.ndarray
+        :return: Candidate tracks.
+        :rtype: list
+        """
+        cells = self._cells.get(color, {})
+        x, y = self._cell(position)
+        return [self._tracks[track_id]
+                for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                for track_id in cells.get((x + dx, y + dy), ())]
+
+    def _place(self, track: _Track) -> None:
+        """
+        Move a track to the cell of its position.
+
+        :param track: The track.
+        :type track: _Track
+        """
+        cells = self._cells.setdefault(track.color, {})
+        cell = self._cell(track.position)
+        if cell == track.cell and track.id in cells.get(cell, ()):
+            return
+        cells.get(track.cell, set()).discard(track.id)
+        cells.setdefault(cell, set()).add(track.id)
+        track.cell = cell
+
+    def update(self, objects: List[Detection], time: int,
+               height: float) -> None:
+        """
+        Update the tracks with the detections of a frame.
+
+        :param objects: Detected objects of the frame, objects without
+            ``lat_lon`` are ignored.
+        :type objects: List[Detection]
+        :param time: Time of the frame in 1/100 seconds.
+        :type time: int
+        :param height: Height the frame was taken at.
+        :type height: float
+        :return: None
+        """
+        objects = [obj for obj in objects if obj.lat_lon is not None]
+        if len(objects) == 0:
+            return
+        if self._origin is None:
+            self._origin = np.array(objects[0].lat_lon[:2], dtype=np.float64)
+        points = project_local([obj.lat_lon[:2] for obj in objects],
+                               self._origin)
+
+        pairs: List[Tuple[float, int, int]] = []
+        for i, (obj, point) in enumerate(zip(objects, points)):
+            for track in self._near(obj.color, point):
+                shape = track.shape
+                if obj.shape and shape is not None and obj.shape != shape:
+                    continue
+                distance = float(np.hypot(*(track.position - point)))
+                if distance <= self.gate:
+                    pairs.append((distance, i, track.id))
+
+        # detections are more accurate from lower heights
+        variance = (self.noise * max(height, 1)) ** 2
+        assigned: Set[int] = set()
+        updated: Set[int] = set()
+        for _, i, track_id in sorted(pairs):
+            if i in assigned or track_id in updated:
+                continue
+            assigned.add(i)
+            updated.add(track_id)
+            self._correct(self._tracks[track_id], objects[i], points[i],
+                          time, variance)
+
+        for i, (obj, point) in enumerate(zip(objects, points)):
+            if i in assigned:
+                continue
+            track = _Track(self._next_id, obj.color, point, variance, time)
+            self._next_id += 1
+            track.observe(obj, time)
+            self._tracks[track.id] = track
+            self._place(track)
+
+    def _correct(self, track: _Track, obj: Detection, point: np.ndarray,
+                 time: int, measurement_variance: float) -> None:
+        """
+        Kalman update of a track with an assigned detection.
+
+        :param track: The track.
+        :type track: _Track
+        :param obj: Detected object.
+        :type obj: Detection
+        :param point: Position of the detection in meters.
+        :type point: np.ndarray
+        :param time: Time of the frame in 1/100 seconds.
+        :type time: int
+        :param measurement_variance: Variance of the detection in m².
+        :type measurement_variance: float
+        """
+        variance = track.variance + \
+            self.process_noise * max(time - track.time, 0) / 100
+        gain = variance / (variance + measurement_variance)
+        track.position = track.position + gain * (point - track.position)
+        track.variance = (1 - gain) * variance
+        track.hits += 1
+        track.time = time
+        track.observe(obj, time)
+        self._place(track)
+
+    def tracks(
+        self,
+        color: Optional[str] = None,
+        shape: Optional[str] = None,
+        min_confidence: float = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        The current tracks, the one with the most hits first and of equal
+        hits the one with the lowest variance.
+
+        :param color: Only tracks of this color if given.
+        :type color: str or None
+        :param shape: Only tracks of this shape if given.
+        :type shape: str or None
+        :param min_confidence: Minimum confidence of the tracks.
+        :type min_confidence: float
+        :return: Tracks with id, color, shape, lat, lon, pos ([lat, lon]),
+            confidence, hits, the time of the last detection and the best
+            observation.
+        :rtype: list[dict]
+        """
+        selected = [
+            track for track in self._tracks.values()
+            if (color is None or track.color == color)
+            and (shape is None or track.shape == shape)
+            and 1 - 0.5 ** track.hits >= min_confidence]
+        if len(selected) == 0:
+            return []
+        selected.sort(key=lambda track: (-track.hits, track.variance))
+        lat_lon = unproject_local(
+            [track.position for track in selected], self._origin)
+        out: List[Dict[str, Any]] = []
+        for track, (lat, lon) in zip(selected, lat_lon):
+            out.append({
+                "id": track.id,
+                "color": track.color,
+                "shape": track.shape,
+                "lat": float(lat),
+                "lon": float(lon),
+                "pos": [float(lat), float(lon)],
+                "confidence": 1 - 0.5 ** track.hits,
+                "hits": track.hits,
+                "time": track.time,
+                "best": track.best
+            })
+        return out
@@ -0,0 +1,120 @@
+import cv2
+import numpy as np
+from typing import Any, Dict, Optional
+
+# width of the blur that measures how blurred a frame already is along an axis
+REBLUR_SIZE: int = 3
+
+
+class QualityGate:
+    """
+    Rejects unusable frames before they are stored or analysed. All metrics
+    are computed on a downscaled grayscale copy of the frame, so the gate is
+    cheap compared to the analysis.
+
+    Config keys of the image section:
+
+    * ``threashold``: minimum sharpness, the variance of the Laplacian;
+      -1 disables the check
+    * ``quality_scale``: scale of the frame the metrics are computed on
+    * ``exposure_range``: [min, max] allowed mean brightness (0-255)
+    * ``max_motion_blur``: maximum motion blur, 0 if the frame is as sharp
+      along x as along y and 1 if it is only sharp along one axis
+
+    :param config: Image configuration dictionary.
+    :type config: dict
+    """
+
+    def __init__(self, config: Dict[str, Any]) -> None:
+        """
+        Initialize the QualityGate from the image configuration.
+
+        :param config: Image configuration dictionary.
+        :type config: dict
+        """
+        self.threshold: float = config.get("threashold", -1)
+        self.scale: float = config.get("quality_scale", 0.25)
+        self.exposure_range: Optional[list] = config.get("exposure_range")
+        self.max_motion_blur: Optional[float] = config.get("max_motion_blur")
+
+    @property
+    def enabled(self) -> bool:
+        """
+        True if any check is configured.
+
+        :rtype: bool
+        """
+        return self.threshold >= 0 or self.exposure_range is not None \
+            or self.max_motion_blur is not None
+
+    def measure(self, image: np.ndarray) -> Dict[str, float]:
+        """
+        Compute the sharpness and the configured metrics of a frame.
+
+        :param image: BGR or grayscale image.
+        :type image: np.array
+        :return: Dictionary with sharpness and, if configured, brightness and
+            motion_blur.
+        :rtype: dict
+        """
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if self.scale < 1:
+            image = cv2.resize(image, None, fx=self.scale, fy=self.scale,
+                               interpolation=cv2.INTER_AREA)
+
+        laplacian = cv2.Laplacian(image, cv2.CV_16S)
+        metrics: Dict[str, float] = {
+            "sharpness": float(cv2.meanStdDev(laplacian)[1][0, 0] ** 2)}
+        if self.exposure_range is not None:
+            metrics["brightness"] = float(cv2.mean(image)[0])
+        if self.max_motion_blur is not None:
+            low, high = sorted((_axis_sharpness(image, 1, 0),
+                                _axis_sharpness(image, 0, 1)))
+            metrics["motion_blur"] = 1 - low / high if high > 0 else 0.0
+        return metrics
+
+    def check(self, metrics: Dict[str, float]) -> Optional[str]:
+        """
+        Check the metrics of a frame against the configured limits.
+
+        :param metrics: Result of :meth:`measure`.
+        :type metrics: dict
+        :return: Name of the failed check or None if the frame is usable.
+        :rtype: str or None
+        """
+        if metrics["sharpness"] < self.threshold:
+            return "sharpness"
+        if self.exposure_range is not None and not (
+                self.exposure_range[0] <= metrics["brightness"]
+                <= self.exposure_range[1]):
+            return "exposure"
+        if self.max_motion_blur is not None \
+                and metrics["motion_blur"] > self.max_motion_blur:
+            return "motion_blur"
+        return None
+
+
+def _axis_sharpness(image: np.ndarray, dx: int, dy: int) -> float:
+    """
+    Fraction of the gradient energy along an axis that is lost by blurring
+    the image along that axis. A sharp image loses much of it, an image
+    that is already blurred along the axis, e.g. by motion, hardly any.
+    Blur in all directions lowers both axes alike.
+
+    :param image: Grayscale image.
+    :type image: np.array
+    :param dx: 1 for the x axis.
+    :type dx: int
+    :param dy: 1 for the y axis.
+    :type dy: int
+    :return: Sharpness along the axis between 0 and 1.
+    :rtype: float
+    """
+    energy = cv2.norm(cv2.Sobel(image, cv2.CV_32F, dx, dy), cv2.NORM_L2SQR)
+    if energy == 0:
+        return 0.0
+    size = (REBLUR_SIZE, 1) if dx else (1, REBLUR_SIZE)
+    blurred = cv2.norm(cv2.Sobel(cv2.blur(image, size), cv2.CV_32F, dx, dy),
+                       cv2.NORM_L2SQR)
+    return float(1 - blurred / energy)
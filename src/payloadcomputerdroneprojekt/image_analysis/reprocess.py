@@ -0,0 +1,113 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from os.path import join, relpath
+from typing import Any, Dict, Iterator, Optional
+from payloadcomputerdroneprojekt.image_analysis.data_handler import \
+    DataHandler, FILENAME
+from payloadcomputerdroneprojekt.image_analysis.data_index import DataIndex
+import payloadcomputerdroneprojekt.image_analysis.worker as worker
+from payloadcomputerdroneprojekt.helper import smart_print as sp
+
+
+def reprocess(
+    source: str,
+    target: str,
+    config: Dict[str, Any],
+    workers: int = 0,
+    chunksize: int = 4
+) -> DataHandler:
+    """
+    Analyse the stored frames of a mission again, e.g. after tuning the
+    color thresholds.
+
+    The frames are decoded and analysed in ``workers`` processes, which
+    also store the result images, so the main process only writes the data
+    items, in the order of the source items. The raw frames are not copied,
+    the items refer to the files of the source directory. Every item
+    records the id of its source item and is appended to the data file
+    right away, so an interrupted run continues after the last written item
+    when it is started again with the same target directory. Items without
+    a frame, e.g. of rejected frames, are skipped.
+
+    :param source: Directory of the mission with the __data__.json.
+    :type source: str
+    :param target: Directory of the new data items, an existing run is
+        continued.
+    :type target: str
+    :param config: Image configuration dictionary.
+    :type config: dict
+    :param workers: Number of worker processes, 0 analyses the frames in
+        this process.
+    :type workers: int
+    :param chunksize: Number of frames sent to a worker at once.
+    :type chunksize: int
+    :return: Data handler of the target directory.
+    :rtype: DataHandler
+    """
+    config = {**config, "save_shape_image": True, "analysis_workers": 0}
+    handler = DataHandler(target, archive=config.get("archive"))
+    done: Optional[Any] = None
+    if len(handler) > 0:
+        done = handler.get_item(len(handler) - 1).get("source_id")
+        sp(f"Continuing after item {done}, {len(handler)} items done")
+
+    items = list(_pending_items(DataIndex(join(source, FILENAME)), done))
+    analyse = partial(worker.analyse_stored_frame, source, target)
+    if workers > 0:
+        executor = ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("spawn"),
+            initializer=worker.init_worker, initargs=(config,))
+        results = executor.map(analyse, items, chunksize=chunksize)
+    else:
+        executor = None
+        worker.init_worker(config)
+        results = map(analyse, items)
+
+    try:
+        for i, (item, result) in enumerate(zip(items, results)):
+            with handler.new_item(item["time"]) as new_item:
+                new_item.add_source(item["id"])
+                new_item.add_image_position(item["image_pos"])
+                new_item.add_stored_image(
+                    "raw_image", relpath(join(source, item["raw_image"]),
+                                         target),
+                    item.get("archive", {}).get("raw_image"))
+                new_item.add_height(item["height"])
+                new_item.add_objects(result["objects"])
+                for name, (filename, record) in \
+                        result["stored_images"].items():
+                    new_item.add_stored_image(name, filename, record)
+                for name, image in result["images"].items():
+                    new_item.add_image(
+                        image, name, "mask" if image.ndim == 2 else "image")
+            if (i + 1) % 100 == 0:
+                sp(f"Reprocessed {i + 1}/{len(items)} frames")
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        handler.close()
+    return handler
+
+
+def _pending_items(
+    index: DataIndex,
+    done: Optional[Any]
+) -> Iterator[Dict[str, Any]]:
+    """
+    Items with a frame that come after the last reprocessed item.
+
+    :param index: Index of the source data file.
+    :type index: DataIndex
+    :param done: Id of the last reprocessed source item, None if there is
+        none.
+    :type done: Any
+    :return: Iterator over the items.
+    :rtype: Iterator[dict]
+    """
+    ids = index.ids
+    start = ids.index(done) + 1 if done in ids else 0
+    for position in range(start, len(ids)):
+        item = index[position]
+        if "raw_image" in item:
+            yield item
@@ -0,0 +1,148 @@
+import cv2
+import numpy as np
+from typing import List, Optional, Sequence, Tuple
+
+# (x_start, y_start, x_stop, y_stop) in pixels, stop exclusive
+Box = Tuple[int, int, int, int]
+
+
+def mask_boxes(mask: np.ndarray, min_diagonal: float = 0) -> np.ndarray:
+    """
+    Bounding boxes of all connected blobs of a binary mask.
+
+    :param mask: Binary mask.
+    :type mask: np.ndarray
+    :param min_diagonal: Blobs with a smaller bounding box diagonal are
+        dropped.
+    :type min_diagonal: float
+    :return: Array of shape (N, 4) with (x_start, y_start, x_stop, y_stop).
+    :rtype: np.ndarray
+    """
+    _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    stats = stats[1:]
+    keep = (stats[:, cv2.CC_STAT_WIDTH]**2 + stats[:, cv2.CC_STAT_HEIGHT]**2
+            ) >= min_diagonal**2
+    stats = stats[keep]
+    return np.column_stack([
+        stats[:, cv2.CC_STAT_LEFT],
+        stats[:, cv2.CC_STAT_TOP],
+        stats[:, cv2.CC_STAT_LEFT] + stats[:, cv2.CC_STAT_WIDTH],
+        stats[:, cv2.CC_STAT_TOP] + stats[:, cv2.CC_STAT_HEIGHT]
+    ]).astype(np.int64)
+
+
+def remove_small_blobs(
+    mask: np.ndarray,
+    min_diagonal: float
+) -> Optional[np.ndarray]:
+    """
+    Remove all connected blobs of a binary mask whose bounding box diagonal
+    is smaller than min_diagonal.
+
+    :param mask: Binary mask.
+    :type mask: np.ndarray
+    :param min_diagonal: Minimum bounding box diagonal of a blob.
+    :type min_diagonal: float
+    :return: Mask with only the remaining blobs, the mask itself if all
+        blobs remain or None if no blob remains.
+    :rtype: np.ndarray or None
+    """
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(
+        mask, connectivity=8)
+    keep = (stats[:, cv2.CC_STAT_WIDTH].astype(np.int64)**2 +
+            stats[:, cv2.CC_STAT_HEIGHT].astype(np.int64)**2
+            ) >= min_diagonal**2
+    keep[0] = False
+    if not keep.any():
+        return None
+    if keep[1:].all():
+        return mask
+    lut = np.where(keep, 255, 0).astype(np.uint8)
+    return lut[labels]
+
+
+def scale_boxes(
+    boxes: np.ndarray,
+    factor: float,
+    padding: int,
+    image_shape: Tuple[int, int]
+) -> np.ndarray:
+    """
+    Scale boxes to another resolution, pad them and clip them to the image.
+
+    :param boxes: Array of shape (N, 4).
+    :type boxes: np.ndarray
+    :param factor: Scale factor from the box resolution to the target one.
+    :type factor: float
+    :param padding: Padding in target pixels added on every side.
+    :type padding: int
+    :param image_shape: Target image shape (height, width).
+    :type image_shape: tuple
+    :return: Array of shape (N, 4) in target pixels.
+    :rtype: np.ndarray
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4) * factor
+    out = np.empty(boxes.shape, dtype=np.int64)
+    out[:, :2] = np.floor(boxes[:, :2]) - padding
+    out[:, 2:] = np.ceil(boxes[:, 2:]) + padding
+    out[:, 0::2] = np.clip(out[:, 0::2], 0, image_shape[1])
+    out[:, 1::2] = np.clip(out[:, 1::2], 0, image_shape[0])
+    return out
+
+
+def merge_boxes(boxes: Sequence[Sequence[int]]) -> List[Box]:
+    """
+    Merge overlapping or touching boxes until all boxes are disjoint.
+
+    :param boxes: Boxes as (x_start, y_start, x_stop, y_stop).
+    :type boxes: sequence
+    :return: Disjoint boxes.
+    :rtype: list[tuple]
+    """
+    merged: List[List[int]] = [
+        [int(v) for v in box] for box in boxes
+        if box[2] > box[0] and box[3] > box[1]]
+    changed = True
+    while changed:
+        changed = False
+        out: List[List[int]] = []
+        for box in merged:
+            for other in out:
+                if box[0] <= other[2] and other[0] <= box[2] and \
+                        box[1] <= other[3] and other[1] <= box[3]:
+                    other[0] = min(other[0], box[0])
+                    other[1] = min(other[1], box[1])
+                    other[2] = max(other[2], box[2])
+                    other[3] = max(other[3], box[3])
+                    changed = True
+                    break
+            else:
+                out.append(box)
+        merged = out
+    return [tuple(box) for box in merged]
+
+
+def touches_border(
+    bound_box: dict,
+    box: Box,
+    image_shape: Tuple[int, int]
+) -> bool:
+    """
+    Check whether an object touches a border of the box that is not also a
+    border of the image, so it may be cut off by the box.
+
+    :param bound_box: Bounding box of the object with x_start, x_stop,
+        y_start and y_stop.
+    :type bound_box: dict
+    :param box: Box as (x_start, y_start, x_stop, y_stop).
+    :type box: tuple
+    :param image_shape: Image shape (height, width).
+    :type image_shape: tuple
+    :return: True if the object touches an inner border of the box.
+    :rtype: bool
+    """
+    x_start, y_start, x_stop, y_stop = box
+    return (x_start > 0 and bound_box["x_start"] <= x_start) or \
+        (y_start > 0 and bound_box["y_start"] <= y_start) or \
+        (x_stop < image_shape[1] and bound_box["x_stop"] >= x_stop) or \
+        (y_stop < image_shape[0] and bound_box["y_stop"] >= y_stop)
@@ -0,0 +1,124 @@
+import cv2
+import numpy as np
+from typing import Dict, List, Tuple, Union
+
+SHAPE_COLOR = "shape_color"
+
+ColorBounds = Union[Dict[str, np.ndarray], List[Dict[str, np.ndarray]]]
+
+
+class ColorSegmenter:
+    """
+    Compiled multi-color segmentation in LAB color space.
+
+    All configured color ranges are compiled into per-channel lookup tables
+    once. Every pixel is then classified against all ranges in a single pass
+    and the result is stored as a bit-packed label image, from which the mask
+    of each color can be extracted cheaply.
+
+    :param colors: Color bounds by name, each either a dict with ``lower`` and
+        ``upper`` or a list of such dicts (wrap-around ranges).
+    :type colors: dict
+    """
+
+    def __init__(self, colors: Dict[str, ColorBounds]) -> None:
+        """
+        Compile the lookup tables for the given color bounds.
+
+        :param colors: Color bounds by name.
+        :type colors: dict
+        """
+        # (plane index, bit mask) for every color name
+        self._bits: Dict[str, Tuple[int, int]] = {}
+        luts: List[np.ndarray] = []
+        bit = 8
+        for name, elements in colors.items():
+            if isinstance(elements, dict):
+                elements = [elements]
+            if len(elements) > 8:
+                raise ValueError(
+                    f"the color {name} has more than 8 ranges")
+            # keep all ranges of one color inside the same plane so the
+            # color mask is a single bit test
+            if bit + len(elements) > 8:
+                luts.append(np.zeros((3, 1, 256), dtype=np.uint8))
+                bit = 0
+            mask = 0
+            for elem in elements:
+                luts[-1][:, 0, :] |= (
+                    _range_table(elem["lower"], elem["upper"]) << bit)
+                mask |= 1 << bit
+                bit += 1
+            self._bits[name] = (len(luts) - 1, mask)
+        self._luts: List[np.ndarray] = luts
+
+    @property
+    def planes(self) -> int:
+        """
+        Number of 8 bit planes of the label image.
+
+        :return: Number of planes.
+        :rtype: int
+        """
+        return len(self._luts)
+
+    def classify(self, lab: np.ndarray) -> np.ndarray:
+        """
+        Classify every pixel of a LAB image against all color ranges.
+
+        :param lab: LAB color image (uint8, three channels).
+        :type lab: np.ndarray
+        :return: Label image of shape (planes, height, width); bit ``k`` of a
+            plane is set if the pixel lies inside the ``k``-th range.
+        :rtype: np.ndarray
+        """
+        channels = cv2.split(lab)
+        labels = np.empty((len(self._luts),) + lab.shape[:2], dtype=np.uint8)
+        for i, lut in enumerate(self._luts):
+            cv2.LUT(channels[0], lut[0], dst=labels[i])
+            cv2.bitwise_and(
+                labels[i], cv2.LUT(channels[1], lut[1]), dst=labels[i])
+            cv2.bitwise_and(
+                labels[i], cv2.LUT(channels[2], lut[2]), dst=labels[i])
+        return labels
+
+    def get_mask(self, labels: np.ndarray, name: str) -> np.ndarray:
+        """
+        Extract the binary mask of one color from a label image.
+
+        :param labels: Label image created by :meth:`classify`.
+        :type labels: np.ndarray
+        :param name: Color name.
+        :type name: str
+        :return: Mask with 255 where the color matches, 0 elsewhere.
+        :rtype: np.ndarray
+        :raises IndexError: If the color is not compiled into the segmenter.
+        """
+        if name not in self._bits:
+            raise IndexError(
+                f"the color {name} is not defined in the color list")
+        plane, mask = self._bits[name]
+        return cv2.compare(
+            cv2.bitwise_and(labels[plane], mask), 0, cv2.CMP_GT)
+
+
+def _range_table(lower: np.ndarray, upper: np.ndarray) -> np.ndarray:
+    """
+    Build the per-channel membership table of one color range.
+
+    ``cv2.inRange`` itself is evaluated on a ramp of all 256 values, so the
+    rounding of the bounds is exactly the same as with a direct call.
+
+    :param lower: Lower LAB bound.
+    :type lower: np.ndarray
+    :param upper: Upper LAB bound.
+    :type upper: np.ndarray
+    :return: Table of shape (3, 256) with 1 where the value is in range.
+    :rtype: np.ndarray
+    """
+    ramp = np.arange(256, dtype=np.uint8).reshape(1, 256)
+    table = np.empty((3, 256), dtype=np.uint8)
+    for channel in range(3):
+        table[channel] = cv2.inRange(
+            ramp, float(lower[channel]), float(upper[channel])).ravel() // 255
+    return table
@@ -0,0 +1,147 @@
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+import numpy as np
+
+
+class FrameTimer:
+    """
+    Lap timer of the stages of one frame. Every :meth:`lap` adds the time
+    since the previous lap to a stage, so consecutive stages only need one
+    clock read each.
+    """
+
+    __slots__ = ("times", "_start", "_last")
+
+    def __init__(self) -> None:
+        """
+        Start the timer.
+        """
+        self.times: Dict[str, float] = {}
+        self._start: float = time.perf_counter()
+        self._last: float = self._start
+
+    def lap(self, stage: str) -> None:
+        """
+        Add the time since the last lap to a stage.
+
+        :param stage: Name of the stage.
+        :type stage: str
+        :return: None
+        """
+        now = time.perf_counter()
+        self.times[stage] = self.times.get(stage, 0.0) + \
+            (now - self._last) * 1000
+        self._last = now
+
+    def add(self, times: Optional[Dict[str, float]],
+            prefix: str = "") -> None:
+        """
+        Add stage times measured elsewhere, e.g. in a worker process.
+
+        :param times: Milliseconds by stage.
+        :type times: dict or None
+        :param prefix: Put before the stage names, e.g. ``worker.`` for
+            stages that are part of a lap measured here.
+        :type prefix: str
+        :return: None
+        """
+        for stage, duration in (times or {}).items():
+            stage = prefix + stage
+            self.times[stage] = self.times.get(stage, 0.0) + duration
+
+    def result(self) -> Dict[str, float]:
+        """
+        The stage times and the total time since the start.
+
+        :return: Milliseconds by stage.
+        :rtype: dict
+        """
+        return {**self.times,
+                "total": (time.perf_counter() - self._start) * 1000}
+
+
+class _DisabledTimer:
+    """
+    Timer that records nothing, used if stage timing is disabled.
+    """
+
+    __slots__ = ()
+
+    def lap(self, stage: str) -> None:
+        pass
+
+    def add(self, times: Optional[Dict[str, float]],
+            prefix: str = "") -> None:
+        pass
+
+    def result(self) -> Optional[Dict[str, float]]:
+        return None
+
+
+# shared by all frames if stage timing is disabled
+DISABLED_TIMER = _DisabledTimer()
+
+
+class TimingStats:
+    """
+    Rolling statistics of the stage times of the last frames.
+
+    :param window: Number of frames the statistics are computed over.
+    :type window: int
+    """
+
+    def __init__(self, window: int = 100) -> None:
+        """
+        Initialize empty statistics.
+
+        :param window: Number of frames the statistics are computed over.
+        :type window: int
+        """
+        self.window: int = window
+        self._stages: Dict[str, Deque[float]] = {}
+
+    def add(self, times: Optional[Dict[str, float]]) -> None:
+        """
+        Add the stage times of a frame.
+
+        :param times: Milliseconds by stage, see :meth:`FrameTimer.result`.
+        :type times: dict or None
+        :return: None
+        """
+        for stage, duration in (times or {}).items():
+            if stage not in self._stages:
+                self._stages[stage] = deque(maxlen=self.window)
+            self._stages[stage].append(duration)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Mean, median, 90th percentile and maximum of every stage in
+        milliseconds.
+
+        :return: Statistics by stage.
+        :rtype: dict
+        """
+        out: Dict[str, Dict[str, float]] = {}
+        for stage, durations in self._stages.items():
+            values = np.array(durations)
+            out[stage] = {
+                "mean": float(values.mean()),
+                "p50": float(np.percentile(values, 50)),
+                "p90": float(np.percentile(values, 90)),
+                "max": float(values.max()),
+                "frames": len(values)
+            }
+        return out
+
+    def report(self) -> List[str]:
+        """
+        One short line per stage with the median, 90th percentile and
+        maximum, e.g. for status messages.
+
+        :return: Lines like ``detection p50 12.1 p90 15.3 max 20.4 ms``.
+        :rtype: list[str]
+        """
+        return [f"{stage} p50 {times['p50']:.1f} p90 {times['p90']:.1f} "
+                f"max {times['max']:.1f} ms"
+                for stage, times in self.summary().items()]
@@ -0,0 +1,76 @@
+import time
+from typing import List, Optional
+
+
+class TargetTracker:
+    """
+    Remembers the last detection of a target across consecutive frames, so
+    the next frame only has to be searched near its predicted position.
+
+    :param timeout: Seconds after which a detection is too old to be used
+        for a prediction.
+    :type timeout: float
+    """
+
+    def __init__(self, timeout: float = 1.0) -> None:
+        """
+        Initialize the TargetTracker without a target.
+
+        :param timeout: Seconds after which a detection is too old to be used
+            for a prediction.
+        :type timeout: float
+        """
+        self.timeout: float = timeout
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Forget the last detection, the next frame is searched completely.
+
+        :return: None
+        """
+        self.target: Optional[str] = None
+        self.bound_box: Optional[dict] = None
+        self.position: Optional[List[float]] = None
+        self.height: float = 0
+        self.time: float = 0
+
+    def update(
+        self,
+        target: str,
+        bound_box: dict,
+        position: List[float],
+        height: float
+    ) -> None:
+        """
+        Remember a detection.
+
+        :param target: Identifier of the searched target, e.g. color and
+            shape.
+        :type target: str
+        :param bound_box: Bounding box of the detected object in pixels.
+        :type bound_box: dict
+        :param position: Drone position (xyz) and attitude when the frame was
+            taken.
+        :type position: list[float]
+        :param height: Relative height when the frame was taken.
+        :type height: float
+        :return: None
+        """
+        self.target = target
+        self.bound_box = dict(bound_box)
+        self.position = list(position)
+        self.height = height
+        self.time = time.time()
+
+    def is_tracking(self, target: str) -> bool:
+        """
+        Check whether a recent detection of the target is known.
+
+        :param target: Identifier of the searched target.
+        :type target: str
+        :return: True if the last detection can be used for a prediction.
+        :rtype: bool
+        """
+        return self.target == target and \
+            time.time() - self.time <= self.timeout
@@ -0,0 +1,141 @@
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from payloadcomputerdroneprojekt.image_analysis.timing import \
+    DISABLED_TIMER, FrameTimer
+
+# analysis object of the worker process, see init_worker
+_analysis: Optional[Any] = None
+# stores the result images of analyse_stored_frame, by directory
+_archives: Dict[str, Any] = {}
+
+
+def init_worker(config: dict) -> None:
+    """
+    Initializer of the analysis worker processes. Builds the image analysis
+    of the process once, without camera, telemetry and data storage.
+
+    :param config: Image configuration dictionary.
+    :type config: dict
+    :return: None
+    """
+    # imported here, the module is loaded by the worker processes first
+    from payloadcomputerdroneprojekt.image_analysis.ia_class import \
+        ImageAnalysis
+
+    global _analysis
+    _analysis = ImageAnalysis(
+        {**config, "analysis_workers": 0}, None, None, store_data=False)
+
+
+def _store_images(result: Dict[str, Any], target: str, stem: str) -> None:
+    """
+    Store the result images of an analysis in the worker, so they are not
+    sent back to the main process. Images of kinds whose backend shares a
+    file between the images, like the raw ring, stay in the result and are
+    stored by the main process.
+
+    :param result: Result of :meth:`ImageAnalysis._analyse_frame`, the
+        stored images are moved to ``stored_images`` as file name and
+        archive record by name.
+    :type result: dict
+    :param target: Directory the images are stored in.
+    :type target: str
+    :param stem: Prefix of the file names, the time of the data item.
+    :type stem: str
+    :return: None
+    """
+    from payloadcomputerdroneprojekt.image_analysis.archive import Archive
+
+    if target not in _archives:
+        _archives[target] = Archive(target, _analysis.config.get("archive"))
+    archive = _archives[target]
+    stored: Dict[str, Any] = {}
+    for name, image in list(result["images"].items()):
+        kind = "mask" if image.ndim == 2 else "image"
+        if archive.separate_files(kind):
+            stored[name] = archive.store(image, f"{stem}_{name}", kind)
+            del result["images"][name]
+    result["stored_images"] = stored
+
+
+def analyse_shared_frame(
+    name: str,
+    shape: Tuple[int, ...],
+    dtype: str,
+    position_data: List[Any],
+    height: float,
+    timing: bool = False,
+    target: Optional[str] = None,
+    stem: str = ""
+) -> Dict[str, Any]:
+    """
+    Analyse a frame that is stored in shared memory. The frame is read in
+    place and not modified. With a target directory the result images are
+    stored by the worker, see :func:`_store_images`.
+
+    :param name: Name of the shared memory block.
+    :type name: str
+    :param shape: Shape of the frame.
+    :type shape: tuple
+    :param dtype: Numpy dtype string of the frame.
+    :type dtype: str
+    :param position_data: Position (lat, lon, alt, ...).
+    :type position_data: list
+    :param height: Height value.
+    :type height: float
+    :param timing: Measure the stage times of the analysis.
+    :type timing: bool
+    :param target: Directory the result images are stored in, None sends
+        them back.
+    :type target: str or None
+    :param stem: Prefix of the file names of the result images.
+    :type stem: str
+    :return: Result of :meth:`ImageAnalysis._analyse_frame`, with the stage
+        times in milliseconds under ``timings`` if measured.
+    :rtype: dict
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        image = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        timer = FrameTimer() if timing else DISABLED_TIMER
+        result = _analysis._analyse_frame(image, position_data, height, timer)
+        if target is not None:
+            _store_images(result, target, stem)
+        if timing:
+            result["timings"] = timer.times
+        del image
+    finally:
+        shm.close()
+    return result
+
+
+def analyse_stored_frame(
+    source: str,
+    target: str,
+    item: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Load a stored frame of a data item and analyse it again. The result
+    images are stored into the target directory by the worker, see
+    :func:`_store_images`.
+
+    :param source: Directory of the stored frame.
+    :type source: str
+    :param target: Directory the result images are stored in.
+    :type target: str
+    :param item: Data item of the frame, with raw_image, image_pos, height
+        and time.
+    :type item: dict
+    :return: Result of :meth:`ImageAnalysis._analyse_frame` with the
+        stored images.
+    :rtype: dict
+    """
+    from payloadcomputerdroneprojekt.image_analysis.archive import load_image
+
+    image = load_image(source, item["raw_image"],
+                       item.get("archive", {}).get("raw_image"))
+    result = _analysis._analyse_frame(image, item["image_pos"],
+                                      item["height"])
+    _store_images(result, target, str(item["time"]))
+    return result
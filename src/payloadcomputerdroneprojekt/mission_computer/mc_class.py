@@ -248,6 +248,7 @@ class MissionComputer:
         if self.progress >= self.max_progress:
             await self.status("Mission Completed")
             self.running = False
+            await self._image.close()
             if os.path.exists(MISSION_PROGRESS):
                 os.remove(MISSION_PROGRESS)
             if os.path.exists(MISSION_PATH):
@@ -311,9 +312,10 @@ class MissionComputer:
                 sp("Main programm already canceled")
             for task in self.cancel_list:
                 try:
-                    task()
+                    await task()
                 except Exception as e:
                     sp(f"Error in canceling: {e}")
+            await self._image.close()
         self.running = False
         self.initiate(plan)
         self.task = self._start
@@ -331,13 +333,16 @@ class MissionComputer:
 
     async def stop_camera(self, options: dict) -> None:
         """
-        Stop the camera subsystem and process filtered objects.
+        Stop the camera subsystem, report the frame stage timings if
+        measured and process filtered objects.
 
         :param options: Options for stopping the camera.
         :type options: dict
         """
         await self.status("Stopping Camera")
-        self._image.stop_cam()
+        await self._image.stop_cam()
+        for line in self._image.timing_stats.report():
+            await self.status(f"Timing {line}")
         self._image.get_filtered_objs()
 
     async def takeoff(self, options: dict) -> None:
@@ -359,12 +364,23 @@ class MissionComputer:
         detection.
 
         :param objective: Dictionary with landing coordinates and optional
-            color/shape.
+            color/shape. Without coordinates the best track of the color and
+            shape with at least ``min_confidence`` (default 0.75) is used.
         :type objective: dict
         """
         if not await self._comms.is_flying():
             return
 
+        if "lat" not in objective and "color" in objective:
+            # a single detection is a track of confidence 0.5
+            tracks = self._image.get_tracks(
+                objective["color"], objective.get("shape"),
+                objective.get("min_confidence", 0.75))
+            if len(tracks) > 0:
+                sp(f"Using track {tracks[0]['id']} of {objective['color']}")
+                objective = {**objective, "lat": tracks[0]["lat"],
+                             "lon": tracks[0]["lon"]}
+
         if "lat" in objective and "lon" in objective:
             sp(f"Landing at {objective['lat']:.6f} {objective['lon']:.6f}")
             await self.mov(options=objective)
@@ -529,13 +545,15 @@ class MissionComputer:
 
     async def mov_to_objects_cap_pic(self, options: dict) -> None:
         """
-        Move to detected objects and capture images at each location.
+        Move to the tracked objects and capture images at each location.
 
-        :param options: Dictionary with movement and delay options.
+        :param options: Dictionary with movement, delay and optional
+            min_confidence of the tracks.
         :type options: dict
         """
         sp("Moving to objects and taking picture")
-        obj: List[dict] = self._image.get_filtered_objs()
+        obj: List[dict] = self._image.get_tracks(
+            min_confidence=options.get("min_confidence", 0))
         path: List[Any] = find_shortest_path(
             obj, await self._comms.get_position_lat_lon_alt())
         if "height" in options.keys():
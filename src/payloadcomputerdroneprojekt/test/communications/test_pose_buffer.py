@@ -0,0 +1,89 @@
+import unittest
+import asyncio
+from types import SimpleNamespace
+from payloadcomputerdroneprojekt.communications.pose_buffer import PoseBuffer
+from payloadcomputerdroneprojekt.communications.comm_class import \
+    Communications
+
+
+def fake_drone(lost):
+    async def position():
+        while True:
+            yield SimpleNamespace(latitude_deg=48.0, longitude_deg=11.0,
+                                  relative_altitude_m=5.0)
+            await asyncio.sleep(0.01)
+
+    async def attitude():
+        while True:
+            yield SimpleNamespace(roll_deg=0, pitch_deg=0, yaw_deg=90)
+            await asyncio.sleep(0.01)
+
+    async def connection_state():
+        yield SimpleNamespace(is_connected=True)
+        await lost.wait()
+        yield SimpleNamespace(is_connected=False)
+
+    return SimpleNamespace(
+        telemetry=SimpleNamespace(position=position,
+                                  attitude_euler=attitude),
+        core=SimpleNamespace(connection_state=connection_state))
+
+
+class TestPoseBuffer(unittest.TestCase):
+    def test_empty(self):
+        assert PoseBuffer().interpolate(1.0) is None
+
+    def test_interpolate(self):
+        poses = PoseBuffer(max_age=0.1)
+        poses.append(1.0, [48.0, 11.0, 10.0, 0, 0, 170])
+        poses.append(2.0, [48.2, 11.4, 12.0, 2, -2, -170])
+
+        pose = poses.interpolate(1.5)
+        for value, expected in zip(pose, [48.1, 11.2, 11.0, 1, -1, -180]):
+            self.assertAlmostEqual(value, expected)
+        assert poses.interpolate(1.0) == [48.0, 11.0, 10.0, 0, 0, 170]
+        assert poses.interpolate(2.05) == [48.2, 11.4, 12.0, 2, -2, -170]
+        assert poses.interpolate(0.5) is None
+        assert poses.interpolate(2.5) is None
+
+    def test_ring(self):
+        poses = PoseBuffer(capacity=3)
+        for i in range(5):
+            poses.append(float(i), [i, 0, 0, 0, 0, 0])
+        assert len(poses) == 3
+        assert poses.samples()[:, 0].tolist() == [2.0, 3.0, 4.0]
+        assert poses.interpolate(1.5) is None
+        self.assertAlmostEqual(poses.interpolate(3.25)[0], 3.25)
+        self.assertAlmostEqual(poses.interpolate(2.5)[0], 2.5)
+        assert poses.interpolate(4.0)[0] == 4.0
+
+    def test_wrap_angles(self):
+        poses = PoseBuffer(capacity=4)
+        yaws = [150, 170, -170, -150, -130]
+        for i, yaw in enumerate(yaws):
+            poses.append(float(i), [0, 0, 0, 0, 0, yaw])
+        for t in [1.0, 1.25, 1.5, 1.75, 2.0, 2.5, 3.5]:
+            yaw = poses.interpolate(t)[5]
+            assert -180 <= yaw < 180
+        self.assertAlmostEqual(poses.interpolate(1.25)[5], 175)
+        self.assertAlmostEqual(poses.interpolate(1.75)[5], -175)
+
+
+    def test_stream_stops_on_disconnect(self):
+        async def run():
+            comms = Communications("")
+            lost = asyncio.Event()
+            comms.drone = fake_drone(lost)
+            comms.start_pose_stream()
+            tasks = comms._pose_tasks
+            await asyncio.sleep(0.05)
+            assert len(comms.poses) > 0
+            lost.set()
+            await asyncio.wait(tasks)
+            assert comms._pose_tasks == []
+            assert all(task.done() for task in tasks)
+        asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import tempfile
+from os.path import getsize, join
+import numpy as np
+from payloadcomputerdroneprojekt.image_analysis.archive import \
+    Archive, RING_HEADER, load_image
+from payloadcomputerdroneprojekt.image_analysis.data_handler import \
+    DataHandler
+
+
+class TestArchive(unittest.TestCase):
+    def test_default(self):
+        with tempfile.TemporaryDirectory() as path:
+            archive = Archive(path)
+            frame = np.full((40, 60, 3), 100, dtype=np.uint8)
+            filename, record = archive.store(frame, "1_raw_image", "raw")
+            assert filename == "1_raw_image.jpg"
+            assert record == {"backend": "jpeg"}
+
+            mask = np.zeros((40, 60), dtype=np.uint8)
+            mask[10:20, 10:30] = 255
+            filename, record = archive.store(mask, "1_red", "mask")
+            assert filename == "1_red.png"
+            assert (load_image(path, filename, record) == mask).all()
+
+    def test_scale(self):
+        with tempfile.TemporaryDirectory() as path:
+            archive = Archive(path, {"image": {
+                "backend": "webp", "quality": 50, "scale": 0.5}})
+            filename, record = archive.store(
+                np.zeros((40, 60, 3), dtype=np.uint8), "1_computed_image")
+            assert filename == "1_computed_image.webp"
+            assert record == {"backend": "webp", "scale": 0.5}
+            assert load_image(path, filename).shape == (20, 30, 3)
+
+    def test_raw_ring(self):
+        with tempfile.TemporaryDirectory() as path:
+            archive = Archive(path, {"raw": {"backend": "raw_ring",
+                                             "slots": 2}})
+            frames = [np.full((4, 6, 3), i, dtype=np.uint8)
+                      for i in range(3)]
+            stored = [archive.store(frame, f"{i}_raw_image", "raw")
+                      for i, frame in enumerate(frames)]
+            archive.flush()
+
+            filename = stored[0][0]
+            assert filename == "raw_ring_4x6x3_uint8.bin"
+            assert getsize(join(path, filename)) == \
+                RING_HEADER + 2 * 4 * 6 * 3
+            assert [record["slot"] for _, record in stored] == [0, 1, 0]
+            # the first frame is overwritten by the third one
+            assert (load_image(path, *stored[1]) == frames[1]).all()
+            assert (load_image(path, *stored[2]) == frames[2]).all()
+
+            # a reopened ring continues after the last frame
+            archive = Archive(path, {"raw": {"backend": "raw_ring",
+                                             "slots": 2}})
+            frame = np.full((4, 6, 3), 3, dtype=np.uint8)
+            _, record = archive.store(frame, "3_raw_image", "raw")
+            archive.flush()
+            assert record["slot"] == 1
+            assert (load_image(path, *stored[2]) == frames[2]).all()
+            assert (load_image(path, filename, record) == frame).all()
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            Archive("", {"raw": {"backend": "tiff"}})
+
+    def test_data_handler(self):
+        with tempfile.TemporaryDirectory() as path:
+            handler = DataHandler(path, archive={"raw": {"backend": "png"}})
+            with handler as item:
+                item.add_raw_image(np.zeros((8, 8, 3), dtype=np.uint8))
+            data = handler.get_items()[0]
+            assert data["raw_image"].endswith(".png")
+            assert data["archive"] == {"raw_image": {"backend": "png"}}
+
+
+if __name__ == '__main__':
+    unittest.main()
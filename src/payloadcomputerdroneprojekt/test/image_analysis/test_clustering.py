@@ -0,0 +1,112 @@
+import unittest
+import json
+import tempfile
+import numpy as np
+from payloadcomputerdroneprojekt.image_analysis.clustering import \
+    ObjectClusterer, cluster_positions, project_local
+from payloadcomputerdroneprojekt.image_analysis.data_handler import \
+    DataHandler, get_mean, sort_list
+from payloadcomputerdroneprojekt.image_analysis.detection import Detection
+
+
+def make_objects(n, seed=0):
+    rng = np.random.default_rng(seed)
+    objects = []
+    for i in range(n):
+        obj = Detection(["red", "blue"][i % 2], 0, 0, 1, 1)
+        obj.lat_lon = [48 + rng.random() * 5e-4, 11 + rng.random() * 5e-4]
+        obj.shape = ["Kreis", "Dreieck", None][i % 3]
+        obj.id = f"{i}_0"
+        obj.time = i
+        objects.append(obj)
+    return objects
+
+
+def groups(output):
+    return {color: sorted(sorted(c["ids"]) for c in clusters)
+            for color, clusters in output.items()}
+
+
+class TestClustering(unittest.TestCase):
+    def test_grid_matches_hierarchical(self):
+        rng = np.random.default_rng(1)
+        # dense clumps, so neighbor cells are also compared with a KD-tree
+        centers = rng.random((20, 2)) * 200
+        points = np.vstack([rng.normal(center, 1.5, (100, 2))
+                            for center in centers]
+                           + [rng.random((300, 2)) * 200])
+        for threshold in [0.5, 3, 8]:
+            grid = cluster_positions(points, threshold)
+            assert list(grid) == list(cluster_positions(
+                points, threshold, "hierarchical"))
+            assert grid[0] == 0
+        assert list(cluster_positions([(0, 0), (0, 0), (1, 0)], 0)) == \
+            [0, 0, 1]
+        with self.assertRaises(ValueError):
+            cluster_positions(points, 1, "tree")
+
+    def test_chain(self):
+        points = [(0, 0), (20, 0), (4, 0), (8, 0), (12, 0), (16, 0), (40, 0)]
+        assert list(cluster_positions(points, 4.5)) == [0, 0, 0, 0, 0, 0, 1]
+
+    def test_longitude_shrinkage(self):
+        # 4 m to the east at 60 degrees latitude
+        lat_lon = [(60, 11), (60, 11 + 4 / (110000 * 0.5))]
+        assert np.allclose(project_local(lat_lon)[1], (0, 4))
+        assert list(cluster_positions(project_local(lat_lon), 5)) == [0, 0]
+
+    def test_matches_fclusterdata(self):
+        objects = make_objects(60)
+        clusterer = ObjectClusterer(5)
+        object_store = {}
+        for obj in objects:
+            clusterer.add(obj, obj.time)
+            object_store.setdefault(obj.color, []).append(obj)
+
+        expected = get_mean(sort_list(object_store, 5, "hierarchical"))
+        result = clusterer.result()
+        assert groups(result) == groups(expected)
+        assert groups(get_mean(sort_list(object_store, 5))) == \
+            groups(expected)
+        means = {tuple(sorted(c["ids"])): (c["lat"], c["lon"])
+                 for clusters in expected.values() for c in clusters}
+        for clusters in result.values():
+            for cluster in clusters:
+                assert np.allclose(
+                    means[tuple(sorted(cluster["ids"]))],
+                    (cluster["lat"], cluster["lon"]))
+
+    def test_cached(self):
+        objects = make_objects(3)
+        clusterer = ObjectClusterer(5)
+        clusterer.add(objects[0], 0)
+        result = clusterer.result()
+        assert not clusterer.changed
+        assert clusterer.result() is result
+        clusterer.add(objects[1], 1)
+        assert clusterer.changed
+
+    def test_data_handler(self):
+        with tempfile.TemporaryDirectory() as path:
+            handler = DataHandler(path)
+            objects = make_objects(4)
+            with handler as item:
+                item.add_objects(objects[:2])
+            assert len(handler.get_filterd_items(5)["red"]) == 1
+
+            with handler as item:
+                item.add_objects(objects[2:])
+            output = handler.get_filterd_items(5)
+            assert sum(len(c) for c in output.values()) <= 4
+            assert sorted(
+                id for c in output.values() for o in c for id in o["ids"]
+            ) == ["0_0", "0_1", "1_0", "1_1"]
+            with open(handler.get_filtered_storage()) as f:
+                assert json.load(f) == output
+
+            # loading the data file gives the same clusters
+            assert DataHandler(path).get_filterd_items(5) == output
+
+
+if __name__ == '__main__':
+    unittest.main()
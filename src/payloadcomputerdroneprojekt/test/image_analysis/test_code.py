@@ -1,10 +1,12 @@
 import unittest
 from payloadcomputerdroneprojekt.image_analysis.math_helper \
-    import find_relative_position
+    import find_relative_position, find_code_marker
+from payloadcomputerdroneprojekt.image_analysis.detection import Detection
 from itertools import permutations
 from payloadcomputerdroneprojekt.image_analysis import ImageAnalysis
 import os
 import cv2
+import numpy as np
 import tempfile
 import json
 from payloadcomputerdroneprojekt.test.image_analysis.helper \
@@ -24,6 +26,51 @@ class TestCode(unittest.TestCase):
             assert o_r[0] == 1
             assert o_r[1] == 1
 
+    def test_find_code_marker(self):
+        points = [(40, 60), (10, 10), (10, 50), (50, 10), (30, 25)]
+        indices, confidence = find_code_marker(points)
+        # same orientation as find_relative_position, y pointing up
+        assert list(indices) == [1, 3, 2]
+        self.assertAlmostEqual(confidence, 1)
+
+        # a distractor of a different size lowers the score of its triples
+        points = [(10, 10), (10, 50), (50, 10), (50, 50)]
+        indices, _ = find_code_marker(points, [8, 8, 8, 20])
+        assert list(indices) == [0, 2, 1]
+        assert find_code_marker(points[:2]) is None
+        assert find_code_marker([(0, 0), (1, 1), (2, 2)]) is None
+
+    def test_find_code_marker_distractors(self):
+        # a marker of three large elements among many small squares
+        rng = np.random.default_rng(0)
+        distractors = rng.uniform(0, 400, (500, 2))
+        points = np.concatenate(
+            [distractors[:200], [(100, 100), (100, 160), (160, 100)],
+             distractors[200:]])
+        sizes = np.concatenate(
+            [rng.uniform(2, 6, 200), [12, 12, 12], rng.uniform(2, 6, 300)])
+        indices, confidence = find_code_marker(points, sizes)
+        assert list(indices) == [200, 202, 201]
+        self.assertAlmostEqual(confidence, 1)
+
+    def test_find_code(self):
+        with open(os.path.join(FILE_PATH, "test_config_2.json")) as json_data:
+            config = json.load(json_data)["image"]
+        config["path"] = tempfile.mkdtemp(prefix="image_analysis")
+        config["bounding_box_shrink_percentage"] = 0
+        ia = ImageAnalysis(config, None, None)
+
+        mask = np.zeros((200, 200), dtype=np.uint8)
+        for x, y, size in [(20, 20, 20), (20, 120, 20), (120, 20, 20),
+                           (100, 100, 60)]:
+            mask[y:y+size, x:x+size] = 255
+        obj = Detection("orange", 0, 0, 200, 200)
+        for elements in [None, ia.find_code_elements(mask)]:
+            assert ia.find_code(obj, mask, elements=elements)
+            assert [(c["x"], c["y"]) for c in obj.code] == [
+                (20, 20), (120, 20), (20, 120)]
+            assert obj.code_confidence > 0.9
+
     def test_compute_image_code(self):
         path = tempfile.mkdtemp(prefix="image_analysis")
         with open(os.path.join(FILE_PATH, "test_config_2.json")) as json_data:
@@ -58,6 +105,9 @@ class TestCode(unittest.TestCase):
             ret = ia._get_current_offset_closest(
                 [0, 0, 0, 0, 0, 0], 1, image, "yellow", "Kreis", item=item)
         print(ret)
+        # the color mask is archived as mask
+        assert ia._data_handler.get_items()[0]["computed_image"] \
+            .endswith(".png")
 
     def test_compute_image_2(self):
         path = tempfile.mkdtemp(prefix="image_analysis")
@@ -91,6 +141,46 @@ class TestCode(unittest.TestCase):
                 [0, 0, 0, 0, 0, 0], 1, image, "orange", "Code", item=item)
         print(f"Code 3: {ret}")
 
+    def test_tracking(self):
+        path = tempfile.mkdtemp(prefix="image_analysis")
+        with open(os.path.join(FILE_PATH, "config_px4.json")) as json_data:
+            config = json.load(json_data)["image"]
+
+        config["path"] = path
+        config["tracking"] = True
+
+        cam = TestCamera(config)
+        ia = ImageAnalysis(config, cam, TestCommunications(""))
+        image = cv2.imread(os.path.join(
+            FILE_PATH, "static_image", "inflight_code.jpg"))
+
+        # regions of interest every search of a frame is restricted to
+        searches = []
+        get_closest_element = ia.get_closest_element
+
+        def record(*args, **kwargs):
+            searches.append(kwargs["context"].rois)
+            return get_closest_element(*args, **kwargs)
+        ia.get_closest_element = record
+
+        rets = []
+        for _ in range(2):
+            searches.clear()
+            with ia._data_handler as item:
+                rets.append(ia._get_current_offset_closest(
+                    [0, 0, 0, 0, 0, 0], 1, image, "orange", "Code",
+                    item=item))
+            assert rets[-1][0] is not None
+            assert ia._tracker.is_tracking("orange/Code")
+        # the second frame is only searched in the predicted window
+        assert len(searches) == 1 and len(searches[0]) == 1
+        window = searches[0][0]
+        assert (window[2] - window[0]) * (window[3] - window[1]) < \
+            image.shape[0] * image.shape[1]
+        # the threshold of the window may differ slightly from the frame
+        assert np.allclose(rets[0][0], rets[1][0], atol=0.005)
+        self.assertAlmostEqual(rets[0][1], rets[1][1], delta=0.01)
+        self.assertAlmostEqual(rets[0][2], rets[1][2], delta=1)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+import json
+import tempfile
+from os.path import join
+from payloadcomputerdroneprojekt.image_analysis.data_index import DataIndex
+from payloadcomputerdroneprojekt.image_analysis.data_handler import \
+    DataHandler
+
+
+def records(n):
+    return [{"time": 100 + i, "found_objs": [{"color": "red", "id": f"{i}_0"}],
+             "image_pos": [48, 11, 10], "id": i} for i in range(n)]
+
+
+class TestDataIndex(unittest.TestCase):
+    def test_lines(self):
+        with tempfile.TemporaryDirectory() as path:
+            filename = join(path, "__data__.json")
+            with open(filename, "w") as f:
+                for record in records(5):
+                    f.write(json.dumps(record) + "\n")
+                # key order of an item changed after it was saved
+                f.write(json.dumps({"id": 5, "time": 105}) + "\n")
+
+            index = DataIndex(filename)
+            assert len(index) == 6
+            assert list(index)[:5] == records(5)
+            assert index[2] == records(5)[2]
+            assert index.get(3) == records(5)[3]
+            assert index.get(5) == {"id": 5, "time": 105}
+            assert index.get(7) is None
+            assert index.id_at(104) == 4
+            assert index.id_at(105) == 5
+            assert index.ids == list(range(6))
+
+    def test_incomplete_line(self):
+        with tempfile.TemporaryDirectory() as path:
+            filename = join(path, "__data__.json")
+            with open(filename, "w") as f:
+                for record in records(2):
+                    f.write(json.dumps(record) + "\n")
+                f.write(json.dumps(records(3)[2])[:20])
+
+            assert list(DataIndex(filename)) == records(2)
+            with open(filename) as f:
+                assert f.read().endswith("}\n")
+
+    def test_array(self):
+        with tempfile.TemporaryDirectory() as path:
+            filename = join(path, "__data__.json")
+            with open(filename, "w") as f:
+                json.dump(records(3), f)
+
+            index = DataIndex(filename)
+            assert list(index) == records(3)
+            assert index.get(1) == records(3)[1]
+            assert index.id_at(102) == 2
+
+            # lines appended after the array
+            with open(filename, "a") as f:
+                f.write(json.dumps(records(4)[3]) + "\n")
+            index = DataIndex(filename)
+            assert list(index) == records(4)
+
+    def test_missing(self):
+        with tempfile.TemporaryDirectory() as path:
+            index = DataIndex(join(path, "__data__.json"))
+            assert len(index) == 0
+            assert list(index) == []
+
+    def test_data_handler(self):
+        with tempfile.TemporaryDirectory() as path:
+            handler = DataHandler(path)
+            for _ in range(3):
+                with handler as item:
+                    item.add_height(10)
+            items = handler.get_items()
+
+            # restarted handler continues with the next id
+            handler = DataHandler(path)
+            assert handler.get_items() == items
+            assert handler.get_item(1) == items[1]
+            with handler as item:
+                item.add_height(20)
+            assert item._id == 3
+            assert handler.get_item(3)["height"] == 20
+            assert len(DataHandler(path).get_items()) == 4
+
+            handler.reset_data()
+            assert handler.get_items() == []
+
+    def test_spill(self):
+        with tempfile.TemporaryDirectory() as path:
+            handler = DataHandler(path, keep_items=2)
+            for i in range(5):
+                with handler as item:
+                    item.add_height(i)
+            assert len(handler.list) == 2
+            assert [item["height"] for item in handler.get_items()] == \
+                [0, 1, 2, 3, 4]
+            assert handler.get_item(1)["height"] == 1
+            assert DataHandler(path).get_items() == handler.get_items()
+
+
+if __name__ == '__main__':
+    unittest.main()
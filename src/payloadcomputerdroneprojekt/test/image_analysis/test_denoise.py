@@ -0,0 +1,75 @@
+import unittest
+from payloadcomputerdroneprojekt.image_analysis.denoise import \
+    DenoisePipeline, DEFAULT_DENOISE, otsu_threshold
+import cv2
+import numpy as np
+
+
+def random_mask():
+    rng = np.random.default_rng(1)
+    mask = np.zeros((120, 160), dtype=np.uint8)
+    mask[30:90, 40:120] = 255
+    mask[rng.random(mask.shape) < 0.05] = 255
+    return mask
+
+
+class TestDenoise(unittest.TestCase):
+    def test_default_matches_blur_otsu(self):
+        mask = random_mask()
+        blurred = cv2.GaussianBlur(mask, (7, 7), 0)
+        _, expected = cv2.threshold(
+            blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        assert (DenoisePipeline(DEFAULT_DENOISE)(mask) == expected).all()
+
+    def test_skips_stages_without_effect(self):
+        pipeline = DenoisePipeline([
+            {"op": "open", "size": 15, "enabled": False},
+            {"op": "close", "size": 1},
+            {"op": "box_blur", "size": [5, 1]},
+            {"op": "threshold", "value": 100}
+        ])
+        assert len(pipeline) == 2
+
+        mask = random_mask()
+        out = pipeline(mask)
+        assert set(np.unique(out)) <= {0, 255}
+
+    def test_morphology_removes_noise(self):
+        pipeline = DenoisePipeline([{"op": "open", "size": 5}])
+        out = pipeline(random_mask())
+        assert out[60, 80] == 255
+        assert out[:25].max() == 0
+
+    def test_otsu_threshold(self):
+        rng = np.random.default_rng(2)
+        for i in range(50):
+            mask = cv2.GaussianBlur(random_mask(), (7, 7), 0)
+            mask[rng.random(mask.shape) < i / 50] = 0
+            expected, _ = cv2.threshold(
+                mask, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            assert otsu_threshold(
+                np.bincount(mask.ravel(), minlength=256)) == expected
+
+    def test_split_matches_pipeline(self):
+        pipeline = DenoisePipeline(
+            DEFAULT_DENOISE + [{"op": "open", "size": 5, "iterations": 2}])
+        assert pipeline.radius == 3 + 8
+        mask = random_mask()
+        prefiltered = pipeline.prefilter(mask)
+        assert (pipeline.finish(prefiltered) == pipeline(mask)).all()
+        threshold = otsu_threshold(
+            np.bincount(prefiltered.ravel(), minlength=256))
+        assert (pipeline.finish(prefiltered, threshold) ==
+                pipeline(mask)).all()
+
+    def test_invalid_stage(self):
+        with self.assertRaises(ValueError):
+            DenoisePipeline([{"op": "sharpen"}])
+        with self.assertRaises(ValueError):
+            DenoisePipeline([{"op": "gaussian_blur", "size": 4}])
+        with self.assertRaises(ValueError):
+            DenoisePipeline([{"op": "open", "size": 5, "shape": "star"}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from payloadcomputerdroneprojekt.image_analysis.detection import Detection
+import json
+import numpy as np
+
+
+class TestDetection(unittest.TestCase):
+    def test_to_dict(self):
+        obj = Detection("red", 10, 20, 31, 41,
+                        np.array([[10, 20], [30, 20], [30, 40], [10, 40]],
+                                 dtype=np.int32))
+        obj.shape = "Rechteck"
+        assert obj.to_dict() == {
+            "color": "red",
+            "bound_box": {
+                "x_start": 10, "x_stop": 31, "y_start": 20, "y_stop": 41},
+            "x_center": 20,
+            "y_center": 30,
+            "contour": [[10, 20], [30, 20], [30, 40], [10, 40]],
+            "shape": "Rechteck"
+        }
+        json.dumps(obj.to_dict())
+
+    def test_round_trip(self):
+        obj = Detection("blue", 0, 0, 5, 7)
+        obj.lat_lon = [48.1, 11.5]
+        obj.id = "3_0"
+        data = obj.to_dict()
+        assert "contour" not in data
+        assert Detection.from_dict(data).to_dict() == data
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            Detection("blue", 0, 0, 5, 7).unknown = 1
+
+
+if __name__ == '__main__':
+    unittest.main()
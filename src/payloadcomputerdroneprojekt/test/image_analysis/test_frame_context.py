@@ -0,0 +1,44 @@
+import unittest
+from payloadcomputerdroneprojekt.image_analysis import ImageAnalysis
+import os
+import cv2
+import json
+import tempfile
+from payloadcomputerdroneprojekt.test.image_analysis.helper import FILE_PATH
+
+
+class TestFrameContext(unittest.TestCase):
+    def setUp(self):
+        with open(os.path.join(FILE_PATH, "test_config.json")) as json_data:
+            config = json.load(json_data)["image"]
+        config["path"] = tempfile.mkdtemp(prefix="image_analysis")
+        self.ia = ImageAnalysis(config, None, None)
+        self.image = cv2.imread(os.path.join(
+            FILE_PATH, "test_data", "artifical_1.jpg"))
+
+    def test_masks_are_memoized(self):
+        context = self.ia.frame_context(self.image)
+        assert context.lab is context.lab
+        assert context.get_mask("red") is context.get_mask("red")
+        assert self.ia.filter_shape_color(self.image, context) \
+            is context.shape_mask
+        assert self.ia.filter_color(self.image, "red", context=context) \
+            is context.get_mask("red")
+
+    def test_same_result_as_without_context(self):
+        context = self.ia.frame_context(self.image)
+        with_context, shape_context = self.ia.filter_colors(
+            self.image, context)
+        without_context, shape = self.ia.filter_colors(self.image)
+        assert (shape == shape_context).all()
+        for a, b in zip(with_context, without_context):
+            assert a["color"] == b["color"]
+            assert (a["filtered_image"] == b["filtered_image"]).all()
+
+    def test_unknown_color(self):
+        with self.assertRaises(IndexError):
+            self.ia.filter_color(self.image, "purple")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,6 +11,13 @@ import asyncio
 from payloadcomputerdroneprojekt.image_analysis.data_item import DataItem
 
 
+class SlowAnalysis(ImageAnalysis):
+    # analysis slower than the capture rate of the tests
+    def _analyse_frame(self, image, position_data, height, timer=None):
+        time.sleep(0.3)
+        return {"objects": [], "images": {}}
+
+
 class TestImage(unittest.TestCase):
     def test_fps(self):
         """
@@ -51,6 +58,78 @@ class TestImage(unittest.TestCase):
             assert ia.start_cam()
         asyncio.run(com())
 
+    def test_capture_rate(self):
+        path = tempfile.mkdtemp(prefix="image_analysis")
+        with open(os.path.join(FILE_PATH, "test_config.json")) as json_data:
+            config = json.load(json_data)["image"]
+
+        config["path"] = path
+        config["frame_drop_policy"] = "drop_newest"
+
+        cam = TestCamera(config)
+        ia = ImageAnalysis(config, cam, TestCommunications(""))
+
+        async def com():
+            assert ia.start_cam(10)
+            await asyncio.sleep(1.05)
+            assert await ia.stop_cam()
+        asyncio.run(com())
+
+        stats = ia.frame_stats
+        print(stats)
+        assert stats["captured"] > 0
+        assert stats["processed"] + stats["dropped"] <= stats["captured"]
+        assert stats["skipped"] == 0
+
+    def test_drop_policies(self):
+        with open(os.path.join(FILE_PATH, "test_config.json")) as json_data:
+            config = json.load(json_data)["image"]
+
+        for policy in ["drop_newest", "drop_oldest", "skip_analysis"]:
+            config["path"] = tempfile.mkdtemp(prefix="image_analysis")
+            config["frame_drop_policy"] = policy
+            ia = SlowAnalysis(config, TestCamera(config),
+                              TestCommunications(""))
+
+            async def com():
+                assert ia.start_cam(10)
+                await asyncio.sleep(1.05)
+                assert await ia.stop_cam()
+                await ia.close()
+            asyncio.run(com())
+
+            stats = ia.frame_stats
+            # the capture keeps its rate while a frame is analysed
+            assert stats["captured"] >= 8, (policy, stats)
+            assert 0 < stats["processed"] <= 4, (policy, stats)
+            if policy == "skip_analysis":
+                # only the frames queued when capturing stopped are dropped
+                assert stats["skipped"] > 0 and stats["dropped"] <= 2
+            else:
+                assert stats["dropped"] > 0 and stats["skipped"] == 0
+            assert stats["captured"] == stats["processed"] + \
+                stats["dropped"] + stats["skipped"] + stats["rejected"]
+            # close also stores the frame analysed when capturing stopped
+            items = ia._data_handler.get_items()
+            assert len(items) == stats["processed"] + stats["skipped"]
+
+    def test_rejected_frames(self):
+        with open(os.path.join(FILE_PATH, "test_config.json")) as json_data:
+            config = json.load(json_data)["image"]
+        config["path"] = tempfile.mkdtemp(prefix="image_analysis")
+        config["threashold"] = 1e9
+        ia = SlowAnalysis(config, TestCamera(config), TestCommunications(""))
+
+        async def com():
+            assert ia.start_cam(10)
+            await asyncio.sleep(0.55)
+            await ia.close()
+        asyncio.run(com())
+
+        stats = ia.frame_stats
+        assert stats["rejected"] > 0 and stats["processed"] == 0
+        assert stats["captured"] == stats["dropped"] + stats["rejected"]
+
     def test_color(self):
         """
         Tests if the function gets correct color
@@ -110,6 +189,37 @@ class TestImage(unittest.TestCase):
 
         ia.get_filtered_objs()
 
+    def test_image_loop_workers(self):
+        with open(os.path.join(FILE_PATH, "test_config.json")) as json_data:
+            config = json.load(json_data)["image"]
+
+        config["save_shape_image"] = True
+
+        results = []
+        for workers in [0, 2]:
+            config["path"] = tempfile.mkdtemp(prefix="image_analysis")
+            config["analysis_workers"] = workers
+            cam = TestCamera(config)
+            ia = ImageAnalysis(config, cam, TestCommunications(""))
+
+            async def loop():
+                for _ in range(4):
+                    await ia.image_loop()
+                await ia.close()
+            asyncio.run(loop())
+            # the worker processes are stopped
+            assert ia._executor is None
+            results.append(ia._data_handler.get_items())
+
+        inline, pooled = results
+        assert len(inline) == len(pooled) == 4
+        for a, b in zip(inline, pooled):
+            assert a["id"] == b["id"]
+            assert a["found_objs"] == b["found_objs"]
+            # stored by the workers
+            for name in ["computed_image", "shape", "blue"]:
+                assert os.path.exists(os.path.join(config["path"], b[name]))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import asyncio
+import tempfile
+from os.path import exists, join
+import numpy as np
+import cv2
+from payloadcomputerdroneprojekt.image_analysis.image_writer import \
+    ImageWriter
+from payloadcomputerdroneprojekt.image_analysis.data_handler import \
+    DataHandler
+
+
+class TestImageWriter(unittest.TestCase):
+    def test_write(self):
+        with tempfile.TemporaryDirectory() as path:
+            writer = ImageWriter(2, 2)
+            image = np.full((40, 60, 3), 200, dtype=np.uint8)
+            paths = [join(path, f"{i}.png") for i in range(5)]
+            for p in paths:
+                writer.write(p, image)
+            # the writer keeps its own copy
+            image[:] = 0
+            writer.flush()
+            assert writer.stats["written"] == 5
+            assert writer.stats["failed"] == 0
+            assert 0 <= writer.stats["mean_latency"] \
+                <= writer.stats["max_latency"]
+            for p in paths:
+                assert (cv2.imread(p) == 200).all()
+            writer.close()
+
+    def test_wait_ready(self):
+        with tempfile.TemporaryDirectory() as path:
+            writer = ImageWriter(1, 2)
+            image = np.zeros((2000, 2000, 3), dtype=np.uint8)
+            ticks = 0
+
+            async def tick():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0)
+
+            async def write():
+                ticker = asyncio.ensure_future(tick())
+                for i in range(6):
+                    await writer.wait_ready(2)
+                    writer.write(join(path, f"{i}.png"), image)
+                    writer.write(join(path, f"{i}_b.png"), image)
+                ticker.cancel()
+            asyncio.run(write())
+            writer.close()
+            # the event loop kept running while the queue was full
+            assert ticks > 0
+            assert writer.stats["written"] == 12
+
+    def test_failed(self):
+        with tempfile.TemporaryDirectory() as path:
+            writer = ImageWriter(1, 1)
+            writer.write(join(path, "missing", "0.jpg"),
+                         np.zeros((4, 4), dtype=np.uint8))
+            writer.close()
+            assert writer.stats == {"written": 0, "failed": 1,
+                                    "mean_latency": 0.0, "max_latency": 0.0}
+
+    def test_data_handler(self):
+        with tempfile.TemporaryDirectory() as path:
+            handler = DataHandler(path, ImageWriter(1, 1))
+            with handler as item:
+                item.add_raw_image(np.zeros((8, 8, 3), dtype=np.uint8))
+            handler.flush()
+            name = handler.get_items()[0]["raw_image"]
+            assert exists(join(path, name))
+            handler.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import numpy as np
+from payloadcomputerdroneprojekt.image_analysis.clustering import \
+    project_local, unproject_local
+from payloadcomputerdroneprojekt.image_analysis.detection import Detection
+from payloadcomputerdroneprojekt.image_analysis.object_tracker import \
+    ObjectTracker
+
+ORIGIN = np.array([48.0, 11.0])
+
+
+def detection(color, north, east, shape=None, size=10):
+    obj = Detection(color, 0, 0, size, size)
+    obj.lat_lon = list(unproject_local([(north, east)], ORIGIN)[0])
+    obj.shape = shape
+    return obj
+
+
+class TestObjectTracker(unittest.TestCase):
+    def test_unproject(self):
+        points = np.array([(0, 0), (12.5, -40)])
+        assert np.allclose(
+            project_local(unproject_local(points, ORIGIN), ORIGIN), points)
+
+    def test_tracks(self):
+        rng = np.random.default_rng(0)
+        tracker = ObjectTracker({"track_gate": 3})
+        for frame in range(20):
+            noise = rng.normal(0, 0.5, (3, 2))
+            tracker.update([
+                detection("red", *(np.array((0, 0)) + noise[0]), "Kreis"),
+                detection("red", *(np.array((20, 0)) + noise[1]), "Dreieck",
+                          size=10 + frame),
+                detection("blue", *(np.array((0, 1)) + noise[2]))
+            ], 100 * frame, 10)
+
+        tracks = tracker.tracks()
+        assert len(tracks) == 3
+        assert all(track["hits"] == 20 for track in tracks)
+        assert tracks[0]["confidence"] > 0.99
+
+        red = tracker.tracks("red", "Dreieck")
+        assert len(red) == 1
+        north, east = project_local([red[0]["pos"]], ORIGIN)[0]
+        assert np.hypot(north - 20, east) < 0.5
+        # the observation with the largest bounding box
+        assert red[0]["best"]["time"] == 1900
+        assert tracker.tracks("blue")[0]["shape"] is None
+
+    def test_association(self):
+        tracker = ObjectTracker({"track_gate": 3})
+        tracker.update([detection("red", 0, 0, "Kreis")], 0, 10)
+        # too far, other shape, other color
+        tracker.update([detection("red", 5, 0, "Kreis"),
+                        detection("red", 0, 0.5, "Dreieck"),
+                        detection("blue", 0, 0)], 100, 10)
+        assert len(tracker.tracks()) == 4
+        # only one detection of a frame per track, the closest
+        tracker.update([detection("red", 1, 0), detection("red", 0.2, 0)],
+                       200, 10)
+        tracks = tracker.tracks("red", "Kreis")
+        assert [track["hits"] for track in tracks] == [2, 1]
+        assert tracker.tracks("red", "Dreieck")[0]["hits"] == 2
+        assert len(tracker.tracks(min_confidence=0.7)) == 2
+
+        tracker.reset()
+        assert tracker.tracks() == []
+
+    def test_ranking(self):
+        tracker = ObjectTracker({"track_gate": 3})
+        # the older track is seen less often, both saturate at 1.0
+        for frame in range(60):
+            objects = [detection("red", 0, 0)] if frame < 55 else []
+            if frame >= 1:
+                objects.append(detection("red", 20, 0))
+            tracker.update(objects, 100 * frame, 10)
+        tracks = tracker.tracks("red")
+        assert [track["confidence"] for track in tracks] == [1.0, 1.0]
+        assert [track["hits"] for track in tracks] == [59, 55]
+        north, _ = project_local([tracks[0]["pos"]], ORIGIN)[0]
+        assert abs(north - 20) < 0.5
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,10 @@
 from payloadcomputerdroneprojekt.image_analysis import ImageAnalysis
+import payloadcomputerdroneprojekt.image_analysis.math_helper as mh
 import unittest
 import os
 import json
 import numpy as np
+from payloadcomputerdroneprojekt.image_analysis.detection import Detection
 from payloadcomputerdroneprojekt.test.image_analysis.helper import FILE_PATH
 
 
@@ -467,6 +469,115 @@ class TestImage(unittest.TestCase):
         self.assertAlmostEqual(pos[0], 0.05, places=3)
         self.assertAlmostEqual(pos[1], 0, places=2)
 
+    def test_pixel_inverse_of_offset(self):
+        with open(os.path.join(FILE_PATH, "test_config.json")) as json_data:
+            config = json.load(json_data)["image"]
+
+        config["rotation_offset"] = [0, 0, 180]
+        config["path"] = "."
+        config["camera_offset"] = [0.05, 0, 0]
+        ia = ImageAnalysis(config, "", "")
+
+        rotation = [3, -5, 40]
+        pos = ia._get_local_offset((500, 120), rotation, 2, (460, 650))
+        pixel = ia._get_pixel(pos, rotation, (460, 650))
+        self.assertAlmostEqual(pixel[0], 500)
+        self.assertAlmostEqual(pixel[1], 120)
+
+    def test_batch_matches_single_pixel(self):
+        rotation = [3, -5, 40]
+        offset = [0, 0, 180]
+        pixels = [(0, 0), (500, 120), (649, 459), (325, 230)]
+        batch = mh.compute_ground_offsets(
+            pixels, rotation, 2, (460, 650), (66, 41),
+            rotation_offset=offset, camera_offset=[0.05, 0, 0])
+        assert batch.shape == (4, 3)
+        for pixel, pos in zip(pixels, batch):
+            local_vec = mh.compute_local(
+                pixel[0], pixel[1], np.array(rotation) + offset,
+                (460, 650), (66, 41))
+            expected = local_vec * 2 / local_vec[2] + \
+                mh.rotation_matrix(rotation) @ np.array([0.05, 0, 0])
+            assert np.allclose(pos, expected)
+
+    def test_camera_rays_are_cached(self):
+        rays = mh.get_camera_rays((460, 650), [66, 41])
+        assert rays is mh.get_camera_rays((460, 650), (66.0, 41.0))
+        pixels = np.array([(0, 0), (500, 120), (649, 459)])
+        assert np.allclose(rays.rays(pixels), rays.rays(pixels + 0.0))
+        for pixel, ray in zip(pixels, rays.rays(pixels)):
+            assert np.allclose(ray, mh.compute_pixel_vec(
+                pixel[0], pixel[1], (460, 650), (66, 41)))
+
+    def test_ground_rays_are_linear_in_height(self):
+        directions, origin = mh.compute_ground_rays(
+            [(0, 0), (500, 120)], [3, -5, 40], (460, 650), (66, 41),
+            rotation_offset=[0, 0, 180], camera_offset=[0.05, 0, 0])
+        for height in [0.5, 2, 7]:
+            assert np.allclose(
+                directions * height + origin, mh.compute_ground_offsets(
+                    [(0, 0), (500, 120)], [3, -5, 40], height, (460, 650),
+                    (66, 41), rotation_offset=[0, 0, 180],
+                    camera_offset=[0.05, 0, 0]))
+
+    def test_estimate_height(self):
+        height, residuals = mh.estimate_height([0.1, 0.2], [0.3, 0.6])
+        self.assertAlmostEqual(height, 3)
+        assert np.allclose(residuals, 0)
+        assert np.isnan(mh.estimate_height([0, 0], 0.5)[0])
+
+    def test_height_estimate_yaw(self):
+        with open(os.path.join(FILE_PATH, "test_config.json")) as json_data:
+            config = json.load(json_data)["image"]
+
+        config["rotation_offset"] = [0, 0, 180]
+        config["path"] = "."
+        config["camera_offset"] = [0, 0, 0]
+        ia = ImageAnalysis(config, "", "")
+
+        # code with 0.5 m sides seen from 3 m
+        rotation = [3, -5, 40]
+        obj = Detection("orange", 0, 0, 1, 1)
+        obj.code = []
+        for pos in [(0.3, 0.2, 3), (-0.2, 0.2, 3), (0.3, 0.7, 3)]:
+            x, y = ia._get_pixel(np.array(pos), rotation, (460, 650))
+            obj.code.append({"x": x, "y": y, "w": 0, "h": 0})
+
+        _, height, _ = ia._get_height_estimate_yaw(
+            obj, rotation, 1, (460, 650))
+        self.assertAlmostEqual(height, 3)
+        self.assertAlmostEqual(obj.h_residual, 0)
+
+    def test_footprint(self):
+        with open(os.path.join(FILE_PATH, "test_config.json")) as json_data:
+            config = json.load(json_data)["image"]
+
+        config["path"] = "."
+        ia = ImageAnalysis(config, "", "")
+
+        footprint = ia.get_footprint([0, 0, 0], 2, (460, 650))
+        assert footprint.shape == (4, 3)
+        # top left is in front and left of the drone
+        assert footprint[0][0] > 0
+        assert footprint[0][1] < 0
+        assert np.allclose(footprint[0][:2], -footprint[2][:2])
+
+
+    def test_offset_detection_and_dict(self):
+        with open(os.path.join(FILE_PATH, "test_config.json")) as json_data:
+            config = json.load(json_data)["image"]
+
+        config["path"] = "."
+        ia = ImageAnalysis(config, "", "")
+
+        obj = Detection("red", 400, 100, 451, 141)
+        rotation = [3, -5, 40]
+        pos = ia.get_local_offset(obj, rotation, 2, (460, 650))
+        for data in [obj.to_dict(),
+                     {"x_center": obj.x_center, "y_center": obj.y_center}]:
+            assert np.allclose(
+                ia.get_local_offset(data, rotation, 2, (460, 650)), pos)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import asyncio
+import json
+import os
+import tempfile
+import numpy as np
+import cv2
+from payloadcomputerdroneprojekt.image_analysis.quality import QualityGate
+from payloadcomputerdroneprojekt.image_analysis import ImageAnalysis
+FILE_PATH = os.path.split(os.path.abspath(__file__))[0]
+
+
+def checkerboard(size: int = 400, tile: int = 10) -> np.ndarray:
+    pattern = (np.indices((size, size)) // tile).sum(axis=0) % 2
+    return cv2.cvtColor((pattern * 255).astype(np.uint8),
+                        cv2.COLOR_GRAY2BGR)
+
+
+class TestQualityGate(unittest.TestCase):
+    def test_disabled(self):
+        assert not QualityGate({"threashold": -1}).enabled
+
+    def test_sharpness(self):
+        gate = QualityGate({"threashold": 100})
+        sharp = checkerboard()
+        blurred = cv2.GaussianBlur(sharp, (41, 41), 0)
+        assert gate.check(gate.measure(sharp)) is None
+        assert gate.check(gate.measure(blurred)) == "sharpness"
+
+    def test_exposure(self):
+        gate = QualityGate({"exposure_range": [20, 230]})
+        assert gate.check(gate.measure(checkerboard())) is None
+        dark = np.full((100, 100, 3), 5, dtype=np.uint8)
+        assert gate.check(gate.measure(dark)) == "exposure"
+
+    def test_motion_blur(self):
+        gate = QualityGate({"max_motion_blur": 0.5, "quality_scale": 1})
+        image = checkerboard()
+        kernel = np.full((1, 31), 1 / 31)
+        smeared = cv2.filter2D(image, -1, kernel)
+        assert gate.measure(image)["motion_blur"] < 0.1
+        assert gate.check(gate.measure(smeared)) == "motion_blur"
+        assert gate.check(gate.measure(smeared.transpose(1, 0, 2))) == \
+            "motion_blur"
+        # blur in all directions is no motion blur
+        blurred = cv2.GaussianBlur(image, (41, 41), 0)
+        assert gate.measure(blurred)["motion_blur"] < 0.1
+
+    def test_rejected_record(self):
+        with open(os.path.join(FILE_PATH, "test_config.json")) as json_data:
+            config = json.load(json_data)["image"]
+        config["path"] = tempfile.mkdtemp(prefix="image_analysis")
+        config["threashold"] = 1e9
+        config["rejected_record_every"] = 2
+        ia = ImageAnalysis(config, None, None)
+
+        async def analyse():
+            for _ in range(3):
+                await ia._analyse_captured(checkerboard(), [1, 1, 1, 0, 0, 0])
+        asyncio.run(analyse())
+
+        assert ia.frame_stats["rejected"] == 3
+        items = ia._data_handler.get_items()
+        assert len(items) == 2
+        assert items[0]["rejected"] == "sharpness"
+        assert "raw_image" not in items[0]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import asyncio
+import json
+import os
+import tempfile
+from payloadcomputerdroneprojekt.image_analysis import ImageAnalysis
+from payloadcomputerdroneprojekt.image_analysis.archive import load_image
+from payloadcomputerdroneprojekt.image_analysis.data_handler import \
+    DataHandler, FILENAME
+from payloadcomputerdroneprojekt.image_analysis.reprocess import reprocess
+from payloadcomputerdroneprojekt.test.image_analysis.helper \
+    import TestCommunications, TestCamera, FILE_PATH
+
+
+def objects(item):
+    # the object ids contain the item id
+    return [{**obj, "id": None} for obj in item["found_objs"]]
+
+
+class TestReprocess(unittest.TestCase):
+    def test_reprocess(self):
+        with open(os.path.join(FILE_PATH, "test_config.json")) as json_data:
+            config = json.load(json_data)["image"]
+        source = tempfile.mkdtemp(prefix="image_analysis")
+        config["path"] = source
+        # lossless frames, so they are analysed again exactly as live
+        config["archive"] = {"raw": {"backend": "png"}}
+        ia = ImageAnalysis(config, TestCamera(config), TestCommunications(""))
+
+        async def loop():
+            for _ in range(4):
+                await ia.image_loop()
+        asyncio.run(loop())
+        ia._data_handler.flush()
+        frames = [item for item in ia._data_handler.get_items()
+                  if "raw_image" in item]
+
+        results = []
+        for workers in [0, 2]:
+            target = tempfile.mkdtemp(prefix="reprocess")
+            handler = reprocess(source, target, config, workers)
+            result = handler.get_items()
+            assert [item["source_id"] for item in result] == \
+                [item["id"] for item in frames]
+            for a, b in zip(frames, result):
+                assert objects(a) == objects(b)
+                assert a["time"] == b["time"]
+            assert load_image(target, result[0]["raw_image"]) is not None
+            assert os.path.exists(
+                os.path.join(target, result[0]["computed_image"]))
+            results.append(result)
+        # the worker processes give the same results as the serial run
+        assert [objects(item) for item in results[0]] == \
+            [objects(item) for item in results[1]]
+
+        # interrupted after two items
+        with open(os.path.join(target, FILENAME)) as f:
+            lines = f.readlines()
+        with open(os.path.join(target, FILENAME), "w") as f:
+            f.writelines(lines[:2])
+        reprocess(source, target, config)
+        assert DataHandler(target).get_items() == result
+
+
+if __name__ == '__main__':
+    unittest.main()
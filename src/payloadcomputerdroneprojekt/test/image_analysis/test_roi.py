@@ -0,0 +1,102 @@
+import unittest
+from payloadcomputerdroneprojekt.image_analysis import ImageAnalysis
+from payloadcomputerdroneprojekt.image_analysis.roi import \
+    mask_boxes, scale_boxes, merge_boxes, remove_small_blobs
+import os
+import cv2
+import json
+import tempfile
+import numpy as np
+from payloadcomputerdroneprojekt.test.image_analysis.helper import FILE_PATH
+
+
+class TestRoi(unittest.TestCase):
+    def test_mask_boxes(self):
+        mask = np.zeros((100, 100), dtype=np.uint8)
+        mask[10:20, 30:50] = 255
+        mask[80, 80] = 255
+        assert mask_boxes(mask).tolist() == [
+            [30, 10, 50, 20], [80, 80, 81, 81]]
+        assert mask_boxes(mask, 5).tolist() == [[30, 10, 50, 20]]
+
+    def test_remove_small_blobs(self):
+        mask = np.zeros((100, 100), dtype=np.uint8)
+        assert remove_small_blobs(mask, 1) is None
+        mask[10:20, 30:50] = 255
+        assert remove_small_blobs(mask, 5) is mask
+        mask[80, 80] = 255
+        mask[50:52, 50:52] = 255
+        filtered = remove_small_blobs(mask, 5)
+        assert filtered[15, 40] == 255
+        assert filtered[80, 80] == 0 and filtered[50, 50] == 0
+        assert remove_small_blobs(mask, 50) is None
+
+    def test_components_backend_matches_contours(self):
+        with open(os.path.join(FILE_PATH, "test_config.json")) as json_data:
+            config = json.load(json_data)["image"]
+        config["path"] = tempfile.mkdtemp(prefix="image_analysis")
+        image = cv2.imread(os.path.join(
+            FILE_PATH, "test_data", "artifical_1.jpg"))
+
+        components, _ = ImageAnalysis(config, None, None).compute_image(image)
+        config["detect_backend"] = "contours"
+        contours, _ = ImageAnalysis(config, None, None).compute_image(image)
+        assert len(components) > 0
+        assert [obj.to_dict() for obj in components] == \
+            [obj.to_dict() for obj in contours]
+
+    def test_scale_and_merge_boxes(self):
+        boxes = scale_boxes([[1, 1, 3, 3], [4, 1, 5, 2]], 10, 2, (40, 45))
+        assert boxes.tolist() == [[8, 8, 32, 32], [38, 8, 45, 22]]
+        assert merge_boxes([[0, 0, 10, 10], [10, 5, 20, 8], [30, 30, 30, 40]]
+                           ) == [(0, 0, 20, 10)]
+
+    def test_coarse_matches_full_resolution(self):
+        with open(os.path.join(FILE_PATH, "test_config.json")) as json_data:
+            config = json.load(json_data)["image"]
+        config["path"] = tempfile.mkdtemp(prefix="image_analysis")
+        image = cv2.imread(os.path.join(
+            FILE_PATH, "test_data", "artifical_1.jpg"))
+
+        full, _ = ImageAnalysis(config, None, None).compute_image(image)
+        config["coarse_scale"] = 0.25
+        coarse, _ = ImageAnalysis(config, None, None).compute_image(image)
+
+        assert len(full) > 0
+
+        def key(obj):
+            return obj.color, obj.x_center, obj.y_center
+
+        assert [obj.to_dict() for obj in sorted(full, key=key)] == \
+            [obj.to_dict() for obj in sorted(coarse, key=key)]
+
+
+    def test_rois_match_full_frame_mask(self):
+        with open(os.path.join(FILE_PATH, "test_config.json")) as json_data:
+            config = json.load(json_data)["image"]
+        config["path"] = tempfile.mkdtemp(prefix="image_analysis")
+        ia = ImageAnalysis(config, None, None)
+        image = cv2.imread(os.path.join(
+            FILE_PATH, "test_data", "artifical_1.jpg"))
+
+        full = ia.frame_context(image).get_mask("blue")
+        boxes = [tuple(box) for box in scale_boxes(
+            mask_boxes(full), 1, 8, image.shape[:2])]
+        context = ia.frame_context(image)
+        context.set_rois(merge_boxes(boxes))
+        assert (context.get_mask("blue") == full).all()
+
+    def test_coarse_without_colors(self):
+        with open(os.path.join(FILE_PATH, "test_config.json")) as json_data:
+            config = json.load(json_data)["image"]
+        config["path"] = tempfile.mkdtemp(prefix="image_analysis")
+        config["coarse_scale"] = 0.25
+        ia = ImageAnalysis(config, None, None)
+        context = ia.frame_context(np.zeros((100, 100, 3), dtype=np.uint8))
+        ia._set_coarse_rois(context, [])
+        assert context.rois == []
+        assert context.get_mask("blue").max() == 0
+
+
+if __name__ == '__main__':
+    unittest.main()
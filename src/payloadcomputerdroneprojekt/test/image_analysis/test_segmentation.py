@@ -0,0 +1,65 @@
+import unittest
+from payloadcomputerdroneprojekt.image_analysis import ImageAnalysis
+from payloadcomputerdroneprojekt.image_analysis.segmentation import \
+    ColorSegmenter, SHAPE_COLOR
+import os
+import cv2
+import json
+import tempfile
+import numpy as np
+from payloadcomputerdroneprojekt.test.image_analysis.helper import FILE_PATH
+
+
+def in_range(lab, elements):
+    if isinstance(elements, dict):
+        elements = [elements]
+    mask = np.zeros(lab.shape[:2], dtype=np.uint8)
+    for elem in elements:
+        mask |= cv2.inRange(lab, elem["lower"], elem["upper"])
+    return mask
+
+
+class TestSegmentation(unittest.TestCase):
+    def test_matches_in_range(self):
+        path = tempfile.mkdtemp(prefix="image_analysis")
+        with open(os.path.join(FILE_PATH, "config_px4.json")) as json_data:
+            config = json.load(json_data)["image"]
+        config["path"] = path
+        config["colors"].append({
+            "name": "pink",
+            "lower_0": [0, 100, -10], "upper_0": [50, 127, 10],
+            "lower_1": [50, -128, -10], "upper_1": [100, -100, 10]})
+
+        ia = ImageAnalysis(config, None, None)
+        colors = {**ia.colors, SHAPE_COLOR: ia.shape_color}
+        for name in ["Mission_2.png", "inflight_code.jpg"]:
+            image = cv2.imread(os.path.join(FILE_PATH, "static_image", name))
+            lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
+            labels = ia._segmenter.classify(lab)
+            for color, elements in colors.items():
+                assert (ia._segmenter.get_mask(labels, color)
+                        == in_range(lab, elements)).all()
+
+    def test_multiple_planes(self):
+        colors = {
+            str(i): {"lower": np.array([i, 0, 0]),
+                     "upper": np.array([i + 10, 255, 255])}
+            for i in range(0, 200, 10)}
+        segmenter = ColorSegmenter(colors)
+        assert segmenter.planes == 3
+
+        lab = np.random.default_rng(0).integers(
+            0, 256, (40, 60, 3), dtype=np.uint8)
+        labels = segmenter.classify(lab)
+        for color, elements in colors.items():
+            assert (segmenter.get_mask(labels, color)
+                    == in_range(lab, elements)).all()
+
+    def test_unknown_color(self):
+        segmenter = ColorSegmenter({})
+        with self.assertRaises(IndexError):
+            segmenter.get_mask(np.zeros((0, 1, 1), dtype=np.uint8), "red")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import asyncio
+import json
+import os
+import tempfile
+from payloadcomputerdroneprojekt.image_analysis import ImageAnalysis
+from payloadcomputerdroneprojekt.image_analysis.timing import \
+    DISABLED_TIMER, FrameTimer, TimingStats
+from payloadcomputerdroneprojekt.test.image_analysis.helper \
+    import TestCommunications, TestCamera, FILE_PATH
+
+
+class TestTiming(unittest.TestCase):
+    def test_frame_timer(self):
+        timer = FrameTimer()
+        timer.lap("a")
+        timer.lap("b")
+        timer.lap("a")
+        timer.add({"b": 5, "c": 1})
+        timer.add({"b": 2}, "worker.")
+        times = timer.result()
+        assert set(times) == {"a", "b", "c", "worker.b", "total"}
+        assert times["b"] >= 5
+        assert times["worker.b"] == 2
+        assert DISABLED_TIMER.result() is None
+
+    def test_stats(self):
+        stats = TimingStats(3)
+        for i in range(5):
+            stats.add({"a": i})
+        stats.add(None)
+        summary = stats.summary()["a"]
+        assert summary["frames"] == 3
+        assert summary["mean"] == 3
+        assert summary["max"] == 4
+        assert stats.report() == ["a p50 3.0 p90 3.8 max 4.0 ms"]
+
+    def test_image_loop(self):
+        with open(os.path.join(FILE_PATH, "test_config.json")) as json_data:
+            config = json.load(json_data)["image"]
+
+        for timing in [False, True]:
+            config["path"] = tempfile.mkdtemp(prefix="image_analysis")
+            config["stage_timing"] = timing
+            ia = ImageAnalysis(config, TestCamera(config),
+                               TestCommunications(""))
+            for _ in range(2):
+                asyncio.run(ia.image_loop())
+            items = ia._data_handler.get_items()
+            if not timing:
+                assert "timings" not in items[0]
+                assert ia.timing_stats.summary() == {}
+                continue
+            for stage in ["camera", "telemetry", "segmentation", "detection",
+                          "store_raw", "total"]:
+                assert stage in items[0]["timings"]
+            assert ia.timing_stats.summary()["total"]["frames"] == 2
+
+    def test_workers(self):
+        with open(os.path.join(FILE_PATH, "test_config.json")) as json_data:
+            config = json.load(json_data)["image"]
+        config["path"] = tempfile.mkdtemp(prefix="image_analysis")
+        config["stage_timing"] = True
+        config["analysis_workers"] = 1
+        ia = ImageAnalysis(config, TestCamera(config), TestCommunications(""))
+
+        async def loop():
+            for _ in range(2):
+                await ia.image_loop()
+            await ia.close()
+        asyncio.run(loop())
+
+        times = ia._data_handler.get_items()[0]["timings"]
+        # the stages in the worker are part of the worker stage
+        assert "detection" not in times
+        assert times["worker.detection"] <= times["worker"] <= \
+            times["total"]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,39 +1,31 @@
-from payloadcomputerdroneprojekt.image_analysis import ImageAnalysis
+from payloadcomputerdroneprojekt.image_analysis.reprocess import reprocess
 import argparse
 import os
 import json
-import cv2
 import tempfile
-from os.path import join
+from os.path import exists, join
 
 
-def main(path, config):
+def main(path, config, out=None, workers=os.cpu_count(), chunksize=4):
     with open(config) as f:
         config = json.load(f)
 
-    config["image"]["path"] = tempfile.mkdtemp(prefix="precalc_", dir=path)
-    with open(join(config["image"]["path"], "config.json"), "w") as f:
+    if out is None:
+        out = tempfile.mkdtemp(prefix="precalc_", dir=path)
+    elif exists(join(out, "config.json")):
+        with open(join(out, "config.json")) as f:
+            if json.load(f) != config:
+                raise ValueError(
+                    f"{out} was computed with another config, it can not be "
+                    "continued")
+    os.makedirs(out, exist_ok=True)
+    with open(join(out, "config.json"), "w") as f:
         json.dump(config, f, indent=4)
 
-    ia = ImageAnalysis(config=config["image"], camera=None, comms=None)
-    ia.config["save_shape_image"] = True
-
-    with open(join(path, "__data__.json")) as f:
-        content = f.read()
-
-        if content.startswith("["):
-            data = json.loads(content)
-        else:
-            data = []
-            for line in content.splitlines():
-                data.append(json.loads(line))
-
-    for item in data:
-        ia._image_sub_routine(
-            image=cv2.imread(os.path.join(path, item["raw_image"])),
-            position_data=item["image_pos"], height=item["height"]
-        )
-    ia.get_filtered_objs()
+    config["image"]["path"] = out
+    handler = reprocess(path, out, config["image"], workers, chunksize)
+    handler.get_filterd_items(config["image"].get("distance_objs", 5))
+    print(f"Results in {out}")
 
 
 def args():
@@ -47,10 +39,20 @@ def args():
                         help="Path to the config file",
                         default=os.path.join(os.path.dirname(__file__),
                                              "config_px4.json"))
+    parser.add_argument(
+        "--out", type=str, default=None,
+        help="Folder of the results, an interrupted run in it is continued. "
+        "A new folder in the mission folder if not given")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(),
+        help="Number of processes analysing the images, 0 for none")
+    parser.add_argument(
+        "--chunksize", type=int, default=4,
+        help="Number of images sent to a process at once")
     return parser.parse_args()
 
 
 if __name__ == "__main__":
     a = args()
     print(a.path, a.config)
-    main(a.path, a.config)
+    main(a.path, a.config, a.out, a.workers, a.chunksize)